@@ -0,0 +1,61 @@
+"""
+
+Benchmark for evaluating ensembles of Q-functions.
+
+Times one forward and backward pass through num_q Q-functions, either as
+separate ``MLPQFunction`` modules called one after another, or as one
+``EnsembleMLPQFunction`` evaluated with batched matmuls.
+
+Usage:
+
+    python benchmarks/bench_ensemble_q.py --num_q 2 5 10 --batch_size 256
+
+"""
+import argparse
+import time
+
+import torch
+import torch.nn as nn
+
+from spinup.algos.pytorch.sac.core import EnsembleMLPQFunction, MLPQFunction
+
+
+def bench(q_fn, params, obs, act, iters):
+    q_fn(obs, act).sum().backward()  # warm up
+    start = time.perf_counter()
+    for _ in range(iters):
+        for p in params:
+            p.grad = None
+        q_fn(obs, act).sum().backward()
+    return (time.perf_counter() - start) / iters
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_q', type=int, nargs='+', default=[2, 5, 10])
+    parser.add_argument('--obs_dim', type=int, default=17)
+    parser.add_argument('--act_dim', type=int, default=6)
+    parser.add_argument('--hid', type=int, default=256)
+    parser.add_argument('--l', type=int, default=2)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--iters', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    hidden_sizes = [args.hid]*args.l
+    obs = torch.randn(args.batch_size, args.obs_dim)
+    act = torch.randn(args.batch_size, args.act_dim)
+
+    print('%-6s %16s %16s' % ('num_q', 'separate (ms)', 'ensemble (ms)'))
+    for num_q in args.num_q:
+        qs = [MLPQFunction(args.obs_dim, args.act_dim, hidden_sizes, nn.ReLU)
+              for _ in range(num_q)]
+        separate = lambda o, a: torch.stack([q(o, a) for q in qs])
+        separate_params = [p for q in qs for p in q.parameters()]
+        ensemble = EnsembleMLPQFunction(args.obs_dim, args.act_dim, hidden_sizes,
+                                        nn.ReLU, num_q)
+
+        t_sep = bench(separate, separate_params, obs, act, args.iters)
+        t_ens = bench(ensemble, list(ensemble.parameters()), obs, act, args.iters)
+        print('%-6d %16.3f %16.3f' % (num_q, t_sep * 1e3, t_ens * 1e3))
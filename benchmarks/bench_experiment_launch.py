@@ -0,0 +1,50 @@
+"""
+
+Benchmark for the cost of launching experiments.
+
+Runs a number of trivial experiments (which just import gym and PyTorch,
+like every real one does) with ``call_experiment``, once starting a fresh
+Python for each and once forking each from a warm server, and reports the
+time per experiment. The warm server is started before timing, as it would
+be by the first experiment of a sweep.
+
+Usage:
+
+    python benchmarks/bench_experiment_launch.py --num_exps 10
+
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from spinup.utils.run_utils import call_experiment
+
+
+def trivial_experiment(seed, logger_kwargs):
+    import gym
+    import torch
+    torch.manual_seed(seed)
+
+
+def time_launches(num_exps, warm_start, data_dir):
+    start = time.perf_counter()
+    for seed in range(num_exps):
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_experiment('bench', trivial_experiment, seed=seed,
+                            data_dir=data_dir, warm_start=warm_start)
+    return (time.perf_counter() - start) / num_exps
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_exps', type=int, default=10)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    time_launches(1, True, data_dir)    # Start the warm server.
+
+    print('%-12s %20s' % ('launch', 'per experiment (ms)'))
+    for name, warm_start in [('cold', False), ('warm', True)]:
+        elapsed = time_launches(args.num_exps, warm_start, data_dir)
+        print('%-12s %20.1f' % (name, elapsed * 1e3))
@@ -0,0 +1,49 @@
+"""
+
+Benchmark for the startup cost of Spinning Up.
+
+Times importing modules in fresh Python processes (the cost every
+experiment subprocess and every ``python -m spinup.run`` call pays), and
+reports which heavy dependencies each import pulled in.
+
+Usage:
+
+    python benchmarks/bench_import_time.py spinup spinup.utils.run_utils
+
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['tensorflow', 'torch', 'pandas', 'matplotlib', 'scipy', 'gym']
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(elapsed=elapsed,
+                      loaded=[m for m in %r if m in sys.modules])))
+"""
+
+
+def time_import(module, heavy_modules=HEAVY_MODULES):
+    out = subprocess.check_output([sys.executable, '-c', SCRIPT % (module, heavy_modules)],
+                                  stderr=subprocess.DEVNULL)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', 
+                        default=['spinup', 'spinup.utils.run_utils', 'spinup.utils.logx'])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print('%-28s %12s   %s' % ('module', 'best (ms)', 'heavy modules loaded'))
+    for module in args.modules:
+        results = [time_import(module) for _ in range(args.repeats)]
+        best = min(r['elapsed'] for r in results)
+        print('%-28s %12.1f   %s' % (module, best * 1e3, ', '.join(results[0]['loaded']) or '-'))
@@ -0,0 +1,79 @@
+"""
+
+Benchmark for the logger's background writes.
+
+Times how long the training loop spends in the logger at the end of an
+epoch of SAC (saving the state and model, dumping the epoch's diagnostics,
+and checkpointing the run), with the logger writing synchronously and with
+``background_io``. Between epochs, the loop "trains" for ``--train_time``
+seconds, during which background writes catch up.
+
+Usage:
+
+    python benchmarks/bench_logger_io.py --replay_size 100000 --hid 256
+
+"""
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+import gym
+import numpy as np
+import torch
+
+from spinup.algos.pytorch.sac.core import MLPActorCritic
+from spinup.utils.logx import EpochLogger
+
+
+def bench(background_io, args):
+    """Returns the mean time per epoch spent in the logger."""
+    obs_space = gym.spaces.Box(-np.inf, np.inf, (args.obs_dim,), dtype=np.float32)
+    act_space = gym.spaces.Box(-1, 1, (args.act_dim,), dtype=np.float32)
+    ac = MLPActorCritic(obs_space, act_space, hidden_sizes=(args.hid, args.hid))
+    # Stand-ins for the environment and the replay buffer
+    env = dict(state=np.random.randn(args.env_size))
+    replay = np.random.randn(args.replay_size, 2 * args.obs_dim + args.act_dim + 2)
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        spent = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            logger = EpochLogger(output_dir, background_io=background_io)
+            logger.setup_pytorch_saver(ac)
+            for epoch in range(args.epochs):
+                time.sleep(args.train_time)
+                start = time.perf_counter()
+                logger.save_state({'env': env}, None)
+                for key in ['EpRet', 'TestEpRet', 'Q1Vals', 'Q2Vals', 'LogPi']:
+                    logger.store(**{key: np.random.randn(100)})
+                    logger.log_tabular(key, with_min_and_max=True)
+                logger.log_tabular('Epoch', epoch)
+                logger.dump_tabular()
+                logger.save_checkpoint(dict(ac=ac.state_dict(), replay_buffer=replay))
+                spent.append(time.perf_counter() - start)
+            logger.flush()
+        return np.mean(spent)
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--obs_dim', type=int, default=17)
+    parser.add_argument('--act_dim', type=int, default=6)
+    parser.add_argument('--hid', type=int, default=256)
+    parser.add_argument('--env_size', type=int, default=100000)
+    parser.add_argument('--replay_size', type=int, default=100000)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--train_time', type=float, default=0.5)
+    args = parser.parse_args()
+
+    sync = bench(False, args)
+    background = bench(True, args)
+    print('Time in the logger per epoch:')
+    print('  synchronous: %8.2f ms' % (1e3 * sync))
+    print('  background:  %8.2f ms' % (1e3 * background))
+    print('  speedup:     %8.2fx' % (sync / background))
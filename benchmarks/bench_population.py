@@ -0,0 +1,82 @@
+"""
+
+Benchmark for training a population of small SAC agents in one process.
+
+Times one SAC-style update (Q-loss and pi-loss, forward and backward, plus
+Adam steps) of num_members agents, either as separate ``MLPActorCritic``
+modules updated one after another, or as one ``PopulationMLPActorCritic``
+updated with batched matmuls. Separate modules are what K ``sac`` processes
+sharing a core would run.
+
+Usage:
+
+    python benchmarks/bench_population.py --num_members 1 4 10 --hid 64
+
+"""
+import argparse
+import time
+
+import gym
+import numpy as np
+import torch
+from torch.optim import Adam
+
+from spinup.algos.pytorch.sac.core import MLPActorCritic, PopulationMLPActorCritic
+
+
+def sac_losses(ac, q_fn, q_dim, obs, act):
+    q = q_fn(obs, act)
+    pi, logp_pi = ac.pi(obs)
+    q_pi = q_fn(obs, pi).min(q_dim)[0]
+    return (q**2).mean() + (0.2 * logp_pi - q_pi).mean()
+
+
+def bench(step, iters):
+    step()  # warm up
+    start = time.perf_counter()
+    for _ in range(iters):
+        step()
+    return (time.perf_counter() - start) / iters
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_members', type=int, nargs='+', default=[1, 4, 10])
+    parser.add_argument('--obs_dim', type=int, default=17)
+    parser.add_argument('--act_dim', type=int, default=6)
+    parser.add_argument('--hid', type=int, default=64)
+    parser.add_argument('--l', type=int, default=2)
+    parser.add_argument('--batch_size', type=int, default=100)
+    parser.add_argument('--iters', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    obs_space = gym.spaces.Box(-np.inf, np.inf, (args.obs_dim,), dtype=np.float32)
+    act_space = gym.spaces.Box(-1, 1, (args.act_dim,), dtype=np.float32)
+    hidden_sizes = [args.hid]*args.l
+
+    print('%-12s %16s %16s %10s' % ('num_members', 'separate (ms)', 'population (ms)', 'speedup'))
+    for k in args.num_members:
+        obs = torch.randn(k, args.batch_size, args.obs_dim)
+        act = torch.rand(k, args.batch_size, args.act_dim)
+
+        acs = [MLPActorCritic(obs_space, act_space, hidden_sizes) for _ in range(k)]
+        opts = [Adam(ac.parameters(), lr=1e-3) for ac in acs]
+        def separate_step():
+            for i, (ac, opt) in enumerate(zip(acs, opts)):
+                opt.zero_grad()
+                q_fn = lambda o, a: torch.stack([ac.q1(o, a), ac.q2(o, a)])
+                sac_losses(ac, q_fn, 0, obs[i], act[i]).backward()
+                opt.step()
+
+        pop = PopulationMLPActorCritic(obs_space, act_space, hidden_sizes, num_members=k)
+        pop_opt = Adam(pop.parameters(), lr=1e-3)
+        def population_step():
+            pop_opt.zero_grad()
+            sac_losses(pop, pop.q, 1, obs, act).backward()
+            pop_opt.step()
+
+        t_sep = bench(separate_step, args.iters)
+        t_pop = bench(population_step, args.iters)
+        print('%-12d %16.3f %16.3f %9.1fx' % (k, t_sep * 1e3, t_pop * 1e3, t_sep / t_pop))
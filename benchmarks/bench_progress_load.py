@@ -0,0 +1,76 @@
+"""
+
+Benchmark for loading progress logs.
+
+Logs ``--runs`` runs of ``--epochs`` epochs, with as many diagnostics as
+SAC logs, with ``binary_log``, and then times loading all of them into
+DataFrames from ``progress.txt`` (as ``pd.read_table`` does) and from
+``progress.bin`` (with ``load_progress``).
+
+Usage:
+
+    python benchmarks/bench_progress_load.py --runs 200 --epochs 500
+
+"""
+import argparse
+import contextlib
+import io
+import os.path as osp
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from spinup.utils.logx import EpochLogger, load_progress
+
+KEYS = ['EpRet', 'TestEpRet', 'EpLen', 'TestEpLen', 'Q1Vals', 'Q2Vals', 'LogPi',
+        'LossPi', 'LossQ']
+
+
+def log_runs(root, args):
+    """Log the runs into ``root``, and return their output directories."""
+    output_dirs = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for run in range(args.runs):
+            output_dir = osp.join(root, 'run%d'%run)
+            logger = EpochLogger(output_dir, binary_log=True)
+            for epoch in range(args.epochs):
+                logger.log_tabular('Epoch', epoch)
+                for key in KEYS:
+                    logger.store(**{key: np.random.randn(10)})
+                    logger.log_tabular(key, with_min_and_max=True)
+                logger.log_tabular('Time', time.time())
+                logger.dump_tabular()
+            logger.output_file.close()
+            logger.binary_file.close()
+            output_dirs.append(output_dir)
+    return output_dirs
+
+
+def bench(load, output_dirs):
+    """Returns the time taken to load every run."""
+    start = time.perf_counter()
+    for output_dir in output_dirs:
+        load(output_dir)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--epochs', type=int, default=500)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        output_dirs = log_runs(root, args)
+        text = bench(lambda d: pd.read_table(osp.join(d, 'progress.txt')), output_dirs)
+        binary = bench(lambda d: pd.DataFrame(load_progress(d)), output_dirs)
+    finally:
+        shutil.rmtree(root)
+    print('Time to load %d runs of %d epochs:'%(args.runs, args.epochs))
+    print('  progress.txt: %8.2f ms' % (1e3 * text))
+    print('  progress.bin: %8.2f ms' % (1e3 * binary))
+    print('  speedup:      %8.2fx' % (text / binary))
@@ -0,0 +1,78 @@
+"""
+
+Benchmark for replay buffer batch sampling.
+
+Compares the original way of sampling a batch (fancy-indexing a new numpy
+array per field, then wrapping each in a tensor) against sampling with
+``BatchGatherer``, which copies rows into reused tensors. Reports the time
+and the memory allocated per sampled batch.
+
+Usage:
+
+    python benchmarks/bench_replay_sampling.py --obs_dim 17 --batch_size 100
+
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+from spinup.utils.replay_buffers import BatchGatherer
+
+
+def sample_fancy_index(arrays, idxs):
+    """How ``sample_batch`` used to build batches."""
+    batch = {k: arr[idxs] for k, arr in arrays.items()}
+    return {k: torch.as_tensor(v, dtype=torch.float32) for k,v in batch.items()}
+
+
+def bench(sample, arrays, size, batch_size, iters):
+    """Returns the mean latency and the peak memory allocated per batch."""
+    idxs = [np.random.randint(0, size, size=batch_size) for _ in range(iters)]
+    sample(arrays, idxs[0])  # warm up (eg first allocation of reused tensors)
+
+    start = time.perf_counter()
+    for i in range(iters):
+        sample(arrays, idxs[i])
+    latency = (time.perf_counter() - start) / iters
+
+    # numpy reports its array allocations to tracemalloc, so the peak of the
+    # traced memory while sampling one batch is what that batch allocated.
+    tracemalloc.start()
+    peak = 0
+    for i in range(iters):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        sample(arrays, idxs[i])
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return latency, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=int(1e6))
+    parser.add_argument('--obs_dim', type=int, default=17)
+    parser.add_argument('--act_dim', type=int, default=6)
+    parser.add_argument('--batch_size', type=int, default=100)
+    parser.add_argument('--iters', type=int, default=5000)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    f32 = lambda *shape: np.random.randn(*shape).astype(np.float32)
+    arrays = dict(obs=f32(args.size, args.obs_dim),
+                  obs2=f32(args.size, args.obs_dim),
+                  act=f32(args.size, args.act_dim),
+                  rew=f32(args.size),
+                  done=f32(args.size))
+
+    gatherer = BatchGatherer()
+    methods = [('fancy indexing', sample_fancy_index),
+               ('BatchGatherer', lambda arrays, idxs: gatherer.take_all(idxs, **arrays))]
+
+    print('%-16s %14s %20s' % ('method', 'usec / batch', 'bytes alloc / batch'))
+    for name, sample in methods:
+        latency, peak = bench(sample, arrays, args.size, args.batch_size, args.iters)
+        print('%-16s %14.1f %20d' % (name, latency * 1e6, peak))
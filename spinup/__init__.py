@@ -1,25 +1,54 @@
-# Disable TF deprecation warnings.
-# Syntax from tf1 is not expected to be compatible with tf2.
-import tensorflow as tf
-tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
-
-# Algorithms
-from spinup.algos.tf1.ddpg.ddpg import ddpg as ddpg_tf1
-from spinup.algos.tf1.ppo.ppo import ppo as ppo_tf1
-from spinup.algos.tf1.sac.sac import sac as sac_tf1
-from spinup.algos.tf1.td3.td3 import td3 as td3_tf1
-from spinup.algos.tf1.trpo.trpo import trpo as trpo_tf1
-from spinup.algos.tf1.vpg.vpg import vpg as vpg_tf1
-
-from spinup.algos.pytorch.ddpg.ddpg import ddpg as ddpg_pytorch
-from spinup.algos.pytorch.ppo.ppo import ppo as ppo_pytorch
-from spinup.algos.pytorch.sac.sac import sac as sac_pytorch
-from spinup.algos.pytorch.td3.td3 import td3 as td3_pytorch
-from spinup.algos.pytorch.trpo.trpo import trpo as trpo_pytorch
-from spinup.algos.pytorch.vpg.vpg import vpg as vpg_pytorch
-
-# Loggers
-from spinup.utils.logx import Logger, EpochLogger
+import importlib
+
+# Algorithms and loggers are only imported when first accessed (eg on
+# ``spinup.ppo_pytorch`` or ``from spinup import ppo_pytorch``), so that
+# ``import spinup`` doesn't load TensorFlow or PyTorch until one of them
+# is actually needed.
+_REGISTRY = dict(
+    # Algorithms
+    ddpg_tf1=('spinup.algos.tf1.ddpg.ddpg', 'ddpg'),
+    ppo_tf1=('spinup.algos.tf1.ppo.ppo', 'ppo'),
+    sac_tf1=('spinup.algos.tf1.sac.sac', 'sac'),
+    td3_tf1=('spinup.algos.tf1.td3.td3', 'td3'),
+    trpo_tf1=('spinup.algos.tf1.trpo.trpo', 'trpo'),
+    vpg_tf1=('spinup.algos.tf1.vpg.vpg', 'vpg'),
+
+    ddpg_pytorch=('spinup.algos.pytorch.ddpg.ddpg', 'ddpg'),
+    ppo_pytorch=('spinup.algos.pytorch.ppo.ppo', 'ppo'),
+    sac_pytorch=('spinup.algos.pytorch.sac.sac', 'sac'),
+    sac_population_pytorch=('spinup.algos.pytorch.sac.sac_population', 'sac_population'),
+    td3_pytorch=('spinup.algos.pytorch.td3.td3', 'td3'),
+    trpo_pytorch=('spinup.algos.pytorch.trpo.trpo', 'trpo'),
+    vpg_pytorch=('spinup.algos.pytorch.vpg.vpg', 'vpg'),
+
+    # Loggers
+    Logger=('spinup.utils.logx', 'Logger'),
+    EpochLogger=('spinup.utils.logx', 'EpochLogger'),
+)
+
+_tf_configured = False
+
+def _configure_tf():
+    # Disable TF deprecation warnings.
+    # Syntax from tf1 is not expected to be compatible with tf2.
+    global _tf_configured
+    if not _tf_configured:
+        import tensorflow as tf
+        tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+        _tf_configured = True
+
+def __getattr__(name):
+    if name not in _REGISTRY:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    module_name, attr = _REGISTRY[name]
+    if module_name.startswith('spinup.algos.tf1.'):
+        _configure_tf()
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value     # Later lookups don't go through __getattr__.
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_REGISTRY))
 
 # Version
-from spinup.version import __version__
\ No newline at end of file
+from spinup.version import __version__
@@ -3,23 +3,39 @@ import numpy as np
 import torch
 from torch.optim import Adam
 import gym
+import os.path as osp
 import time
 import spinup.algos.pytorch.ddpg.core as core
 from spinup.utils.logx import EpochLogger
+from spinup.utils.env_workers import EnvWorkers
+from spinup.utils.flat_params import flatten_parameters
+from spinup.utils.replay_buffers import BatchGatherer, CompactReplayBuffer, PrioritizedReplayBuffer
+from spinup.utils.replay_storage import ReplayStorage
 
 
 class ReplayBuffer:
     """
     A simple FIFO experience replay buffer for DDPG agents.
+
+    If ``storage_dir`` is given, the buffer lives in memory-mapped files in
+    that directory rather than in RAM. Call ``save`` to make it restorable:
+    a new buffer with the same ``storage_dir`` and size picks up where the
+    saved one left off.
+
+    Batches are gathered into tensors which are reused from one call of
+    ``sample_batch`` to the next.
     """
 
-    def __init__(self, obs_dim, act_dim, size):
-        self.obs_buf = np.zeros(core.combined_shape(size, obs_dim), dtype=np.float32)
-        self.obs2_buf = np.zeros(core.combined_shape(size, obs_dim), dtype=np.float32)
-        self.act_buf = np.zeros(core.combined_shape(size, act_dim), dtype=np.float32)
-        self.rew_buf = np.zeros(size, dtype=np.float32)
-        self.done_buf = np.zeros(size, dtype=np.float32)
-        self.ptr, self.size, self.max_size = 0, 0, size
+    def __init__(self, obs_dim, act_dim, size, storage_dir=None):
+        self.storage = ReplayStorage(storage_dir)
+        self.obs_buf = self.storage.array('obs', core.combined_shape(size, obs_dim))
+        self.obs2_buf = self.storage.array('obs2', core.combined_shape(size, obs_dim))
+        self.act_buf = self.storage.array('act', core.combined_shape(size, act_dim))
+        self.rew_buf = self.storage.array('rew', size)
+        self.done_buf = self.storage.array('done', size)
+        state = self.storage.load_state()
+        self.ptr, self.size, self.max_size = state.get('ptr', 0), state.get('size', 0), size
+        self.gatherer = BatchGatherer()
 
     def store(self, obs, act, rew, next_obs, done):
         self.obs_buf[self.ptr] = obs
@@ -32,12 +48,21 @@ class ReplayBuffer:
 
     def sample_batch(self, batch_size=32):
         idxs = np.random.randint(0, self.size, size=batch_size)
-        batch = dict(obs=self.obs_buf[idxs],
-                     obs2=self.obs2_buf[idxs],
-                     act=self.act_buf[idxs],
-                     rew=self.rew_buf[idxs],
-                     done=self.done_buf[idxs])
-        return {k: torch.as_tensor(v, dtype=torch.float32) for k,v in batch.items()}
+        return self.gatherer.take_all(idxs, obs=self.obs_buf, obs2=self.obs2_buf,
+                                      act=self.act_buf, rew=self.rew_buf,
+                                      done=self.done_buf)
+
+    def save(self):
+        """Flush a memory-mapped buffer to disk, so it can be restored."""
+        self.storage.save_state(ptr=self.ptr, size=self.size)
+
+    def state_dict(self):
+        """The contents and pointers of the buffer, for a checkpoint."""
+        return self.storage.state_dict(ptr=self.ptr, size=self.size)
+
+    def load_state_dict(self, state_dict):
+        state = self.storage.load_state_dict(state_dict)
+        self.ptr, self.size = state['ptr'], state['size']
 
 
 
@@ -45,7 +70,11 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
          steps_per_epoch=4000, epochs=100, replay_size=int(1e6), gamma=0.99, 
          polyak=0.995, pi_lr=1e-3, q_lr=1e-3, batch_size=100, start_steps=10000, 
          update_after=1000, update_every=50, act_noise=0.1, num_test_episodes=10, 
-         max_ep_len=1000, logger_kwargs=dict(), save_freq=1):
+         max_ep_len=1000, num_env_workers=0, persist_replay=False, 
+         compact_replay=False, replay_obs_dtype='float32', prioritized_replay=False, 
+         per_alpha=0.6, per_beta=0.4, resume=False, 
+         logger_kwargs=dict(), save_freq=1, 
+         checkpoint_freq=10):
     """
     Deep Deterministic Policy Gradient (DDPG)
 
@@ -123,14 +152,68 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
 
         max_ep_len (int): Maximum length of trajectory / episode / rollout.
 
+        num_env_workers (int): If positive, step this many copies of the
+            environment in separate worker processes, which act with a 
+            shared-memory copy of the policy while the main process keeps 
+            running updates. Transitions reach the replay buffer through 
+            shared memory, and the policy copy is refreshed after every 
+            round of updates. If 0, the environment is stepped in the main 
+            process, in between updates.
+
+        persist_replay (bool): Keep the replay buffer in memory-mapped files
+            under ``output_dir/replay_buffer`` instead of RAM, and save it 
+            whenever the model is saved. A later run with the same output
+            directory restores the buffer, and skips as much of the 
+            ``start_steps`` and ``update_after`` warm-up as the restored
+            transitions already cover.
+
+        compact_replay (bool): Use a replay buffer which stores every 
+            observation only once (instead of once as ``obs`` and once as
+            ``obs2``), reconstructing next observations when sampling. This 
+            roughly halves the memory used for observations. (Not with 
+            ``num_env_workers``, whose transitions are interleaved.)
+
+        replay_obs_dtype (string): With ``compact_replay``, the precision 
+            observations are stored in: ``'float32'``, ``'float16'``, or 
+            ``'uint8'`` (quantized between the bounds of the observation 
+            space, which must then be finite). Sampled observations are 
+            always float32.
+
+        prioritized_replay (bool): Sample transitions from the replay buffer
+            with probability proportional to their last absolute TD error 
+            (raised to ``per_alpha``), rather than uniformly, and weight the
+            Q-loss with importance-sampling weights. Can't be combined with
+            ``compact_replay``.
+
+        per_alpha (float): How strongly prioritized replay prefers
+            transitions with large TD errors. (0 is uniform sampling.)
+
+        per_beta (float): Initial strength of the importance-sampling 
+            correction for prioritized replay. It is annealed linearly to 1
+            (full correction) over the course of training.
+
+        resume (bool): Pick up from the last checkpoint in the output 
+            directory, if there is one. Every ``checkpoint_freq`` epochs, the 
+            full state of the run (networks, target networks, optimizers, 
+            replay buffer, environments, random number generators and 
+            counters) is checkpointed, so a resumed run carries on exactly
+            as if it hadn't been interrupted, appending to the progress 
+            log. (Except with ``num_env_workers``, whose environments are
+            started over.)
+
         logger_kwargs (dict): Keyword args for EpochLogger.
 
         save_freq (int): How often (in terms of gap between epochs) to save
             the current policy and value function.
 
+        checkpoint_freq (int): How often (in terms of gap between epochs) to
+            checkpoint the run (see ``resume``). Checkpoints hold the whole
+            replay buffer (only its pointers with ``persist_replay``), so 
+            they are taken less often than saves.
+
     """
 
-    logger = EpochLogger(**logger_kwargs)
+    logger = EpochLogger(resume=resume, **logger_kwargs)
     logger.save_config(locals())
 
     torch.manual_seed(seed)
@@ -151,9 +234,34 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
     for p in ac_targ.parameters():
         p.requires_grad = False
 
-    # Experience buffer
-    replay_buffer = ReplayBuffer(obs_dim=obs_dim, act_dim=act_dim, size=replay_size)
+    # Keep the parameters of both in flat tensors, to polyak average in one op
+    ac_flat, ac_targ_flat = flatten_parameters(ac), flatten_parameters(ac_targ)
 
+    # List of policy parameters (save this for convenience)
+    pi_params = list(ac.pi.parameters())
+
+    # Experience buffer
+    replay_dir = None
+    if persist_replay and logger.output_dir is not None:
+        replay_dir = osp.join(logger.output_dir, 'replay_buffer')
+    assert not(compact_replay and prioritized_replay), \
+        "Compact and prioritized replay can't be used together."
+    assert not(compact_replay and num_env_workers > 0), \
+        "Compact replay needs the transitions of an episode in order, which " \
+        "environment workers interleave."
+    if prioritized_replay:
+        replay_buffer = PrioritizedReplayBuffer(obs_dim=obs_dim, act_dim=act_dim,
+                                                size=replay_size, alpha=per_alpha, 
+                                                beta=per_beta, storage_dir=replay_dir)
+    elif compact_replay:
+        replay_buffer = CompactReplayBuffer(obs_dim=obs_dim, act_dim=act_dim, 
+                                            size=replay_size, obs_dtype=replay_obs_dtype,
+                                            obs_low=env.observation_space.low,
+                                            obs_high=env.observation_space.high,
+                                            storage_dir=replay_dir)
+    else:
+        replay_buffer = ReplayBuffer(obs_dim=obs_dim, act_dim=act_dim, size=replay_size,
+                                     storage_dir=replay_dir)
     # Count variables (protip: try to get a feel for how different size networks behave!)
     var_counts = tuple(core.count_vars(module) for module in [ac.pi, ac.q])
     logger.log('\nNumber of parameters: \t pi: %d, \t q: %d\n'%var_counts)
@@ -169,12 +277,18 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
             q_pi_targ = ac_targ.q(o2, ac_targ.pi(o2))
             backup = r + gamma * (1 - d) * q_pi_targ
 
-        # MSE loss against Bellman backup
-        loss_q = ((q - backup)**2).mean()
+        # MSE loss against Bellman backup (with importance-sampling weights,
+        # if the batch comes from prioritized replay)
+        weights = data.get('weights', 1)
+        loss_q = (weights * (q - backup)**2).mean()
 
         # Useful info for logging
         loss_info = dict(QVals=q.detach().numpy())
 
+        # TD errors to update priorities with (not logged)
+        if 'idxs' in data:
+            loss_info['TDError'] = (q - backup).detach().numpy()
+
         return loss_q, loss_info
 
     # Set up function for computing DDPG pi loss
@@ -184,12 +298,33 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
         return -q_pi.mean()
 
     # Set up optimizers for policy and q-function
-    pi_optimizer = Adam(ac.pi.parameters(), lr=pi_lr)
+    pi_optimizer = Adam(pi_params, lr=pi_lr)
     q_optimizer = Adam(ac.q.parameters(), lr=q_lr)
 
     # Set up model saving
     logger.setup_pytorch_saver(ac)
 
+    # Pick up from a checkpoint, when resuming. (This restores the random
+    # number generators, so nothing else may draw from them before the
+    # main loop.)
+    checkpoint = logger.load_checkpoint()
+    if checkpoint is not None:
+        ac.load_state_dict(checkpoint['ac'])
+        ac_targ.load_state_dict(checkpoint['ac_targ'])
+        pi_optimizer.load_state_dict(checkpoint['pi_optimizer'])
+        q_optimizer.load_state_dict(checkpoint['q_optimizer'])
+        replay_buffer.load_state_dict(checkpoint['replay_buffer'])
+        if 'test_env' in checkpoint:
+            test_env = checkpoint['test_env']
+        if num_env_workers > 0:
+            # The workers count their warm-up steps from scratch.
+            start_steps = max(start_steps - checkpoint['epoch'] * steps_per_epoch, 0)
+    elif replay_buffer.size > 0:
+        # Don't refill the warm-up data a restored buffer already holds.
+        logger.log('Restored %d transitions into the replay buffer.'%replay_buffer.size)
+        start_steps = max(start_steps - replay_buffer.size, 0)
+        update_after = max(update_after - replay_buffer.size, 0)
+
     def update(data):
         # First run one gradient descent step for Q.
         q_optimizer.zero_grad()
@@ -197,31 +332,28 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
         loss_q.backward()
         q_optimizer.step()
 
-        # Freeze Q-network so you don't waste computational effort 
-        # computing gradients for it during the policy learning step.
-        for p in ac.q.parameters():
-            p.requires_grad = False
+        # Reprioritize the sampled transitions, if using prioritized replay
+        if 'idxs' in data:
+            replay_buffer.update_priorities(data['idxs'].numpy(), loss_info.pop('TDError'))
 
-        # Next run one gradient descent step for pi.
-        pi_optimizer.zero_grad()
+        # Next run one gradient descent step for pi. Only differentiate
+        # with respect to the policy parameters, so you don't waste
+        # computational effort computing gradients for the Q-network.
         loss_pi = compute_loss_pi(data)
-        loss_pi.backward()
+        pi_grads = torch.autograd.grad(loss_pi, pi_params)
+        for p, g in zip(pi_params, pi_grads):
+            p.grad = g
         pi_optimizer.step()
 
-        # Unfreeze Q-network so you can optimize it at next DDPG step.
-        for p in ac.q.parameters():
-            p.requires_grad = True
-
         # Record things
         logger.store(LossQ=loss_q.item(), LossPi=loss_pi.item(), **loss_info)
 
         # Finally, update target networks by polyak averaging.
         with torch.no_grad():
-            for p, p_targ in zip(ac.parameters(), ac_targ.parameters()):
-                # NB: We use an in-place operations "mul_", "add_" to update target
-                # params, as opposed to "mul" and "add", which would make new tensors.
-                p_targ.data.mul_(polyak)
-                p_targ.data.add_((1 - polyak) * p.data)
+            # NB: We use an in-place operation "lerp_" to update target params
+            # (all at once, through their flat tensor), as opposed to "lerp",
+            # which would make a new tensor.
+            ac_targ_flat.lerp_(ac_flat, 1 - polyak)
 
     def get_action(o, noise_scale):
         a = ac.act(torch.as_tensor(o, dtype=torch.float32))
@@ -238,49 +370,77 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
                 ep_len += 1
             logger.store(TestEpRet=ep_ret, TestEpLen=ep_len)
 
+    # Optionally step the environment in background worker processes
+    env_workers = None
+    if num_env_workers > 0:
+        def worker_action(pi, o):
+            a = pi(torch.as_tensor(o, dtype=torch.float32)).numpy()
+            a += act_noise * np.random.randn(act_dim)
+            return np.clip(a, -act_limit, act_limit)
+        env_workers = EnvWorkers(env_fn, ac.pi, worker_action, obs_dim, act_dim,
+                                 num_env_workers, start_steps=start_steps,
+                                 max_ep_len=max_ep_len, seed=seed)
+
     # Prepare for interaction with environment
     total_steps = steps_per_epoch * epochs
-    start_time = time.time()
-    o, ep_ret, ep_len = env.reset(), 0, 0
+    start_time, start_t = time.time(), 0
+    if checkpoint is not None:
+        start_time -= checkpoint['elapsed']
+        start_t = checkpoint['epoch'] * steps_per_epoch
+    if checkpoint is not None and 'env' in checkpoint:
+        env, (o, ep_ret, ep_len) = checkpoint['env'], checkpoint['episode']
+    else:
+        o, ep_ret, ep_len = env.reset(), 0, 0
 
     # Main loop: collect experience in env and update/log each epoch
-    for t in range(total_steps):
-        
-        # Until start_steps have elapsed, randomly sample actions
-        # from a uniform distribution for better exploration. Afterwards, 
-        # use the learned policy (with some noise, via act_noise). 
-        if t > start_steps:
-            a = get_action(o, act_noise)
+    for t in range(start_t, total_steps):
+        if env_workers is not None:
+            # Pull the next transition collected by the environment workers,
+            # which keep stepping their envs while we run updates below.
+            ep = env_workers.fetch(replay_buffer)
+            if ep is not None:
+                logger.store(EpRet=ep[0], EpLen=ep[1])
         else:
-            a = env.action_space.sample()
-
-        # Step the env
-        o2, r, d, _ = env.step(a)
-        ep_ret += r
-        ep_len += 1
-
-        # Ignore the "done" signal if it comes from hitting the time
-        # horizon (that is, when it's an artificial terminal signal
-        # that isn't based on the agent's state)
-        d = False if ep_len==max_ep_len else d
-
-        # Store experience to replay buffer
-        replay_buffer.store(o, a, r, o2, d)
-
-        # Super critical, easy to overlook step: make sure to update 
-        # most recent observation!
-        o = o2
-
-        # End of trajectory handling
-        if d or (ep_len == max_ep_len):
-            logger.store(EpRet=ep_ret, EpLen=ep_len)
-            o, ep_ret, ep_len = env.reset(), 0, 0
+            # Until start_steps have elapsed, randomly sample actions
+            # from a uniform distribution for better exploration. Afterwards, 
+            # use the learned policy (with some noise, via act_noise). 
+            if t > start_steps:
+                a = get_action(o, act_noise)
+            else:
+                a = env.action_space.sample()
+
+            # Step the env
+            o2, r, d, _ = env.step(a)
+            ep_ret += r
+            ep_len += 1
+
+            # Ignore the "done" signal if it comes from hitting the time
+            # horizon (that is, when it's an artificial terminal signal
+            # that isn't based on the agent's state)
+            d = False if ep_len==max_ep_len else d
+
+            # Store experience to replay buffer
+            replay_buffer.store(o, a, r, o2, d)
+
+            # Super critical, easy to overlook step: make sure to update 
+            # most recent observation!
+            o = o2
+
+            # End of trajectory handling
+            if d or (ep_len == max_ep_len):
+                logger.store(EpRet=ep_ret, EpLen=ep_len)
+                o, ep_ret, ep_len = env.reset(), 0, 0
 
         # Update handling
         if t >= update_after and t % update_every == 0:
+            if prioritized_replay:
+                # Anneal importance-sampling correction towards 1
+                replay_buffer.beta = per_beta + (1 - per_beta) * t / total_steps
             for _ in range(update_every):
                 batch = replay_buffer.sample_batch(batch_size)
                 update(data=batch)
+            if env_workers is not None:
+                env_workers.sync_policy(ac.pi)
 
         # End of epoch handling
         if (t+1) % steps_per_epoch == 0:
@@ -288,7 +448,8 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
 
             # Save model
             if (epoch % save_freq == 0) or (epoch == epochs):
-                logger.save_state({'env': env}, None)
+                logger.save_state({'env': env}, None, static=['env'])
+                replay_buffer.save()
 
             # Test the performance of the deterministic version of the agent.
             test_agent()
@@ -306,6 +467,18 @@ def ddpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
             logger.log_tabular('Time', time.time()-start_time)
             logger.dump_tabular()
 
+            # Checkpoint the run, to resume from
+            if (epoch % checkpoint_freq == 0) or (epoch == epochs):
+                logger.save_checkpoint(dict(
+                    epoch=epoch, elapsed=time.time()-start_time, ac=ac.state_dict(), 
+                    ac_targ=ac_targ.state_dict(), pi_optimizer=pi_optimizer.state_dict(),
+                    q_optimizer=q_optimizer.state_dict(), 
+                    replay_buffer=replay_buffer.state_dict(),
+                    env=env, test_env=test_env, episode=(o, ep_ret, ep_len)))
+
+    if env_workers is not None:
+        env_workers.close()
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
@@ -7,6 +7,7 @@ import spinup.algos.pytorch.ppo.core as core
 from spinup.utils.logx import EpochLogger
 from spinup.utils.mpi_pytorch import setup_pytorch_for_mpi, sync_params, mpi_avg_grads
 from spinup.utils.mpi_tools import mpi_fork, mpi_avg, proc_id, mpi_statistics_scalar, num_procs
+from spinup.utils.pbt import pbt_update, save_pbt_weights
 from spinup.utils.algorithm_logging import AlgorithmLogger
 from spinup.utils.constants import PlottingConstants
 from termcolor import colored
@@ -17,9 +18,16 @@ class PPOBuffer:
     A buffer for storing trajectories experienced by a PPO agent interacting
     with the environment, and using Generalized Advantage Estimation (GAE-Lambda)
     for calculating the advantages of state-action pairs.
+
+    When the agent steps several copies of the environment in lockstep
+    (``num_envs > 1``), the buffer is split into one contiguous segment per
+    environment copy, so that every trajectory is still stored contiguously
+    and can be finished independently of the others.
     """
 
-    def __init__(self, obs_dim, act_dim, size, gamma=0.99, lam=0.95):
+    def __init__(self, obs_dim, act_dim, size, gamma=0.99, lam=0.95, num_envs=1):
+        assert size % num_envs == 0, \
+            "Buffer size has to be divisible by the number of environments."
         self.obs_buf = np.zeros(core.combined_shape(size, obs_dim), dtype=np.float32)
         self.act_buf = np.zeros(core.combined_shape(size, act_dim), dtype=np.float32)
         self.adv_buf = np.zeros(size, dtype=np.float32)
@@ -28,13 +36,20 @@ class PPOBuffer:
         self.val_buf = np.zeros(size, dtype=np.float32)
         self.logp_buf = np.zeros(size, dtype=np.float32)
         self.gamma, self.lam = gamma, lam
-        self.ptr, self.path_start_idx, self.max_size = 0, 0, size
+        self.max_size, self.num_envs = size, num_envs
+        # Start and (exclusive) end of the segment owned by each env copy
+        self.seg_start = np.arange(num_envs) * (size // num_envs)
+        self.seg_end = self.seg_start + size // num_envs
+        self.ptr, self.path_start_idx = self.seg_start.copy(), self.seg_start.copy()
 
     def store(self, obs, act, rew, val, logp):
         """
         Append one timestep of agent-environment interaction to the buffer.
+
+        With ``num_envs > 1``, every argument is a batch holding one entry
+        per environment copy.
         """
-        assert self.ptr < self.max_size     # buffer has to have room so you can store
+        assert np.all(self.ptr < self.seg_end)     # buffer has to have room so you can store
         self.obs_buf[self.ptr] = obs
         self.act_buf[self.ptr] = act
         self.rew_buf[self.ptr] = rew
@@ -42,7 +57,7 @@ class PPOBuffer:
         self.logp_buf[self.ptr] = logp
         self.ptr += 1
 
-    def finish_path(self, last_val=0):
+    def finish_path(self, last_val=0, env_idx=0):
         """
         Call this at the end of a trajectory, or when one gets cut off
         by an epoch ending. This looks back in the buffer to where the
@@ -56,9 +71,12 @@ class PPOBuffer:
         should be V(s_T), the value function estimated for the last state.
         This allows us to bootstrap the reward-to-go calculation to account
         for timesteps beyond the arbitrary episode horizon (or epoch cutoff).
+
+        The "env_idx" argument picks which environment copy's trajectory
+        is finished.
         """
 
-        path_slice = slice(self.path_start_idx, self.ptr)
+        path_slice = slice(self.path_start_idx[env_idx], self.ptr[env_idx])
         rews = np.append(self.rew_buf[path_slice], last_val)
         vals = np.append(self.val_buf[path_slice], last_val)
         
@@ -69,7 +87,7 @@ class PPOBuffer:
         # the next line computes rewards-to-go, to be targets for the value function
         self.ret_buf[path_slice] = core.discount_cumsum(rews, self.gamma)[:-1]
         
-        self.path_start_idx = self.ptr
+        self.path_start_idx[env_idx] = self.ptr[env_idx]
 
     def get(self):
         """
@@ -77,8 +95,8 @@ class PPOBuffer:
         the buffer, with advantages appropriately normalized (shifted to have
         mean zero and std one). Also, resets some pointers in the buffer.
         """
-        assert self.ptr == self.max_size    # buffer has to be full before you can get
-        self.ptr, self.path_start_idx = 0, 0
+        assert np.all(self.ptr == self.seg_end)    # buffer has to be full before you can get
+        self.ptr, self.path_start_idx = self.seg_start.copy(), self.seg_start.copy()
         # the next two lines implement the advantage normalization trick
         adv_mean, adv_std = mpi_statistics_scalar(self.adv_buf)
         self.adv_buf = (self.adv_buf - adv_mean) / adv_std
@@ -92,7 +110,8 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
         steps_per_epoch=4000, epochs=50, gamma=0.99, clip_ratio=0.2, 
         pi_lr=3e-4, vf_lr=1e-3, train_pi_iters=80, train_v_iters=80, lam=0.97, 
         max_ep_len=1000, target_kl=0.01, eval_episodes=1, required_quality=1.0,
-        render_eval=False, logger_kwargs=dict(), save_freq=10):
+        render_eval=False, num_envs=1, pbt=False, resume=False, logger_kwargs=dict(), 
+        save_freq=10):
     """
     Proximal Policy Optimization (by clipping), 
 
@@ -189,10 +208,31 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
             between new and old policies after an update. This will get used 
             for early stopping. (Usually small, 0.01 or 0.05.)
 
+        num_envs (int): Number of copies of the environment (made with 
+            ``env_fn``) that each process steps in lockstep. Observations
+            from all copies are batched into a single ``ac.step`` call per
+            timestep. The per-process ``steps_per_epoch`` are split evenly
+            between the copies.
+
+        pbt (bool): Whether this run is a member of a population in
+            population based training (see ``spinup/utils/pbt.py``). If so, 
+            at the start of every epoch after the first, it takes on any 
+            weights and values of ``pi_lr``, ``vf_lr``, ``clip_ratio`` and
+            ``target_kl`` sent by the PBT driver. (The driver copies the 
+            weights saved along with the model, so keep ``save_freq`` small.)
+
+        resume (bool): Pick up from the last checkpoint in the output 
+            directory, if there is one. Every ``save_freq`` epochs, the 
+            full state of the run (networks, optimizers, environments, 
+            random number generators, counters and evaluation statistics, 
+            of every process) is checkpointed, so a resumed run (with the 
+            same number of processes) carries on exactly as if it hadn't 
+            been interrupted, appending to the progress log.
+
         logger_kwargs (dict): Keyword args for EpochLogger.
 
         save_freq (int): How often (in terms of gap between epochs) to save
-            the current policy and value function.
+            the current policy and value function, and checkpoint the run.
 
     """
 
@@ -200,7 +240,7 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
     setup_pytorch_for_mpi()
 
     # Set up logger and save configuration
-    logger = EpochLogger(**logger_kwargs)
+    logger = EpochLogger(resume=resume, **logger_kwargs)
     logger.save_config(locals())
 
     # Random seed
@@ -208,8 +248,9 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
     torch.manual_seed(seed)
     np.random.seed(seed)
 
-    # Instantiate environment
-    env = env_fn()
+    # Instantiate environments
+    envs = [env_fn() for _ in range(num_envs)]
+    env = envs[0]
     obs_dim = env.observation_space.shape
     act_dim = env.action_space.shape
 
@@ -219,7 +260,8 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
         video_callable=lambda ep_id: True, force=True)
     # eval_env = _eval_env
 
-    env.seed(seed)
+    for i, e in enumerate(envs):
+        e.seed(seed + i)
     eval_env.seed(seed)
 
     algorithm_logger = AlgorithmLogger(
@@ -239,8 +281,16 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
     logger.log('\nNumber of parameters: \t pi: %d, \t v: %d\n'%var_counts)
 
     # Set up experience buffer
-    local_steps_per_epoch = int(steps_per_epoch / num_procs())
-    buf = PPOBuffer(obs_dim, act_dim, local_steps_per_epoch, gamma, lam)
+    local_steps_per_env = int(steps_per_epoch / num_procs() / num_envs)
+    local_steps_per_epoch = local_steps_per_env * num_envs
+    if local_steps_per_epoch * num_procs() != steps_per_epoch:
+        # (The remainder is dropped, so count the steps actually taken.)
+        logger.log('Warning: steps_per_epoch (%d) is not divisible by the number of '
+                   'processes times num_envs (%d), so each epoch takes %d steps.'%(
+                       steps_per_epoch, num_procs() * num_envs, 
+                       local_steps_per_epoch * num_procs()), color='red')
+        steps_per_epoch = local_steps_per_epoch * num_procs()
+    buf = PPOBuffer(obs_dim, act_dim, local_steps_per_epoch, gamma, lam, num_envs)
 
     # Set up function for computing PPO policy loss
     def compute_loss_pi(data):
@@ -309,19 +359,58 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
                      DeltaLossPi=(loss_pi.item() - pi_l_old),
                      DeltaLossV=(loss_v.item() - v_l_old))
 
+    # Pick up from a checkpoint, when resuming. (This restores the random
+    # number generators, so nothing else may draw from them before the
+    # main loop.)
+    checkpoint = logger.load_checkpoint()
+    if checkpoint is not None:
+        ac.load_state_dict(checkpoint['ac'])
+        pi_optimizer.load_state_dict(checkpoint['pi_optimizer'])
+        vf_optimizer.load_state_dict(checkpoint['vf_optimizer'])
+        pi_lr, vf_lr = checkpoint['pi_lr'], checkpoint['vf_lr']
+        clip_ratio, target_kl = checkpoint['clip_ratio'], checkpoint['target_kl']
+        if 'eval_env' in checkpoint:
+            eval_env = checkpoint['eval_env']
+        if 'algorithm_logger' in checkpoint:
+            algorithm_logger = checkpoint['algorithm_logger']
+
     # Prepare for interaction with environment
-    start_time = time.time()
-    o, ep_ret, ep_len = env.reset(), 0, 0
+    start_time, start_epoch = time.time(), 0
+    if checkpoint is not None:
+        start_time -= checkpoint['elapsed']
+        start_epoch = checkpoint['epoch']
+    if checkpoint is not None and 'envs' in checkpoint:
+        envs, (o, ep_ret, ep_len) = checkpoint['envs'], checkpoint['episodes']
+        env = envs[0]
+    else:
+        o = np.stack([e.reset() for e in envs])
+        ep_ret, ep_len = np.zeros(num_envs), np.zeros(num_envs, dtype=np.int64)
 
     first_success = True
     first_stable_policy = True
+    if checkpoint is not None:
+        first_success = checkpoint['first_success']
+        first_stable_policy = checkpoint['first_stable_policy']
 
     # Main loop: collect experience in env and update/log each epoch
-    for epoch in range(epochs):
-        for t in range(local_steps_per_epoch):
+    for epoch in range(start_epoch, epochs):
+        # Take on weights and hyperparameters from the PBT driver
+        hparams = dict(pi_lr=pi_lr, vf_lr=vf_lr, clip_ratio=clip_ratio, target_kl=target_kl)
+        if pbt and epoch > 0 and pbt_update(logger.output_dir, ac, hparams):
+            pi_lr, vf_lr = hparams['pi_lr'], hparams['vf_lr']
+            clip_ratio, target_kl = hparams['clip_ratio'], hparams['target_kl']
+            for optimizer, lr in [(pi_optimizer, pi_lr), (vf_optimizer, vf_lr)]:
+                for group in optimizer.param_groups:
+                    group['lr'] = lr
+
+        for t in range(local_steps_per_env):
+            # One batched forward pass for all environment copies
             a, v, logp = ac.step(torch.as_tensor(o, dtype=torch.float32))
 
-            next_o, r, d, _ = env.step(a)
+            steps = [e.step(a_i) for e, a_i in zip(envs, a)]
+            next_o = np.stack([s[0] for s in steps])
+            r = np.array([s[1] for s in steps], dtype=np.float32)
+            d = np.array([s[2] for s in steps])
             ep_ret += r
             ep_len += 1
 
@@ -333,49 +422,33 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
             o = next_o
 
             timeout = ep_len == max_ep_len
-            terminal = d or timeout
-            epoch_ended = t==local_steps_per_epoch-1
-
-            if terminal or epoch_ended:
-                if epoch_ended and not(terminal):
-                    print('Warning: trajectory cut off by epoch at %d steps.'%ep_len, flush=True)
-                # if trajectory didn't reach terminal state, bootstrap value target
-                if timeout or epoch_ended:
-                    _, v, _ = ac.step(torch.as_tensor(o, dtype=torch.float32))
-                else:
-                    v = 0
-                buf.finish_path(v)
-                if terminal:
+            terminal = d | timeout
+            epoch_ended = t==local_steps_per_env-1
+
+            # Finish the trajectories of all copies that terminated, or of
+            # every copy if the epoch is over.
+            finished = np.arange(num_envs) if epoch_ended else np.flatnonzero(terminal)
+
+            # if trajectory didn't reach terminal state, bootstrap value target
+            # (with one forward pass for all copies that need it)
+            last_v = np.zeros(num_envs, dtype=np.float32)
+            bootstrap = finished[timeout[finished] | epoch_ended]
+            if len(bootstrap) > 0:
+                _, last_v[bootstrap], _ = ac.step(torch.as_tensor(o[bootstrap], dtype=torch.float32))
+
+            for i in finished:
+                if epoch_ended and not(terminal[i]):
+                    print('Warning: trajectory cut off by epoch at %d steps.'%ep_len[i], flush=True)
+                buf.finish_path(last_v[i], i)
+                if terminal[i]:
                     # only save EpRet / EpLen if trajectory finished
-                    logger.store(EpRet=ep_ret, EpLen=ep_len)
-                o, ep_ret, ep_len = env.reset(), 0, 0
+                    logger.store(EpRet=ep_ret[i], EpLen=ep_len[i])
+                o[i], ep_ret[i], ep_len[i] = envs[i].reset(), 0, 0
 
 
-        # Save model
-        if ((epoch % save_freq == 0) or (epoch == epochs-1)) and \
-            first_stable_policy:
-            logger.save_state({'env': env}, None)
-
         # Perform PPO update!
         update()
 
-        # Log info about epoch
-        logger.log_tabular('Epoch', epoch)
-        logger.log_tabular('EpRet', with_min_and_max=True)
-        logger.log_tabular('EpLen', average_only=True)
-        logger.log_tabular('VVals', with_min_and_max=True)
-        logger.log_tabular('TotalEnvInteracts', (epoch+1)*steps_per_epoch)
-        logger.log_tabular('LossPi', average_only=True)
-        logger.log_tabular('LossV', average_only=True)
-        logger.log_tabular('DeltaLossPi', average_only=True)
-        logger.log_tabular('DeltaLossV', average_only=True)
-        logger.log_tabular('Entropy', average_only=True)
-        logger.log_tabular('KL', average_only=True)
-        logger.log_tabular('ClipFrac', average_only=True)
-        logger.log_tabular('StopIter', average_only=True)
-        logger.log_tabular('Time', time.time()-start_time)
-        logger.dump_tabular()
-
         o_eval, r_eval, d_eval, ep_ret_eval, ep_len_eval, n_eval = eval_env.reset(), 0, False, 0, 0, 0
         n_successful = 0
         while n_eval < eval_episodes:
@@ -415,7 +488,46 @@ def ppo(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(), seed=0,
             first_stable_policy = False
             print('The found policy is good enough.')
             print(f'It took us {epoch + 1} epochs!')
-            logger.save_state({'env': env}, None)
+
+        # Save model (the one just evaluated, so that a logger's retention 
+        # ranks it by its success ratio)
+        if (epoch % save_freq == 0) or (epoch == epochs-1) or not(first_stable_policy):
+            logger.save_state({'env': env}, None, static=['env'])
+            if pbt:
+                save_pbt_weights(logger.output_dir, ac)
+
+        # Log info about epoch
+        logger.log_tabular('Epoch', epoch)
+        logger.log_tabular('EpRet', with_min_and_max=True)
+        logger.log_tabular('EpLen', average_only=True)
+        logger.log_tabular('VVals', with_min_and_max=True)
+        logger.log_tabular('TotalEnvInteracts', (epoch+1)*steps_per_epoch)
+        logger.log_tabular('LossPi', average_only=True)
+        logger.log_tabular('LossV', average_only=True)
+        logger.log_tabular('DeltaLossPi', average_only=True)
+        logger.log_tabular('DeltaLossV', average_only=True)
+        logger.log_tabular('Entropy', average_only=True)
+        logger.log_tabular('KL', average_only=True)
+        logger.log_tabular('ClipFrac', average_only=True)
+        logger.log_tabular('StopIter', average_only=True)
+        logger.log_tabular('SuccessRatio', n_successful / eval_episodes)
+        logger.log_tabular('Time', time.time()-start_time)
+        logger.dump_tabular()
+
+        # Checkpoint the run, to resume from (with the number of epochs done,
+        # which is all of them once the policy is good enough)
+        if (epoch % save_freq == 0) or (epoch == epochs-1) or not(first_stable_policy):
+            logger.save_checkpoint(dict(
+                epoch=epoch+1 if first_stable_policy else epochs, 
+                elapsed=time.time()-start_time, ac=ac.state_dict(),
+                pi_optimizer=pi_optimizer.state_dict(), 
+                vf_optimizer=vf_optimizer.state_dict(), pi_lr=pi_lr, vf_lr=vf_lr, 
+                clip_ratio=clip_ratio, target_kl=target_kl, envs=envs, 
+                episodes=(o, ep_ret, ep_len), eval_env=eval_env, 
+                algorithm_logger=algorithm_logger, first_success=first_success, 
+                first_stable_policy=first_stable_policy))
+
+        if not(first_stable_policy):
             break
 
     # algorithm_logger.print_statistics()
@@ -435,6 +547,7 @@ if __name__ == '__main__':
     parser.add_argument('--cpu', type=int, default=4)
     parser.add_argument('--steps', type=int, default=4000)
     parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--num_envs', type=int, default=1)
     parser.add_argument('--exp_name', type=str, default='ppo')
     args = parser.parse_args()
 
@@ -446,4 +559,4 @@ if __name__ == '__main__':
     ppo(lambda : gym.make(args.env), actor_critic=core.MLPActorCritic,
         ac_kwargs=dict(hidden_sizes=[args.hid]*args.l), gamma=args.gamma, 
         seed=args.seed, steps_per_epoch=args.steps, epochs=args.epochs,
-        logger_kwargs=logger_kwargs)
\ No newline at end of file
+        num_envs=args.num_envs, logger_kwargs=logger_kwargs)
\ No newline at end of file
@@ -19,6 +19,33 @@ def mlp(sizes, activation, output_activation=nn.Identity):
         layers += [nn.Linear(sizes[j], sizes[j+1]), act()]
     return nn.Sequential(*layers)
 
+class EnsembleLinear(nn.Module):
+    """
+    A stack of ``ensemble_size`` independent linear layers.
+
+    Takes inputs of shape (ensemble_size, batch, in_features), and applies
+    layer k to the k-th batch, all in one batched matmul.
+    """
+
+    def __init__(self, in_features, out_features, ensemble_size):
+        super().__init__()
+        # Same initialization as nn.Linear, independently for each member.
+        bound = 1 / np.sqrt(in_features)
+        self.weight = nn.Parameter(
+            torch.empty(ensemble_size, in_features, out_features).uniform_(-bound, bound))
+        self.bias = nn.Parameter(
+            torch.empty(ensemble_size, 1, out_features).uniform_(-bound, bound))
+
+    def forward(self, x):
+        return torch.baddbmm(self.bias, x, self.weight)
+
+def ensemble_mlp(sizes, activation, ensemble_size, output_activation=nn.Identity):
+    layers = []
+    for j in range(len(sizes)-1):
+        act = activation if j < len(sizes)-2 else output_activation
+        layers += [EnsembleLinear(sizes[j], sizes[j+1], ensemble_size), act()]
+    return nn.Sequential(*layers)
+
 def count_vars(module):
     return sum([np.prod(p.shape) for p in module.parameters()])
 
@@ -27,12 +54,23 @@ LOG_STD_MAX = 2
 LOG_STD_MIN = -20
 
 class SquashedGaussianMLPActor(nn.Module):
+    """
+    With ``ensemble_size``, this is a stack of that many independent actors,
+    which take observations of shape (ensemble_size, batch, obs_dim).
+    """
 
-    def __init__(self, obs_dim, act_dim, hidden_sizes, activation, act_limit):
+    def __init__(self, obs_dim, act_dim, hidden_sizes, activation, act_limit, 
+                 ensemble_size=None):
         super().__init__()
-        self.net = mlp([obs_dim] + list(hidden_sizes), activation, activation)
-        self.mu_layer = nn.Linear(hidden_sizes[-1], act_dim)
-        self.log_std_layer = nn.Linear(hidden_sizes[-1], act_dim)
+        if ensemble_size is None:
+            self.net = mlp([obs_dim] + list(hidden_sizes), activation, activation)
+            self.mu_layer = nn.Linear(hidden_sizes[-1], act_dim)
+            self.log_std_layer = nn.Linear(hidden_sizes[-1], act_dim)
+        else:
+            self.net = ensemble_mlp([obs_dim] + list(hidden_sizes), activation, 
+                                    ensemble_size, activation)
+            self.mu_layer = EnsembleLinear(hidden_sizes[-1], act_dim, ensemble_size)
+            self.log_std_layer = EnsembleLinear(hidden_sizes[-1], act_dim, ensemble_size)
         self.act_limit = act_limit
 
     def forward(self, obs, deterministic=False, with_logprob=True):
@@ -57,7 +95,7 @@ class SquashedGaussianMLPActor(nn.Module):
             # and look in appendix C. This is a more numerically-stable equivalent to Eq 21.
             # Try deriving it yourself as a (very difficult) exercise. :)
             logp_pi = pi_distribution.log_prob(pi_action).sum(axis=-1)
-            logp_pi -= (2*(np.log(2) - pi_action - F.softplus(-2*pi_action))).sum(axis=1)
+            logp_pi -= (2*(np.log(2) - pi_action - F.softplus(-2*pi_action))).sum(axis=-1)
         else:
             logp_pi = None
 
@@ -77,6 +115,22 @@ class MLPQFunction(nn.Module):
         q = self.q(torch.cat([obs, act], dim=-1))
         return torch.squeeze(q, -1) # Critical to ensure q has right shape.
 
+class EnsembleMLPQFunction(nn.Module):
+    """
+    ``num_q`` independent Q-functions, evaluated together in a single call.
+    """
+
+    def __init__(self, obs_dim, act_dim, hidden_sizes, activation, num_q=2):
+        super().__init__()
+        self.num_q = num_q
+        self.q = ensemble_mlp([obs_dim + act_dim] + list(hidden_sizes) + [1], 
+                              activation, num_q)
+
+    def forward(self, obs, act):
+        x = torch.cat([obs, act], dim=-1)
+        q = self.q(x.expand(self.num_q, *x.shape))
+        return torch.squeeze(q, -1) # Shape (num_q, batch): one row per Q-function.
+
 class MLPActorCritic(nn.Module):
 
     def __init__(self, observation_space, action_space, hidden_sizes=(256,256),
@@ -96,3 +150,91 @@ class MLPActorCritic(nn.Module):
         with torch.no_grad():
             a, _ = self.pi(obs, deterministic, False)
             return a.numpy()
+
+
+class EnsembleMLPActorCritic(nn.Module):
+
+    def __init__(self, observation_space, action_space, hidden_sizes=(256,256),
+                 activation=nn.ReLU, num_q=2):
+        super().__init__()
+
+        obs_dim = observation_space.shape[0]
+        act_dim = action_space.shape[0]
+        act_limit = action_space.high[0]
+
+        # build policy and value functions
+        self.pi = SquashedGaussianMLPActor(obs_dim, act_dim, hidden_sizes, activation, act_limit)
+        self.q = EnsembleMLPQFunction(obs_dim, act_dim, hidden_sizes, activation, num_q)
+
+    def act(self, obs, deterministic=False):
+        with torch.no_grad():
+            a, _ = self.pi(obs, deterministic, False)
+            return a.numpy()
+
+
+class PopulationMLPQFunctions(nn.Module):
+    """
+    The two Q-functions of each of ``num_members`` members of a population,
+    evaluated together in a single call.
+    """
+
+    def __init__(self, obs_dim, act_dim, hidden_sizes, activation, num_members):
+        super().__init__()
+        self.num_members = num_members
+        self.q = ensemble_mlp([obs_dim + act_dim] + list(hidden_sizes) + [1], 
+                              activation, 2 * num_members)
+
+    def forward(self, obs, act):
+        x = torch.cat([obs, act], dim=-1)
+        x = x.unsqueeze(1).expand(-1, 2, -1, -1).reshape(2 * self.num_members, *x.shape[1:])
+        q = torch.squeeze(self.q(x), -1)
+        return q.view(self.num_members, 2, -1) # Shape (num_members, 2, batch).
+
+
+class PopulationMLPActorCritic(nn.Module):
+    """
+    ``num_members`` independent ``MLPActorCritic`` instances, stored as 
+    stacked weights so that all of them are evaluated with batched matmuls.
+
+    Inputs and outputs have a leading member dimension: ``pi`` and ``act``
+    take observations of shape (num_members, batch, obs_dim), and ``q``
+    returns Q-values of shape (num_members, 2, batch), for each member's
+    Q1 and Q2. Use ``member`` to get a single member back as an 
+    ``MLPActorCritic``.
+    """
+
+    def __init__(self, observation_space, action_space, hidden_sizes=(256,256),
+                 activation=nn.ReLU, num_members=1):
+        super().__init__()
+
+        obs_dim = observation_space.shape[0]
+        act_dim = action_space.shape[0]
+        act_limit = action_space.high[0]
+        self.member_args = (observation_space, action_space, hidden_sizes, activation)
+
+        # build policy and value functions
+        self.pi = SquashedGaussianMLPActor(obs_dim, act_dim, hidden_sizes, activation, 
+                                           act_limit, num_members)
+        self.q = PopulationMLPQFunctions(obs_dim, act_dim, hidden_sizes, activation, 
+                                         num_members)
+
+    def act(self, obs, deterministic=False):
+        with torch.no_grad():
+            a, _ = self.pi(obs, deterministic, False)
+            return a.numpy()
+
+    def member(self, k, ac=None):
+        """
+        Copy the weights of member k into an ``MLPActorCritic`` (``ac``, or
+        a new one), and return it.
+        """
+        ac = ac or MLPActorCritic(*self.member_args)
+        linears = lambda module: [m for m in module.modules() 
+                                  if isinstance(m, (nn.Linear, EnsembleLinear))]
+        with torch.no_grad():
+            for src, dst, i in [(self.pi, ac.pi, k), (self.q, ac.q1, 2*k), 
+                                (self.q, ac.q2, 2*k+1)]:
+                for src_layer, dst_layer in zip(linears(src), linears(dst)):
+                    dst_layer.weight.copy_(src_layer.weight[i].t())
+                    dst_layer.bias.copy_(src_layer.bias[i, 0])
+        return ac
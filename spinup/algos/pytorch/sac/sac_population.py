@@ -0,0 +1,441 @@
+from copy import deepcopy
+import numpy as np
+import torch
+from torch.optim import Adam
+import gym
+import os.path as osp
+import time
+import spinup.algos.pytorch.sac.core as core
+from spinup.utils.logx import EpochLogger, RunStopped
+from spinup.utils.flat_params import flatten_parameters
+from spinup.utils.replay_buffers import BatchGatherer
+from spinup.utils.replay_storage import ReplayStorage
+
+
+class PopulationReplayBuffer:
+    """
+    A simple FIFO experience replay buffer for a population of SAC agents,
+    which stores one transition for every member at each step.
+
+    Arrays have a leading member dimension, and batches hold an independent
+    sample of each member's transitions: shape (num_members, batch_size, ...).
+    As for ``sac``'s ``ReplayBuffer``, the arrays can live in memory-mapped
+    files in ``storage_dir``, and batches are gathered into reused tensors.
+    """
+
+    def __init__(self, obs_dim, act_dim, size, num_members, storage_dir=None):
+        self.storage = ReplayStorage(storage_dir)
+        obs_shape = (num_members,) + core.combined_shape(size, obs_dim)
+        self.obs_buf = self.storage.array('obs', obs_shape)
+        self.obs2_buf = self.storage.array('obs2', obs_shape)
+        act_shape = (num_members,) + core.combined_shape(size, act_dim)
+        self.act_buf = self.storage.array('act', act_shape)
+        self.rew_buf = self.storage.array('rew', (num_members, size))
+        self.done_buf = self.storage.array('done', (num_members, size))
+        state = self.storage.load_state()
+        self.ptr, self.size, self.max_size = state.get('ptr', 0), state.get('size', 0), size
+        # Transition i of member k is row k * size + i of the arrays with
+        # their first two dimensions merged.
+        self.offsets = np.arange(num_members)[:, None] * size
+        self.gatherer = BatchGatherer()
+
+    def store(self, obs, act, rew, next_obs, done):
+        self.obs_buf[:, self.ptr] = obs
+        self.obs2_buf[:, self.ptr] = next_obs
+        self.act_buf[:, self.ptr] = act
+        self.rew_buf[:, self.ptr] = rew
+        self.done_buf[:, self.ptr] = done
+        self.ptr = (self.ptr+1) % self.max_size
+        self.size = min(self.size+1, self.max_size)
+
+    def sample_batch(self, batch_size=32):
+        idxs = self.offsets + np.random.randint(0, self.size, size=(len(self.offsets), batch_size))
+        flat = lambda arr: arr.reshape((-1,) + arr.shape[2:])
+        return self.gatherer.take_all(idxs, obs=flat(self.obs_buf), obs2=flat(self.obs2_buf),
+                                      act=flat(self.act_buf), rew=flat(self.rew_buf),
+                                      done=flat(self.done_buf))
+
+    def save(self):
+        """Flush a memory-mapped buffer to disk, so it can be restored."""
+        self.storage.save_state(ptr=self.ptr, size=self.size)
+
+    def state_dict(self):
+        """The contents and pointers of the buffer, for a checkpoint."""
+        return self.storage.state_dict(ptr=self.ptr, size=self.size)
+
+    def load_state_dict(self, state_dict):
+        state = self.storage.load_state_dict(state_dict)
+        self.ptr, self.size = state['ptr'], state['size']
+
+
+
+def sac_population(env_fn, actor_critic=core.PopulationMLPActorCritic, ac_kwargs=dict(),
+        num_members=10, seed=0, steps_per_epoch=4000, epochs=100, replay_size=int(1e6),
+        gamma=0.99, polyak=0.995, lr=1e-3, alpha=0.2, batch_size=100, start_steps=10000,
+        update_after=1000, update_every=50, num_test_episodes=10, max_ep_len=1000,
+        persist_replay=False, resume=False, logger_kwargs=dict(), save_freq=1,
+        checkpoint_freq=10):
+    """
+    Soft Actor-Critic (SAC), for a population of independent agents
+
+    Trains ``num_members`` agents with the same hyperparameters but different
+    seeds (``seed``, ``seed + 1``, ...) in a single process. The members
+    learn independently, and each steps its own copy of the environment,
+    seeded with its own seed; but they all draw from one numpy and torch
+    random stream, so a member's run differs from the one ``sac`` would
+    make with its seed alone. The agents' networks are stored as
+    stacked weights (see ``core.PopulationMLPActorCritic``), so each update
+    runs batched matmuls for the whole population. For small networks, this
+    gets much more work out of a core than running one ``sac`` process per
+    seed.
+
+    Every member logs to its own output directory, as a separate ``sac``
+    run with its seed would: if ``logger_kwargs['output_dir']`` ends in
+    ``_s<seed>`` (as from ``setup_logger_kwargs``), member k logs to the
+    directory ending in ``_s<seed + k>`` instead, and otherwise to the
+    directory with ``_m<k>`` appended. The saved model of each member is a
+    plain ``core.MLPActorCritic``. The checkpoint of the whole population
+    (see ``resume``) is kept in the first member's directory.
+
+    With a ``watchdog`` in ``logger_kwargs``, each member gets a copy of it,
+    and a member it stops is dropped on its own: it logs and saves nothing 
+    more (its weights keep being updated with the rest of the population),
+    while the others carry on. The run ends with ``RunStopped`` once every
+    member has been stopped.
+
+    Args:
+        env_fn : A function which creates a copy of the environment.
+            The environment must satisfy the OpenAI Gym API.
+
+        actor_critic: The constructor method for a PyTorch Module like
+            ``core.PopulationMLPActorCritic``, which takes ``num_members``
+            and has ``pi`` and ``q`` modules, an ``act`` method, and a
+            ``member`` method, all with a leading member dimension. (See
+            ``core.PopulationMLPActorCritic`` for the shapes.)
+
+        ac_kwargs (dict): Any kwargs appropriate for the ActorCritic object
+            you provided to SAC.
+
+        num_members (int): Number of agents in the population.
+
+        seed (int): Seed for random number generators, and for the first
+            member's environment.
+
+        persist_replay (bool): Keep the replay buffer (of the whole 
+            population) in memory-mapped files under the first member's
+            ``output_dir/replay_buffer``, as for ``sac``.
+
+        The other args are as for ``sac``.
+
+    """
+
+    config = locals()
+    # (Worked out once, so all members share the default directory's timestamp.)
+    base_output_dir = logger_kwargs.get('output_dir') or \
+        "/tmp/experiments/%i"%int(time.time())
+    def member_logger_kwargs(k):
+        # (Copied, so members don't share a watchdog or retention.)
+        kwargs = deepcopy(logger_kwargs)
+        output_dir = base_output_dir
+        if output_dir.endswith('_s%d'%seed):
+            output_dir = output_dir[:-len('_s%d'%seed)] + '_s%d'%(seed + k)
+        elif k > 0 or 'output_dir' not in kwargs:
+            output_dir = output_dir + '_m%d'%k
+        kwargs['output_dir'] = output_dir
+        return kwargs
+    loggers = [EpochLogger(resume=resume, **member_logger_kwargs(k)) for k in range(num_members)]
+    for k, logger in enumerate(loggers):
+        logger.save_config(dict(config, seed=seed + k, member=k))
+
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    envs, test_envs = [env_fn() for _ in range(num_members)], [env_fn() for _ in range(num_members)]
+    for k in range(num_members):
+        envs[k].seed(seed + k)
+        test_envs[k].seed(seed + k)
+    env = envs[0]
+    obs_dim = env.observation_space.shape
+    act_dim = env.action_space.shape[0]
+
+    # Create actor-critic module and target networks
+    ac = actor_critic(env.observation_space, env.action_space,
+                      num_members=num_members, **ac_kwargs)
+    ac_targ = deepcopy(ac)
+
+    # Freeze target networks with respect to optimizers (only update via polyak averaging)
+    for p in ac_targ.parameters():
+        p.requires_grad = False
+
+    # Keep the parameters of both in flat tensors, to polyak average in one op
+    ac_flat, ac_targ_flat = flatten_parameters(ac), flatten_parameters(ac_targ)
+
+    # List of policy parameters (save this for convenience)
+    pi_params = list(ac.pi.parameters())
+
+    # Experience buffer
+    replay_dir = None
+    if persist_replay and loggers[0].output_dir is not None:
+        replay_dir = osp.join(loggers[0].output_dir, 'replay_buffer')
+    replay_buffer = PopulationReplayBuffer(obs_dim=obs_dim, act_dim=act_dim,
+                                           size=replay_size, num_members=num_members,
+                                           storage_dir=replay_dir)
+
+    # Count variables (protip: try to get a feel for how different size networks behave!)
+    var_counts = tuple(core.count_vars(module) // num_members for module in [ac.pi, ac.q])
+    loggers[0].log('\nNumber of parameters per member: \t pi: %d, \t q1 and q2: %d\n'%var_counts)
+
+    # Set up function for computing SAC Q-losses, one for each member
+    def compute_loss_q(data):
+        o, a, r, o2, d = data['obs'], data['act'], data['rew'], data['obs2'], data['done']
+
+        q = ac.q(o, a)
+
+        # Bellman backup for Q functions
+        with torch.no_grad():
+            # Target actions come from *current* policy
+            a2, logp_a2 = ac.pi(o2)
+
+            # Target Q-values
+            q_pi_targ = ac_targ.q(o2, a2).min(1)[0]
+            backup = r + gamma * (1 - d) * (q_pi_targ - alpha * logp_a2)
+
+        # MSE loss against Bellman backup, summed over Q1 and Q2
+        loss_q = ((q - backup.unsqueeze(1))**2).mean(2).sum(1)
+
+        # Useful info for logging
+        q_info = q.detach().numpy()
+
+        return loss_q, q_info
+
+    # Set up function for computing SAC pi losses, one for each member
+    def compute_loss_pi(data):
+        o = data['obs']
+        pi, logp_pi = ac.pi(o)
+        q_pi = ac.q(o, pi).min(1)[0]
+
+        # Entropy-regularized policy loss
+        loss_pi = (alpha * logp_pi - q_pi).mean(1)
+
+        # Useful info for logging
+        pi_info = logp_pi.detach().numpy()
+
+        return loss_pi, pi_info
+
+    # Set up optimizers for policy and q-function. (Adam works elementwise,
+    # so one optimizer for the stacked weights updates each member as its
+    # own optimizer would.)
+    pi_optimizer = Adam(pi_params, lr=lr)
+    q_optimizer = Adam(ac.q.parameters(), lr=lr)
+
+    # Set up model saving: each member is saved as a plain MLPActorCritic
+    members = [ac.member(k) for k in range(num_members)]
+    for logger, member in zip(loggers, members):
+        logger.setup_pytorch_saver(member)
+
+    def update(data):
+        # First run one gradient descent step for Q1 and Q2. The members'
+        # losses are summed, which keeps each member's gradients its own.
+        q_optimizer.zero_grad()
+        loss_q, q_info = compute_loss_q(data)
+        loss_q.sum().backward()
+        q_optimizer.step()
+
+        # Next run one gradient descent step for pi. Only differentiate
+        # with respect to the policy parameters, so you don't waste
+        # computational effort computing gradients for the Q-networks.
+        loss_pi, pi_info = compute_loss_pi(data)
+        pi_grads = torch.autograd.grad(loss_pi.sum(), pi_params)
+        for p, g in zip(pi_params, pi_grads):
+            p.grad = g
+        pi_optimizer.step()
+
+        # Record things
+        loss_q, loss_pi = loss_q.detach().numpy(), loss_pi.detach().numpy()
+        for k in np.flatnonzero(~stopped):
+            loggers[k].store(LossQ=loss_q[k], Q1Vals=q_info[k, 0], Q2Vals=q_info[k, 1],
+                             LossPi=loss_pi[k], LogPi=pi_info[k])
+
+        # Finally, update target networks by polyak averaging.
+        with torch.no_grad():
+            # NB: We use an in-place operation "lerp_" to update target params
+            # (all at once, through their flat tensor), as opposed to "lerp",
+            # which would make a new tensor.
+            ac_targ_flat.lerp_(ac_flat, 1 - polyak)
+
+    def get_action(o, deterministic=False):
+        # One observation per member, as a batch of one
+        o = torch.as_tensor(o, dtype=torch.float32).unsqueeze(1)
+        return ac.act(o, deterministic)[:, 0]
+
+    def test_agent():
+        for j in range(num_test_episodes):
+            o = np.stack([e.reset() for e in test_envs])
+            ep_ret, ep_len = np.zeros(num_members), np.zeros(num_members, dtype=np.int64)
+            done = np.zeros(num_members, dtype=bool)
+            while not done.all():
+                # Take deterministic actions at test time, for all members
+                # still in their episodes
+                a = get_action(o, True)
+                for k in np.flatnonzero(~done):
+                    o[k], r, d, _ = test_envs[k].step(a[k])
+                    ep_ret[k] += r
+                    ep_len[k] += 1
+                    done[k] = d or (ep_len[k] == max_ep_len)
+            for k in np.flatnonzero(~stopped):
+                loggers[k].store(TestEpRet=ep_ret[k], TestEpLen=ep_len[k])
+
+    # Which members their watchdogs have stopped
+    stopped = np.zeros(num_members, dtype=bool)
+
+    # Pick up from a checkpoint, when resuming. The other members' loggers
+    # only checkpoint their progress files. (This restores the random 
+    # number generators, so nothing else may draw from them before the 
+    # main loop.)
+    for logger in loggers[1:]:
+        logger.load_checkpoint()
+    checkpoint = loggers[0].load_checkpoint()
+    if checkpoint is not None:
+        ac.load_state_dict(checkpoint['ac'])
+        ac_targ.load_state_dict(checkpoint['ac_targ'])
+        pi_optimizer.load_state_dict(checkpoint['pi_optimizer'])
+        q_optimizer.load_state_dict(checkpoint['q_optimizer'])
+        replay_buffer.load_state_dict(checkpoint['replay_buffer'])
+        if 'test_envs' in checkpoint:
+            test_envs = checkpoint['test_envs']
+        if 'stopped' in checkpoint:
+            stopped = checkpoint['stopped']
+    elif replay_buffer.size > 0:
+        # Don't refill the warm-up data a restored buffer already holds.
+        loggers[0].log('Restored %d transitions into the replay buffer.'%replay_buffer.size)
+        start_steps = max(start_steps - replay_buffer.size, 0)
+        update_after = max(update_after - replay_buffer.size, 0)
+
+    # Prepare for interaction with environment
+    total_steps = steps_per_epoch * epochs
+    start_time, start_t = time.time(), 0
+    if checkpoint is not None:
+        start_time -= checkpoint['elapsed']
+        start_t = checkpoint['epoch'] * steps_per_epoch
+    if checkpoint is not None and 'envs' in checkpoint:
+        envs, (o, ep_ret, ep_len) = checkpoint['envs'], checkpoint['episodes']
+    else:
+        o = np.stack([e.reset() for e in envs])
+        ep_ret, ep_len = np.zeros(num_members), np.zeros(num_members, dtype=np.int64)
+
+    # Main loop: collect experience in env and update/log each epoch
+    for t in range(start_t, total_steps):
+
+        # Until start_steps have elapsed, randomly sample actions
+        # from a uniform distribution for better exploration. Afterwards,
+        # use the learned policy.
+        if t > start_steps:
+            a = get_action(o)
+        else:
+            a = np.stack([e.action_space.sample() for e in envs])
+
+        # Step the envs
+        steps = [e.step(a_k) for e, a_k in zip(envs, a)]
+        o2 = np.stack([s[0] for s in steps])
+        r = np.array([s[1] for s in steps], dtype=np.float32)
+        d = np.array([s[2] for s in steps])
+        ep_ret += r
+        ep_len += 1
+
+        # Ignore the "done" signal if it comes from hitting the time
+        # horizon (that is, when it's an artificial terminal signal
+        # that isn't based on the agent's state)
+        d = d & (ep_len != max_ep_len)
+
+        # Store experience to replay buffer
+        replay_buffer.store(o, a, r, o2, d)
+
+        # Super critical, easy to overlook step: make sure to update
+        # most recent observation!
+        o = o2
+
+        # End of trajectory handling
+        for k in np.flatnonzero(d | (ep_len == max_ep_len)):
+            if not stopped[k]:
+                loggers[k].store(EpRet=ep_ret[k], EpLen=ep_len[k])
+            o[k], ep_ret[k], ep_len[k] = envs[k].reset(), 0, 0
+
+        # Update handling
+        if t >= update_after and t % update_every == 0:
+            for j in range(update_every):
+                batch = replay_buffer.sample_batch(batch_size)
+                update(data=batch)
+
+        # End of epoch handling
+        if (t+1) % steps_per_epoch == 0:
+            epoch = (t+1) // steps_per_epoch
+
+            # Save model
+            if (epoch % save_freq == 0) or (epoch == epochs):
+                for k in np.flatnonzero(~stopped):
+                    ac.member(k, members[k])
+                    loggers[k].save_state({'env': envs[k]}, None, static=['env'])
+                replay_buffer.save()
+
+            # Test the performance of the deterministic version of the agents.
+            test_agent()
+
+            # Log info about epoch
+            for k in np.flatnonzero(~stopped):
+                logger = loggers[k]
+                logger.log_tabular('Epoch', epoch)
+                logger.log_tabular('EpRet', with_min_and_max=True)
+                logger.log_tabular('TestEpRet', with_min_and_max=True)
+                logger.log_tabular('EpLen', average_only=True)
+                logger.log_tabular('TestEpLen', average_only=True)
+                logger.log_tabular('TotalEnvInteracts', t)
+                logger.log_tabular('Q1Vals', with_min_and_max=True)
+                logger.log_tabular('Q2Vals', with_min_and_max=True)
+                logger.log_tabular('LogPi', with_min_and_max=True)
+                logger.log_tabular('LossPi', average_only=True)
+                logger.log_tabular('LossQ', average_only=True)
+                logger.log_tabular('Time', time.time()-start_time)
+                try:
+                    logger.dump_tabular()
+                except RunStopped as e:
+                    # Drop just this member (its row is already logged).
+                    logger.log('Stopped member %d: %s'%(k, e), color='red')
+                    stopped[k] = True
+
+            # Checkpoint the run, to resume from. (The first member's 
+            # checkpoint, with the state of the whole population, goes last.)
+            if (epoch % checkpoint_freq == 0) or (epoch == epochs):
+                for logger in loggers[1:]:
+                    logger.save_checkpoint(dict(epoch=epoch))
+                loggers[0].save_checkpoint(dict(
+                    epoch=epoch, elapsed=time.time()-start_time, ac=ac.state_dict(),
+                    ac_targ=ac_targ.state_dict(), pi_optimizer=pi_optimizer.state_dict(),
+                    q_optimizer=q_optimizer.state_dict(),
+                    replay_buffer=replay_buffer.state_dict(), stopped=stopped,
+                    envs=envs, test_envs=test_envs, episodes=(o, ep_ret, ep_len)))
+
+            if stopped.all():
+                raise RunStopped('Every member of the population was stopped.')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env', type=str, default='HalfCheetah-v2')
+    parser.add_argument('--hid', type=int, default=64)
+    parser.add_argument('--l', type=int, default=2)
+    parser.add_argument('--gamma', type=float, default=0.99)
+    parser.add_argument('--seed', '-s', type=int, default=0)
+    parser.add_argument('--num_members', type=int, default=10)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--exp_name', type=str, default='sac_population')
+    args = parser.parse_args()
+
+    from spinup.utils.run_utils import setup_logger_kwargs
+    logger_kwargs = setup_logger_kwargs(args.exp_name, args.seed)
+
+    torch.set_num_threads(torch.get_num_threads())
+
+    sac_population(lambda : gym.make(args.env), actor_critic=core.PopulationMLPActorCritic,
+        ac_kwargs=dict(hidden_sizes=[args.hid]*args.l), num_members=args.num_members,
+        gamma=args.gamma, seed=args.seed, epochs=args.epochs,
+        logger_kwargs=logger_kwargs)
@@ -17,6 +17,37 @@ def mlp(sizes, activation, output_activation=nn.Identity):
         layers += [nn.Linear(sizes[j], sizes[j+1]), act()]
     return nn.Sequential(*layers)
 
+class EnsembleLinear(nn.Module):
+    """
+    A stack of ``ensemble_size`` independent linear layers.
+
+    Takes inputs of shape (ensemble_size, batch, in_features), and applies
+    layer k to the k-th batch, all in one batched matmul.
+    """
+
+    def __init__(self, in_features, out_features, ensemble_size):
+        super().__init__()
+        # Same initialization as nn.Linear, independently for each member.
+        bound = 1 / np.sqrt(in_features)
+        self.weight = nn.Parameter(
+            torch.empty(ensemble_size, in_features, out_features).uniform_(-bound, bound))
+        self.bias = nn.Parameter(
+            torch.empty(ensemble_size, 1, out_features).uniform_(-bound, bound))
+
+    def forward(self, x):
+        return torch.baddbmm(self.bias, x, self.weight)
+
+    def forward_member(self, x, k):
+        # Layer k alone, on inputs of shape (batch, in_features).
+        return torch.addmm(self.bias[k], x, self.weight[k])
+
+def ensemble_mlp(sizes, activation, ensemble_size, output_activation=nn.Identity):
+    layers = []
+    for j in range(len(sizes)-1):
+        act = activation if j < len(sizes)-2 else output_activation
+        layers += [EnsembleLinear(sizes[j], sizes[j+1], ensemble_size), act()]
+    return nn.Sequential(*layers)
+
 def count_vars(module):
     return sum([np.prod(p.shape) for p in module.parameters()])
 
@@ -42,6 +73,29 @@ class MLPQFunction(nn.Module):
         q = self.q(torch.cat([obs, act], dim=-1))
         return torch.squeeze(q, -1) # Critical to ensure q has right shape.
 
+class EnsembleMLPQFunction(nn.Module):
+    """
+    ``num_q`` independent Q-functions, evaluated together in a single call.
+    """
+
+    def __init__(self, obs_dim, act_dim, hidden_sizes, activation, num_q=2):
+        super().__init__()
+        self.num_q = num_q
+        self.q = ensemble_mlp([obs_dim + act_dim] + list(hidden_sizes) + [1], 
+                              activation, num_q)
+
+    def forward(self, obs, act):
+        x = torch.cat([obs, act], dim=-1)
+        q = self.q(x.expand(self.num_q, *x.shape))
+        return torch.squeeze(q, -1) # Shape (num_q, batch): one row per Q-function.
+
+    def forward_member(self, obs, act, k=0):
+        # Q-function k alone, without computing the others: same as forward(obs, act)[k].
+        x = torch.cat([obs, act], dim=-1)
+        for layer in self.q:
+            x = layer.forward_member(x, k) if isinstance(layer, EnsembleLinear) else layer(x)
+        return torch.squeeze(x, -1)
+
 class MLPActorCritic(nn.Module):
 
     def __init__(self, observation_space, action_space, hidden_sizes=(256,256),
@@ -60,3 +114,22 @@ class MLPActorCritic(nn.Module):
     def act(self, obs):
         with torch.no_grad():
             return self.pi(obs).numpy()
+
+
+class EnsembleMLPActorCritic(nn.Module):
+
+    def __init__(self, observation_space, action_space, hidden_sizes=(256,256),
+                 activation=nn.ReLU, num_q=2):
+        super().__init__()
+
+        obs_dim = observation_space.shape[0]
+        act_dim = action_space.shape[0]
+        act_limit = action_space.high[0]
+
+        # build policy and value functions
+        self.pi = MLPActor(obs_dim, act_dim, hidden_sizes, activation, act_limit)
+        self.q = EnsembleMLPQFunction(obs_dim, act_dim, hidden_sizes, activation, num_q)
+
+    def act(self, obs):
+        with torch.no_grad():
+            return self.pi(obs).numpy()
@@ -88,7 +88,7 @@ class VPGBuffer:
 def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0, 
         steps_per_epoch=4000, epochs=50, gamma=0.99, pi_lr=3e-4,
         vf_lr=1e-3, train_v_iters=80, lam=0.97, max_ep_len=1000,
-        logger_kwargs=dict(), save_freq=10):
+        resume=False, logger_kwargs=dict(), save_freq=10):
     """
     Vanilla Policy Gradient 
 
@@ -169,10 +169,18 @@ def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0,
 
         max_ep_len (int): Maximum length of trajectory / episode / rollout.
 
+        resume (bool): Pick up from the last checkpoint in the output 
+            directory, if there is one. Every ``save_freq`` epochs, the 
+            full state of the run (networks, optimizers, environment, random
+            number generators and counters, of every process) is 
+            checkpointed, so a resumed run (with the same number of 
+            processes) carries on exactly as if it hadn't been interrupted,
+            appending to the progress log.
+
         logger_kwargs (dict): Keyword args for EpochLogger.
 
         save_freq (int): How often (in terms of gap between epochs) to save
-            the current policy and value function.
+            the current policy and value function, and checkpoint the run.
 
     """
 
@@ -180,7 +188,7 @@ def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0,
     setup_pytorch_for_mpi()
 
     # Set up logger and save configuration
-    logger = EpochLogger(**logger_kwargs)
+    logger = EpochLogger(resume=resume, **logger_kwargs)
     logger.save_config(locals())
 
     # Random seed
@@ -264,12 +272,28 @@ def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0,
                      DeltaLossPi=(loss_pi.item() - pi_l_old),
                      DeltaLossV=(loss_v.item() - v_l_old))
 
+    # Pick up from a checkpoint, when resuming. (This restores the random
+    # number generators, so nothing else may draw from them before the
+    # main loop.)
+    checkpoint = logger.load_checkpoint()
+    if checkpoint is not None:
+        ac.load_state_dict(checkpoint['ac'])
+        pi_optimizer.load_state_dict(checkpoint['pi_optimizer'])
+        vf_optimizer.load_state_dict(checkpoint['vf_optimizer'])
+
     # Prepare for interaction with environment
-    start_time = time.time()
-    o, ep_ret, ep_len = env.reset(), 0, 0
+    start_time, start_epoch = time.time(), 0
+    if checkpoint is not None:
+        start_time -= checkpoint['elapsed']
+        start_epoch = checkpoint['epoch']
+    if checkpoint is not None and 'env' in checkpoint:
+        env, o = checkpoint['env'], checkpoint['o']
+    else:
+        o = env.reset()
+    ep_ret, ep_len = 0, 0
 
     # Main loop: collect experience in env and update/log each epoch
-    for epoch in range(epochs):
+    for epoch in range(start_epoch, epochs):
         for t in range(local_steps_per_epoch):
             a, v, logp = ac.step(torch.as_tensor(o, dtype=torch.float32))
 
@@ -305,7 +329,7 @@ def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0,
 
         # Save model
         if (epoch % save_freq == 0) or (epoch == epochs-1):
-            logger.save_state({'env': env}, None)
+            logger.save_state({'env': env}, None, static=['env'])
 
         # Perform VPG update!
         update()
@@ -325,6 +349,13 @@ def vpg(env_fn, actor_critic=core.MLPActorCritic, ac_kwargs=dict(),  seed=0,
         logger.log_tabular('Time', time.time()-start_time)
         logger.dump_tabular()
 
+        # Checkpoint the run, to resume from (with the number of epochs done)
+        if (epoch % save_freq == 0) or (epoch == epochs-1):
+            logger.save_checkpoint(dict(
+                epoch=epoch+1, elapsed=time.time()-start_time, ac=ac.state_dict(),
+                pi_optimizer=pi_optimizer.state_dict(), 
+                vf_optimizer=vf_optimizer.state_dict(), env=env, o=o))
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
@@ -1,22 +1,24 @@
 import spinup
 from spinup.user_config import DEFAULT_BACKEND
-from spinup.utils.run_utils import ExperimentGrid
 from spinup.utils.serialization_utils import convert_json
 import argparse
-import gym
+import importlib
 import json
-import os, subprocess, sys
+import os, runpy, sys
 import os.path as osp
 import string
-import tensorflow as tf
-import torch
 from copy import deepcopy
 from textwrap import dedent
 
+# NOTE: Heavy dependencies (gym, the experiment grid, and the tensorflow or
+# torch backend) are only imported once we know an algorithm is being run,
+# so that the utilities and the help message start up quickly.
+
 
 # Command line args that will go to ExperimentGrid.run, and must possess unique
 # values (therefore must be treated separately).
-RUN_KEYS = ['num_cpu', 'data_dir', 'datestamp']
+RUN_KEYS = ['num_cpu', 'data_dir', 'datestamp', 'max_cpu', 'num_threads', 
+            'warm_start', 'reuse', 'queue']
 
 # Command line sweetener, allowing short-form flags for common, longer flags.
 SUBSTITUTIONS = {'env': 'env_name',
@@ -55,6 +57,13 @@ def parse_and_execute_grid_search(cmd, args):
 
     algo = eval('spinup.'+cmd)
 
+    # Make the algorithm's backend available to the args evaluated below,
+    # eg so that "--act torch.nn.ReLU" works.
+    if cmd.endswith('_tf1'):
+        backend_modules = dict(tf=importlib.import_module('tensorflow'))
+    else:
+        backend_modules = dict(torch=importlib.import_module('torch'))
+
     # Before all else, check to see if any of the flags is 'help'.
     valid_help = ['--help', '-h', 'help']
     if any([arg in valid_help for arg in args]):
@@ -67,7 +76,7 @@ def parse_and_execute_grid_search(cmd, args):
         # than just strings at the command line (eg allows for
         # users to give functions as args).
         try:
-            return eval(arg)
+            return eval(arg, globals(), backend_modules)
         except:
             return arg
 
@@ -153,6 +162,7 @@ def parse_and_execute_grid_search(cmd, args):
 
     # Special handling for environment: make sure that env_name is a real,
     # registered gym environment.
+    import gym
     valid_envs = [e.id for e in list(gym.envs.registry.all())]
     assert 'env_name' in arg_dict, \
         friendly_err("You did not give a value for --env_name! Add one and try again.")
@@ -174,6 +184,7 @@ def parse_and_execute_grid_search(cmd, args):
 
 
     # Construct and execute the experiment grid.
+    from spinup.utils.run_utils import ExperimentGrid
     eg = ExperimentGrid(name=exp_name)
     for k,v in arg_dict.items():
         eg.add(k, v, shorthand=given_shorthands.get(k))
@@ -237,10 +248,11 @@ if __name__ == '__main__':
         print(special_info)
 
     elif cmd in valid_utils:
-        # Execute the correct utility file.
+        # Execute the correct utility file, in this process (which hasn't
+        # loaded any backend), passing all arguments through.
         runfile = osp.join(osp.abspath(osp.dirname(__file__)), 'utils', cmd +'.py')
-        args = [sys.executable if sys.executable else 'python', runfile] + sys.argv[2:]
-        subprocess.check_call(args, env=os.environ)
+        sys.argv = [runfile] + sys.argv[2:]
+        runpy.run_module('spinup.utils.' + cmd, run_name='__main__', alter_sys=True)
     else:
         # Assume that the user plans to execute an algorithm. Run custom
         # parsing on the arguments and build a grid search to execute.
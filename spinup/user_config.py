@@ -24,4 +24,10 @@ DEFAULT_SHORTHAND = True
 
 # Tells the GridSearch how many seconds to pause for before launching 
 # experiments.
-WAIT_BEFORE_LAUNCH = 0
\ No newline at end of file
+WAIT_BEFORE_LAUNCH = 0
+
+# Modules which the server for warm-started experiments (see call_experiment)
+# imports once, before it forks a process for each experiment. Modules which
+# fail to import are skipped. (Leave out anything which initializes MPI, like
+# spinup.utils.mpi_tools, since processes shouldn't fork after that.)
+WARM_START_PRELOAD = ['numpy', 'scipy.signal', 'gym', 'torch', 'cloudpickle']
@@ -1,9 +1,10 @@
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
 from spinup.utils.constants import PlottingConstants
 
+# pandas and matplotlib are imported where they are used, so that importing
+# this module (as every algorithm run does) stays cheap.
+
 
 class AlgorithmLogger:
     """
@@ -58,6 +59,7 @@ class AlgorithmLogger:
         self.action = 0
 
     def print_statistics(self):
+        import pandas as pd
         # assert self.episode > 0
         if self.episode == 0:  # TODO
             return
@@ -81,6 +83,7 @@ class AlgorithmLogger:
             print(pd.Series(self.time_steps[self.successes]).describe())
 
     def plot_whole_experiment_summary(self, what):
+        import matplotlib.pyplot as plt
 
         marker = ''
         color = np.array(list(map(lambda s: 'tab:green' if s else 'tab:red',
@@ -134,6 +137,7 @@ class AlgorithmLogger:
         plt.show()
 
     def plot_successful_episodes_experiment_summary(self, what):
+        import matplotlib.pyplot as plt
 
         marker = ''
         x_values = np.arange(np.sum(self.successes))
@@ -178,6 +182,7 @@ class AlgorithmLogger:
         plt.show()
 
     def plot_averaged_episodes_summary(self, what):
+        import matplotlib.pyplot as plt
 
         color = 'tab:blue'
         line_style = 'solid'
@@ -246,6 +251,7 @@ class AlgorithmLogger:
         plt.show()
 
     def plot_averaged_successful_episodes_summary(self, what):
+        import matplotlib.pyplot as plt
 
         color = 'tab:blue'
         line_style = 'solid'
@@ -309,6 +315,7 @@ class AlgorithmLogger:
         plt.show()
 
     def plot_single_episodes_summary(self, what):
+        import matplotlib.pyplot as plt
 
         color = 'tab:blue'
         line_style = 'solid'
@@ -0,0 +1,183 @@
+"""
+
+Asynchronous environment workers for off-policy algorithms.
+
+Each worker is a separate process which owns one copy of the environment and
+steps it with a shared-memory copy of the policy, writing transitions into a
+shared-memory ring. The learner (the main process) pulls transitions out of
+the rings into its replay buffer, so environment simulation and gradient
+updates run at the same time.
+
+"""
+import cloudpickle
+import numpy as np
+import time
+import torch
+import torch.multiprocessing as mp
+from copy import deepcopy
+
+
+def _worker(idx, env_fn, act_fn, pi, rings, write_idx, read_idx, total_steps,
+            start_steps, max_ep_len, seed):
+    """Environment stepping loop run inside each worker process."""
+    torch.set_num_threads(1)
+    env_fn, act_fn = cloudpickle.loads(env_fn), cloudpickle.loads(act_fn)
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    env = env_fn()
+    env.seed(seed)
+    action_space = env.action_space
+
+    obs, act, rew, obs2, done, ep_ret_buf, ep_len_buf = \
+        [r[idx].numpy() for r in rings]
+    capacity = len(rew)
+
+    o, ep_ret, ep_len = env.reset(), 0, 0
+    while True:
+        # Until start_steps have elapsed (counted over all workers), randomly
+        # sample actions from a uniform distribution for better exploration.
+        if total_steps.value > start_steps:
+            with torch.no_grad():
+                a = act_fn(pi, o)
+        else:
+            a = action_space.sample()
+
+        o2, r, d, _ = env.step(a)
+        ep_ret += r
+        ep_len += 1
+
+        # Ignore the "done" signal if it comes from hitting the time horizon.
+        d = False if ep_len==max_ep_len else d
+
+        # Wait for the learner if our ring is full.
+        while write_idx[idx] - read_idx[idx] >= capacity:
+            time.sleep(1e-4)
+
+        i = write_idx[idx] % capacity
+        obs[i], act[i], rew[i], obs2[i], done[i] = o, a, r, o2, d
+        o = o2
+
+        # End of trajectory handling: a nonzero ep_len marks a finished episode.
+        if d or (ep_len == max_ep_len):
+            ep_ret_buf[i], ep_len_buf[i] = ep_ret, ep_len
+            o, ep_ret, ep_len = env.reset(), 0, 0
+        else:
+            ep_ret_buf[i], ep_len_buf[i] = 0, 0
+
+        # Publish the transition only after it is fully written.
+        write_idx[idx] += 1
+        with total_steps.get_lock():
+            total_steps.value += 1
+
+
+class EnvWorkers:
+    """
+    A pool of processes stepping copies of an environment in the background.
+
+    Transitions are exchanged through preallocated shared-memory rings (one
+    per worker), and the workers act with a shared-memory copy of the policy
+    which the learner refreshes with ``sync_policy``. Workers block when
+    their ring is full, so they never run more than ``ring_size`` steps
+    ahead of the learner.
+    """
+
+    def __init__(self, env_fn, pi, act_fn, obs_dim, act_dim, num_workers=1,
+                 ring_size=1000, start_steps=0, max_ep_len=1000, seed=0):
+        """
+        Start the worker processes.
+
+        Args:
+            env_fn: A function which creates a copy of the environment.
+
+            pi: The policy module. Workers act with a shared-memory copy.
+
+            act_fn: A function ``act_fn(pi, o)`` returning the (numpy)
+                action to take for a single observation ``o``. Called
+                under ``torch.no_grad()``.
+
+            obs_dim (tuple): Shape of observations.
+
+            act_dim (int): Dimensionality of actions.
+
+            num_workers (int): Number of environment processes.
+
+            ring_size (int): Number of transitions each worker can get ahead
+                of the learner.
+
+            start_steps (int): Number of steps (over all workers) for
+                uniform-random action selection.
+
+            max_ep_len (int): Maximum length of trajectory / episode / rollout.
+
+            seed (int): Base seed. Worker ``i`` uses ``seed + i + 1``.
+        """
+        self.num_workers, self.ring_size = num_workers, ring_size
+        self.pi = deepcopy(pi)
+        self.pi.share_memory()
+
+        shape = lambda *s: (num_workers, ring_size) + tuple(x for d in s for x in d)
+        self.rings = [torch.zeros(shape(obs_dim), dtype=torch.float32),
+                      torch.zeros(shape((act_dim,)), dtype=torch.float32),
+                      torch.zeros(shape(), dtype=torch.float32),
+                      torch.zeros(shape(obs_dim), dtype=torch.float32),
+                      torch.zeros(shape(), dtype=torch.float32),
+                      torch.zeros(shape(), dtype=torch.float64),
+                      torch.zeros(shape(), dtype=torch.int64)]
+        for r in self.rings:
+            r.share_memory_()
+        self._views = [r.numpy() for r in self.rings]
+
+        ctx = mp.get_context()
+        self.write_idx = ctx.Array('q', num_workers, lock=False)
+        self.read_idx = ctx.Array('q', num_workers, lock=False)
+        self.total_steps = ctx.Value('q', 0)
+
+        env_fn, act_fn = cloudpickle.dumps(env_fn), cloudpickle.dumps(act_fn)
+        self.procs = []
+        for i in range(num_workers):
+            args = (i, env_fn, act_fn, self.pi, self.rings, self.write_idx,
+                    self.read_idx, self.total_steps, start_steps, max_ep_len,
+                    seed + i + 1)
+            proc = ctx.Process(target=_worker, args=args, daemon=True)
+            proc.start()
+            self.procs.append(proc)
+        self._next = 0
+
+    def sync_policy(self, pi):
+        """Copy the learner's current policy parameters to the workers."""
+        with torch.no_grad():
+            for p, p_shared in zip(pi.parameters(), self.pi.parameters()):
+                p_shared.copy_(p)
+
+    def fetch(self, replay_buffer):
+        """
+        Move the next available transition into ``replay_buffer``.
+
+        Blocks until some worker has a transition ready, and visits workers
+        round-robin. Returns ``(ep_ret, ep_len)`` if the transition ended an
+        episode, and ``None`` otherwise.
+        """
+        while True:
+            for _ in range(self.num_workers):
+                w = self._next
+                self._next = (self._next + 1) % self.num_workers
+                if self.write_idx[w] > self.read_idx[w]:
+                    return self._pop(w, replay_buffer)
+            if not all(p.is_alive() for p in self.procs):
+                raise RuntimeError('An environment worker died unexpectedly.')
+            time.sleep(1e-4)
+
+    def _pop(self, w, replay_buffer):
+        i = self.read_idx[w] % self.ring_size
+        o, a, r, o2, d, ep_ret, ep_len = [v[w, i] for v in self._views]
+        replay_buffer.store(o, a, r, o2, d)
+        # Free the slot only after the transition has been copied out.
+        self.read_idx[w] += 1
+        return (float(ep_ret), int(ep_len)) if ep_len > 0 else None
+
+    def close(self):
+        """Stop all worker processes."""
+        for p in self.procs:
+            p.terminate()
+        for p in self.procs:
+            p.join()
@@ -0,0 +1,29 @@
+"""
+
+Flat parameter storage for PyTorch modules.
+
+Putting all parameters of a module into one contiguous tensor lets
+whole-network operations (like polyak averaging target networks) run as a
+single tensor op, instead of a Python loop over parameters.
+
+"""
+import torch
+
+
+def flatten_parameters(module):
+    """
+    Move all parameters of ``module`` into one flat tensor, and return it.
+
+    Afterwards each parameter's data is a view into the flat tensor, so
+    in-place changes to either one show up in the other. The parameters
+    stay the same objects, so optimizers holding them keep working. (Note
+    that ``deepcopy`` does not preserve the views: flatten copies again.)
+    """
+    params = list(module.parameters())
+    flat = torch.cat([p.data.reshape(-1) for p in params])
+    offset = 0
+    for p in params:
+        n = p.numel()
+        p.data = flat[offset:offset+n].view_as(p)
+        offset += n
+    return flat
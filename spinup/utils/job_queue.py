@@ -0,0 +1,361 @@
+"""
+A queue of experiments in a directory on a shared filesystem, which any
+number of workers (on any number of machines) take experiments from.
+
+``ExperimentGrid.run(..., queue=queue_dir)`` (or ``--queue queue_dir`` on
+the command line) puts the variants in the queue instead of running them,
+and workers started with
+
+    python -m spinup.utils.job_queue queue_dir --max_cpu 16
+
+run them, as many at a time as fit in their budget of cores, until the
+queue is drained.
+
+Every job is a file, and moves between the ``pending``, ``running``,
+``done`` and ``failed`` subdirectories of the queue with ``os.rename``,
+which is atomic (on NFS too), so no two workers ever claim the same job. A
+worker renews its lease on a running job by touching the job's file. If a
+worker dies, the leases on its jobs run out, and the next worker to look
+puts them back in ``pending``, to be resumed (if the thunk takes a
+``resume`` argument) or restarted. Times are compared to the modification
+times of files in the queue, rather than to the clocks of the machines, so
+the machines' clocks don't need to agree.
+"""
+import cloudpickle
+import os
+import os.path as osp
+import socket
+import time
+import traceback
+import uuid
+from functools import partial
+
+from spinup.utils.logx import colorize
+from spinup.utils.run_utils import ExperimentScheduler, DIV_LINE_WIDTH
+
+JOB_STATES = ('pending', 'running', 'done', 'failed')
+
+
+class JobQueue:
+    """
+    A queue of experiments in ``queue_dir``.
+
+    Args:
+        queue_dir (string): Directory of the queue. Created if needed.
+
+        lease (float): Seconds after which a running job which hasn't been
+            renewed (see ``renew``) goes back in the queue.
+
+        max_attempts (int): Number of times a job is started before it
+            counts as failed when its lease runs out.
+    """
+
+    def __init__(self, queue_dir, lease=60., max_attempts=3):
+        self.queue_dir = osp.abspath(queue_dir)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        for state in JOB_STATES + ('tmp', 'clock'):
+            os.makedirs(osp.join(self.queue_dir, state), exist_ok=True)
+
+    def _path(self, state, job_id):
+        return osp.join(self.queue_dir, state, job_id)
+
+    def _write(self, state, job_id, job):
+        tmp_path = self._path('tmp', uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            f.write(cloudpickle.dumps(job))
+        os.rename(tmp_path, self._path(state, job_id))
+
+    def _now(self, owner):
+        # The filesystem's idea of the time, as used for the modification
+        # times of job files.
+        path = self._path('clock', owner)
+        with open(path, 'w'):
+            pass
+        os.utime(path)
+        return os.stat(path).st_mtime
+
+    def jobs(self, state):
+        """Ids of the jobs in a state, oldest first."""
+        return sorted(f for f in os.listdir(osp.join(self.queue_dir, state))
+                      if not f.startswith('.'))
+
+    def counts(self):
+        """Number of jobs in each state."""
+        return {state: len(self.jobs(state)) for state in JOB_STATES}
+
+    def put(self, name, prepare, cost=1, num_threads=1, can_resume=False):
+        """
+        Add an experiment to the queue.
+
+        Args:
+            name (string): Name for the job (the experiment's name, and
+                its seed).
+
+            prepare (callable): As for ``ExperimentScheduler.add``. Pickled
+                with cloudpickle, so it can't hold onto anything which only
+                exists on this machine.
+
+            cost (int): Number of cores the experiment needs.
+
+            num_threads (int): Number of threads each of the experiment's
+                processes may use.
+
+            can_resume (bool): Whether ``prepare`` takes ``resume=True``,
+                to pick up an experiment which didn't finish.
+
+        Returns:
+            The id of the job, or None if a job with the same name is
+            already pending or running.
+        """
+        for state in ('pending', 'running'):
+            if any(job_id.split('_', 3)[3] == name for job_id in self.jobs(state)):
+                return None
+        job_id = '%d_%s_c%d_%s'%(time.time() * 1e6, uuid.uuid4().hex[:6], cost, name)
+        self._write('pending', job_id, dict(name=name, prepare=prepare, cost=cost,
+                                            num_threads=num_threads,
+                                            can_resume=can_resume, attempts=0))
+        return job_id
+
+    def claim(self, fits=lambda cost: True):
+        """
+        Take the oldest pending job whose cost ``fits``.
+
+        Returns:
+            The id of the job and the job (a dict with the arguments of
+            ``put``), or None if there is no such job.
+        """
+        for job_id in self.jobs('pending'):
+            if not fits(int(job_id.split('_', 3)[2][1:])):
+                continue
+            try:
+                # Start the lease before the job shows up as running.
+                os.utime(self._path('pending', job_id))
+                os.rename(self._path('pending', job_id), self._path('running', job_id))
+            except FileNotFoundError:
+                continue    # Another worker got there first.
+            with open(self._path('running', job_id), 'rb') as f:
+                job = cloudpickle.loads(f.read())
+            job['attempts'] += 1
+            return job_id, job
+        return None
+
+    def renew(self, job_id):
+        """
+        Renew the lease on a running job.
+
+        Returns:
+            False if the lease has run out (and the job has gone back in
+            the queue), and True otherwise.
+        """
+        try:
+            os.utime(self._path('running', job_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job_id, success):
+        """
+        Move a running job to ``done`` or ``failed``.
+
+        Returns:
+            False if the lease had run out, and True otherwise.
+        """
+        state = 'done' if success else 'failed'
+        try:
+            os.rename(self._path('running', job_id), self._path(state, job_id))
+            return True
+        except FileNotFoundError:
+            pass
+        if success:
+            # Don't run the job again, if no one else has started it yet.
+            try:
+                os.rename(self._path('pending', job_id), self._path(state, job_id))
+            except FileNotFoundError:
+                pass
+        return False
+
+    def release(self, owner, job_id, job):
+        """
+        Put a running job back in the queue, to be resumed if it can be.
+
+        Returns:
+            The state the job is in now (``'pending'``, or ``'failed'`` if
+            it has been started ``max_attempts`` times), or None if it
+            wasn't running.
+        """
+        # Take the job out of 'running' first, so it can only be released once.
+        tmp_path = self._path('tmp', '%s.%s'%(job_id, owner))
+        try:
+            os.rename(self._path('running', job_id), tmp_path)
+        except FileNotFoundError:
+            return None
+        if job is None:
+            with open(tmp_path, 'rb') as f:
+                job = cloudpickle.loads(f.read())
+            job['attempts'] += 1
+        if job['can_resume'] and not job.get('resume'):
+            job['prepare'], job['resume'] = partial(job['prepare'], resume=True), True
+        state = 'failed' if job['attempts'] >= self.max_attempts else 'pending'
+        self._write(state, job_id, job)
+        os.remove(tmp_path)
+        return state
+
+    def release_expired(self, owner):
+        """
+        Put running jobs whose leases have run out back in the queue.
+
+        Returns:
+            A list with the id of each job, and the state it is in now.
+        """
+        now, released = self._now(owner), []
+        for job_id in self.jobs('running'):
+            try:
+                expired = now - os.stat(self._path('running', job_id)).st_mtime > self.lease
+            except FileNotFoundError:
+                continue
+            if expired:
+                state = self.release(owner, job_id, None)
+                if state is not None:
+                    released.append((job_id, state))
+        return released
+
+
+class QueueWorker(ExperimentScheduler):
+    """
+    Runs experiments from a ``JobQueue``, within a budget of ``max_cpu``
+    cores, as an ``ExperimentScheduler`` does.
+
+    With ``wait``, the worker waits for more jobs when the queue is empty.
+    Otherwise, it stops once no job is pending or running on any worker.
+    """
+
+    def __init__(self, queue, max_cpu, poll_interval=0.5, warm_start=False, wait=False):
+        super().__init__(max_cpu, poll_interval, warm_start)
+        self.queue = queue
+        self.wait = wait
+        self.owner = '%s.%d'%(socket.gethostname(), os.getpid())
+
+    def print_status(self):
+        counts = self.queue.counts()
+        print(colorize('Queue %s: %d pending, %d running, %d done, %d failed (all workers)'
+                       %(self.queue.queue_dir, counts['pending'], counts['running'],
+                         counts['done'], counts['failed']), color='green', bold=True))
+        super().print_status()
+
+    def _claim(self, running):
+        used = sum(job['cost'] for job in running)
+        fits = lambda cost: used + cost <= self.max_cpu or len(running) == 0
+        claimed = self.queue.claim(fits)
+        if claimed is None:
+            return None
+        job_id, queued = claimed
+        job = dict(name=queued['name'], prepare=queued['prepare'], cost=queued['cost'],
+                   num_threads=queued['num_threads'], status='pending', proc=None,
+                   code=None, start=None, end=None, job_id=job_id, queued=queued)
+        self.jobs.append(job)
+        return job
+
+    def _lose(self, job):
+        # Someone else took over the job, so stop it and leave its output
+        # directory alone.
+        job['proc'].terminate()
+        job['code'], job['end'] = job['proc'].wait(), time.time()
+        job['log'].close()
+        job['status'] = 'lost'
+
+    def run(self):
+        """
+        Run experiments from the queue until it is drained.
+
+        Returns:
+            A dict mapping the name of each experiment this worker ran to
+            its exit code.
+        """
+        running, last_renewal = [], 0
+        try:
+            while True:
+                changed = False
+
+                # Start every pending experiment which fits in the budget.
+                job = self._claim(running)
+                while job is not None:
+                    try:
+                        self._start(job)
+                        running.append(job)
+                    except Exception:
+                        # (Eg the experiment needs something this machine
+                        # doesn't have.)
+                        traceback.print_exc()
+                        self.queue.complete(job['job_id'], False)
+                        job['status'] = 'failed'
+                    changed = True
+                    job = self._claim(running)
+
+                if changed:
+                    self.print_status()
+                time.sleep(self.poll_interval)
+
+                # Renew leases, and take back jobs from workers which died.
+                if time.time() - last_renewal > self.queue.lease / 4:
+                    last_renewal = time.time()
+                    for job in list(running):
+                        if not self.queue.renew(job['job_id']):
+                            running.remove(job)
+                            self._lose(job)
+                            changed = True
+                    for job_id, state in self.queue.release_expired(self.owner):
+                        print(colorize('Lease on %s ran out, moved it to %s.'%(job_id, state),
+                                       color='yellow', bold=True))
+
+                for job in list(running):
+                    code = job['proc'].poll()
+                    if code is not None:
+                        running.remove(job)
+                        self._finish(job, code)
+                        if not self.queue.complete(job['job_id'], code == 0):
+                            job['status'] = 'lost'
+                        changed = True
+
+                if changed:
+                    self.print_status()
+                if len(running) == 0 and not self.wait:
+                    counts = self.queue.counts()
+                    if counts['pending'] == 0 and counts['running'] == 0:
+                        break
+        finally:
+            # Hand back experiments if we are interrupted.
+            for job in running:
+                job['proc'].terminate()
+                self._finish(job, job['proc'].wait())
+                self.queue.release(self.owner, job['job_id'], job['queued'])
+            clock = self.queue._path('clock', self.owner)
+            if osp.exists(clock):
+                os.remove(clock)
+        return {job['name']: job['code'] for job in self.jobs}
+
+
+if __name__ == '__main__':
+    import argparse
+    import psutil
+    parser = argparse.ArgumentParser()
+    parser.add_argument('queue_dir')
+    parser.add_argument('--max_cpu', type=int, default=psutil.cpu_count(logical=False))
+    parser.add_argument('--warm_start', action='store_true')
+    parser.add_argument('--wait', action='store_true',
+                        help='Wait for more jobs when the queue is empty.')
+    parser.add_argument('--lease', type=float, default=60.)
+    parser.add_argument('--status', action='store_true',
+                        help='Print the jobs in the queue, and exit.')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue_dir, args.lease)
+    if args.status:
+        for state in JOB_STATES:
+            jobs = queue.jobs(state)
+            print(colorize('%s (%d):'%(state, len(jobs)), color='green', bold=True))
+            for job_id in jobs:
+                print('  ' + job_id.split('_', 3)[3])
+        print('='*DIV_LINE_WIDTH)
+    else:
+        QueueWorker(queue, args.max_cpu, warm_start=args.warm_start, wait=args.wait).run()
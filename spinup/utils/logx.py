@@ -2,18 +2,35 @@
 
 Some simple logging functionality, inspired by rllab's logging.
 
-Logs to a tab-separated-values file (path/to/output_directory/progress.txt)
+Logs to a tab-separated-values file (path/to/output_directory/progress.txt),
+and optionally to a binary file of the same values (progress.bin), which
+``load_progress`` reads much faster.
+
+With ``background_io``, the logger's file writes and console output run on
+a background thread, so they don't hold up training.
+
+TensorFlow and PyTorch are only imported when models are saved or restored,
+so that importing the logger doesn't load either of them.
 
 """
+import copy
+import glob
+import hashlib
 import json
 import joblib
+import pickle
+import queue
+import random
 import shutil
+import struct
+import threading
 import numpy as np
-import tensorflow as tf
-import torch
-import os.path as osp, time, atexit, os
+import os.path as osp, time, atexit, os, sys
 import warnings
-from spinup.utils.mpi_tools import proc_id, mpi_statistics_scalar
+from functools import partial
+from mpi4py import MPI
+from spinup.utils.mpi_tools import proc_id, num_procs, mpi_statistics_batch, \
+                                   mpi_statistics_scalar
 from spinup.utils.serialization_utils import convert_json
 
 color2num = dict(
@@ -56,6 +73,7 @@ def restore_tf_graph(sess, fpath):
         A dictionary mapping from keys to tensors in the computation graph
         loaded from ``fpath``. 
     """
+    import tensorflow as tf
     tf.saved_model.loader.load(
                 sess,
                 [tf.saved_model.tag_constants.SERVING],
@@ -68,6 +86,308 @@ def restore_tf_graph(sess, fpath):
     model.update({k: graph.get_tensor_by_name(v) for k,v in model_info['outputs'].items()})
     return model
 
+# Directory in which Logger.save_state keeps the entries of saved states.
+STATE_DIR = 'state'
+
+def load_state(fpath, itr=''):
+    """
+    Loads a state saved by ``Logger.save_state``.
+
+    Args:
+        fpath: Filepath to the output directory.
+        itr: The ``itr`` the state was saved with, or ``''`` for the state
+            saved without one.
+
+    Returns:
+        The ``state_dict`` given to ``save_state``, without any entries 
+        which couldn't be pickled.
+    """
+    manifest_path = osp.join(fpath, 'vars%s.json'%itr)
+    if not osp.exists(manifest_path):
+        # (Saved by an older version, as a single file.)
+        return joblib.load(osp.join(fpath, 'vars%s.pkl'%itr))
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    state = dict()
+    for k, digest in manifest.items():
+        with open(osp.join(fpath, STATE_DIR, digest + '.pkl'), 'rb') as f:
+            state[k] = pickle.load(f)
+    return state
+
+# Binary progress file: the magic bytes, the length of the JSON header 
+# (padded so the rows start 8-byte aligned), the header, and then a row of
+# float64s (one for each column) for each call to dump_tabular.
+PROGRESS_BIN_FNAME = 'progress.bin'
+PROGRESS_BIN_MAGIC = b'SPINUPB1'
+
+def _progress_bin_header(columns):
+    text = json.dumps(dict(columns=columns, dtype='<f8')).encode()
+    text += b' ' * (-len(text) % 8)
+    return PROGRESS_BIN_MAGIC + struct.pack('<Q', len(text)) + text
+
+def _read_progress_bin_header(f):
+    """
+    Returns the columns of a binary progress file, and where its rows start,
+    or None if the header isn't fully written yet (so there are no rows).
+    """
+    head = f.read(16)
+    if len(head) < 16:
+        return None
+    magic, size = struct.unpack('<8sQ', head)
+    assert magic == PROGRESS_BIN_MAGIC, "Not a binary progress file."
+    header = f.read(size)
+    if len(header) < size:
+        return None
+    return json.loads(header.decode())['columns'], 16 + size
+
+def load_progress(fpath):
+    """
+    Loads the binary progress file written by a logger with 
+    ``binary_log=True``, without parsing it.
+
+    Args:
+        fpath: Filepath to the output directory.
+
+    Returns:
+        A read-only structured array (memory-mapped from the file) with a 
+        float64 field for each column of the progress file, and an entry 
+        for each row, eg ``load_progress(fpath)['AverageEpRet']``, or 
+        ``pd.DataFrame(load_progress(fpath))``. Values which weren't 
+        numbers (or weren't logged) are NaN. A row which is still being 
+        written is left out, and a file whose header is still being written
+        has no rows (nor columns).
+    """
+    path = osp.join(fpath, PROGRESS_BIN_FNAME)
+    with open(path, 'rb') as f:
+        header = _read_progress_bin_header(f)
+    if header is None:
+        return np.zeros(0, dtype=[])
+    columns, offset = header
+    dtype = np.dtype([(column, '<f8') for column in columns])
+    rows = (osp.getsize(path) - offset) // dtype.itemsize
+    if rows == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows,))
+
+# File in which Logger.save_checkpoint saves the full state of a run.
+CHECKPOINT_FNAME = 'checkpoint.pkl'
+
+# Arrays bigger than this (like the arrays of a replay buffer) are handed to
+# the background writer as they are, rather than copied, by save_checkpoint.
+SNAPSHOT_MAX_BYTES = 1 << 20
+
+class RunStopped(Exception):
+    """
+    Raised by ``EpochLogger.dump_tabular`` when its ``Watchdog`` stops a run.
+
+    ``call_experiment`` (and the experiment grids) catch it, and record the
+    reason in the run's ``run_status.json``, as for runs stopped by a 
+    scheduler. The run's progress log is complete up to the last epoch.
+    """
+    pass
+
+
+class Watchdog:
+    """
+    Stops runs which have diverged or stalled, so they don't use up their
+    cores for the rest of their epochs.
+
+    Checked by ``EpochLogger.dump_tabular`` at the end of every epoch.
+
+    Args:
+        check_finite (bool): Stop the run if the statistics of any stored
+            diagnostic (eg ``LossPi``, ``LossQ``), or any parameter of the
+            PyTorch model set up with ``setup_pytorch_saver``, is NaN or
+            infinite.
+
+        plateaus (list): Rules for stopping runs which have stopped 
+            improving. Each is a dict with the ``key`` of a logged value 
+            (eg ``'AverageEpRet'``), and the number of epochs 
+            (``patience``) after which the run is stopped if the value 
+            hasn't improved on its best by more than ``min_delta`` (0 by 
+            default). Use ``mode='min'`` (instead of the default 
+            ``'max'``) for values where lower is better.
+    """
+
+    def __init__(self, check_finite=True, plateaus=()):
+        self.check_finite = check_finite
+        self.plateaus = [dict(dict(min_delta=0., mode='max'), **rule) for rule in plateaus]
+        self.best = [None] * len(self.plateaus)
+        self.since_best = [0] * len(self.plateaus)
+
+    def __call__(self, row, stored_keys, model=None):
+        """
+        Check the values logged for an epoch.
+
+        Returns:
+            The reason to stop the run, or None to let it go on.
+        """
+        if self.check_finite:
+            for key in stored_keys:
+                if not np.isfinite(row[key]):
+                    return '%s is %s'%(key, row[key])
+            if hasattr(model, 'named_parameters'):
+                import torch
+                for name, param in model.named_parameters():
+                    if not torch.isfinite(param.detach()).all():
+                        return 'parameter %s is not finite'%name
+
+        for i, rule in enumerate(self.plateaus):
+            sign = 1 if rule['mode'] == 'max' else -1
+            val = sign * row[rule['key']]
+            if self.best[i] is None or val > self.best[i] + rule['min_delta']:
+                self.best[i], self.since_best[i] = val, 0
+            else:
+                self.since_best[i] += 1
+                if self.since_best[i] >= rule['patience']:
+                    return '%s has not improved on %.4g for %d epochs'%(
+                        rule['key'], sign * self.best[i], rule['patience'])
+        return None
+
+
+class Retention:
+    """
+    Keeps the saves of a run (see ``Logger.save_state``) which are worth 
+    keeping, so the output directory of a long run doesn't fill up with 
+    one model per save.
+
+    Each save is scored by the value of ``key`` in the row of the progress
+    file logged after it (eg ``'AverageTestEpRet'``, or the evaluation 
+    success ratio). Once scored, only the last ``keep_last`` saves, and 
+    the ``keep_best`` best, are kept. Use ``mode='min'`` (instead of the 
+    default ``'max'``) for values where lower is better.
+
+    Args:
+        keep_last (int): Number of the most recent saves to keep.
+
+        keep_best (int): Number of the best scoring saves to keep.
+
+        key (string): The logged value saves are ranked by. Only needed 
+            if ``keep_best`` is more than 0.
+
+        mode (string): ``'max'`` or ``'min'``.
+    """
+
+    def __init__(self, keep_last=1, keep_best=0, key=None, mode='max'):
+        assert keep_best == 0 or key is not None, "Need a key to rank saves by."
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.key = key
+        self.mode = mode
+        self.saves = []     # [itr, value], oldest first; value None until scored
+
+    def saved(self, itr):
+        """Record a save (replacing any earlier one with the same itr)."""
+        self.saves = [save for save in self.saves if save[0] != itr] + [[itr, None]]
+
+    def score(self, row):
+        """
+        Score the saves made since the last row, with the row logged after
+        them.
+
+        Returns:
+            The itrs of the saves to remove.
+        """
+        for save in self.saves:
+            if save[1] is None:
+                value = row.get(self.key, np.nan) if self.key is not None else 0.
+                # (A value which wasn't logged, or isn't a number, is NaN.)
+                save[1] = float(value) if hasattr(value, '__float__') else np.nan
+        last = self.saves[-self.keep_last:] if self.keep_last > 0 else []
+        keep = set(itr for itr, _ in last)
+        ranked = sorted(self.saves, key=self._rank, reverse=True)
+        keep.update(itr for itr, _ in ranked[:self.keep_best])
+        removed = [itr for itr, _ in self.saves if itr not in keep]
+        self.saves = [save for save in self.saves if save[0] in keep]
+        return removed
+
+    def _rank(self, save):
+        # Higher is better; NaN scores (eg of diverged runs) rank last.
+        if save[1] is None or not np.isfinite(save[1]):
+            return -np.inf
+        return save[1] if self.mode == 'max' else -save[1]
+
+    def best(self):
+        """
+        The itr of the best scoring save kept, or None if no save kept has
+        a score (other than NaN).
+        """
+        scored = [save for save in self.saves if self._rank(save) > -np.inf]
+        return max(scored, key=self._rank)[0] if scored else None
+
+
+class BackgroundWriter:
+    """
+    Runs writes (and prints) on a background thread, one at a time, in the
+    order they are submitted.
+
+    At most ``max_queued`` writes wait at a time: once that many are
+    queued, ``submit`` blocks until one is done, so a slow disk holds up
+    training rather than filling up memory. An exception raised by a write
+    is raised again (as a ``RuntimeError``) by the next call of ``submit``,
+    ``flush`` or ``close``, and the writes after it are dropped.
+    """
+
+    def __init__(self, max_queued=8):
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='BackgroundWriter',
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            write = self.queue.get()
+            try:
+                if write is None:
+                    return
+                if self.error is None:
+                    write()
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError('A background write failed.') from error
+
+    def submit(self, write):
+        """Queue ``write`` (a function without arguments) to be run."""
+        self._raise_error()
+        self.queue.put(write)
+
+    def flush(self):
+        """Wait until every write submitted so far is done."""
+        self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Finish the writes submitted so far, and stop the thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise_error()
+
+
+def _snapshot(obj):
+    """
+    Deep copy obj, except for the numpy arrays in it (in dicts, lists and 
+    tuples) of more than ``SNAPSHOT_MAX_BYTES``, which are shared.
+    """
+    memo, todo = dict(), [obj]
+    while len(todo) > 0:
+        item = todo.pop()
+        if isinstance(item, dict):
+            todo.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            todo.extend(item)
+        elif isinstance(item, np.ndarray) and item.nbytes > SNAPSHOT_MAX_BYTES:
+            memo[id(item)] = item
+    return copy.deepcopy(obj, memo)
+
+
 class Logger:
     """
     A general-purpose logger.
@@ -76,7 +396,8 @@ class Logger:
     state of a training run, and the trained model.
     """
 
-    def __init__(self, output_dir=None, output_fname='progress.txt', exp_name=None):
+    def __init__(self, output_dir=None, output_fname='progress.txt', exp_name=None,
+                 resume=False, background_io=False, retention=None, binary_log=False):
         """
         Initialize a Logger.
 
@@ -94,28 +415,140 @@ class Logger:
                 will know to group them. (Use case: if you run the same
                 hyperparameter configuration with multiple random seeds, you
                 should give them all the same ``exp_name``.)
+
+            resume (bool): If ``output_dir`` holds a checkpoint (see 
+                ``save_checkpoint``), keep the rows of the progress file 
+                which were logged up to the checkpoint, and append to them,
+                instead of starting the file over. The checkpoint is then 
+                returned by ``load_checkpoint``.
+
+            background_io (bool): Write the progress file, saved states, 
+                models and checkpoints, and print to the console, on a 
+                background thread (see ``BackgroundWriter``). The training
+                loop then only pays for snapshotting what is saved (copying
+                the model and state), rather than for pickling, writing and
+                syncing files. Everything is written, in order, before the 
+                program exits; call ``flush`` to wait for it sooner. (See
+                ``save_checkpoint`` for the arrays which aren't copied.)
+
+            retention (Retention): Which saves to keep (or a dict of args 
+                for a ``Retention``). With one, states saved without an 
+                ``itr`` are numbered by the row of the progress file they
+                are scored by, and the saves a row leaves out of the last
+                and best ones are removed (after everything before them 
+                is written). ``saves.json`` lists the saves kept, with 
+                their scores, and the best one. ``pyt_save/model.pt`` and
+                ``vars.json`` are kept as copies of the latest save (hard
+                links, where the filesystem has them), as without one.
+
+            binary_log (bool): Also write the values logged to 
+                ``progress.bin``, as a row of float64s for each iteration, 
+                for ``load_progress`` (and so the plotter) to read without 
+                parsing text.
         """
+        checkpoint = None
         if proc_id()==0:
             self.output_dir = output_dir or "/tmp/experiments/%i"%int(time.time())
             if osp.exists(self.output_dir):
                 print("Warning: Log dir %s already exists! Storing info there anyway."%self.output_dir)
             else:
                 os.makedirs(self.output_dir)
-            self.output_file = open(osp.join(self.output_dir, output_fname), 'w')
+            checkpoint_path = osp.join(self.output_dir, CHECKPOINT_FNAME)
+            if resume and osp.exists(checkpoint_path):
+                with open(checkpoint_path, 'rb') as f:
+                    checkpoint = pickle.load(f)
+                assert len(checkpoint['states']) == num_procs(), \
+                    "Can only resume with as many MPI processes as the checkpoint was saved with."
+                print(colorize("Resuming from %s"%checkpoint_path, 'green', bold=True))
+            output_path = osp.join(self.output_dir, output_fname)
+            if checkpoint is not None and checkpoint['log_rows'] > 0:
+                # Drop any rows logged after the checkpoint, since they
+                # will be logged again.
+                with open(output_path) as f:
+                    lines = f.readlines()[:1 + checkpoint['log_rows']]
+                with open(output_path, 'w') as f:
+                    f.writelines(lines)
+                self.output_file = open(output_path, 'a')
+            else:
+                self.output_file = open(output_path, 'w')
             atexit.register(self.output_file.close)
             print(colorize("Logging data to %s"%self.output_file.name, 'green', bold=True))
+            self.binary_file = None
+            if binary_log:
+                binary_path = osp.join(self.output_dir, PROGRESS_BIN_FNAME)
+                header = None
+                if checkpoint is not None and checkpoint['log_rows'] > 0 and \
+                        osp.exists(binary_path):
+                    with open(binary_path, 'rb') as f:
+                        header = _read_progress_bin_header(f)
+                if header is not None:
+                    columns, offset = header
+                    os.truncate(binary_path, offset + 8 * len(columns) * checkpoint['log_rows'])
+                    self.binary_file = open(binary_path, 'ab')
+                else:
+                    self.binary_file = open(binary_path, 'wb')
+                    if checkpoint is not None and checkpoint['log_rows'] > 0:
+                        # (The run was started without a binary log, or its
+                        # header never made it to disk, so it has no values 
+                        # for the rows logged so far.)
+                        columns = checkpoint['log_headers']
+                        self.binary_file.write(_progress_bin_header(columns))
+                        nans = np.full((checkpoint['log_rows'], len(columns)), np.nan)
+                        self.binary_file.write(nans.astype('<f8').tobytes())
+                atexit.register(self.binary_file.close)
         else:
             self.output_dir = None
             self.output_file = None
+            self.binary_file = None
+        self.writer = None
+        if background_io and proc_id()==0:
+            # (atexit runs this before it closes the output file.)
+            self.writer = BackgroundWriter()
+            atexit.register(self.writer.close)
         self.first_row=True
         self.log_headers = []
+        self.log_rows = 0
         self.log_current_row = {}
         self.exp_name = exp_name
+        self.unpicklable_keys = set()
+
+        # Hand each process its part of the checkpoint.
+        if num_procs() > 1 and MPI.COMM_WORLD.bcast(checkpoint is not None, root=0):
+            parts = None
+            if checkpoint is not None:
+                parts = [dict(checkpoint, states=state) for state in checkpoint['states']]
+            checkpoint = MPI.COMM_WORLD.scatter(parts, root=0)
+        elif checkpoint is not None:
+            checkpoint['states'] = checkpoint['states'][0]
+        self.checkpoint = checkpoint
+        if checkpoint is not None and checkpoint['log_rows'] > 0:
+            self.first_row = False
+            self.log_headers = checkpoint['log_headers']
+            self.log_rows = checkpoint['log_rows']
+        self.retention = Retention(**retention) if isinstance(retention, dict) else retention
+        if self.retention is not None and checkpoint is not None and \
+                checkpoint.get('retention') is not None:
+            # Pick up the saves kept so far.
+            self.retention = checkpoint['retention']
+        self.static_state = dict()
+
+    def _write(self, write, *args):
+        """Run ``write(*args)``, on the background thread if there is one."""
+        if self.writer is None:
+            write(*args)
+        else:
+            self.writer.submit(partial(write, *args))
+
+    def flush(self):
+        """Wait until everything logged so far is written."""
+        if self.writer is not None:
+            self.writer.flush()
 
     def log(self, msg, color='green'):
         """Print a colorized message to stdout."""
         if proc_id()==0:
-            print(colorize(msg, color, bold=True))
+            # (In order with the tables printed by dump_tabular.)
+            self._write(print, colorize(msg, color, bold=True))
 
     def log_tabular(self, key, val):
         """
@@ -159,7 +592,7 @@ class Logger:
             with open(osp.join(self.output_dir, "config.json"), 'w') as out:
                 out.write(output)
 
-    def save_state(self, state_dict, itr=None):
+    def save_state(self, state_dict, itr=None, static=()):
         """
         Saves the state of an experiment.
 
@@ -174,22 +607,102 @@ class Logger:
         version, leave ``itr=None``. If you want to keep all of the states you
         save, provide unique (increasing) values for 'itr'.
 
+        Each entry of ``state_dict`` is pickled into a file in the 
+        ``state`` directory named by a hash of its contents, and 
+        ``vars.json`` (or ``vars<itr>.json``) lists the files of the 
+        entries. An entry which hasn't changed since it was last saved 
+        isn't written again, and files no longer listed by any ``vars`` 
+        file are removed. Load saved states with ``load_state``.
+
+        An environment's pickle changes with every step it takes (its 
+        random state, its wrappers' counters), so list it in ``static``: 
+        an entry named there is only pickled the first time it's saved, 
+        and later saves of the same object list that file again.
+
         Args:
             state_dict (dict): Dictionary containing essential elements to
                 describe the current state of training.
 
             itr: An int, or None. Current iteration of training.
+
+            static: Keys of entries in ``state_dict`` which only need 
+                saving once, eg ``['env']``.
         """
         if proc_id()==0:
-            fname = 'vars.pkl' if itr is None else 'vars%d.pkl'%itr
-            try:
-                joblib.dump(state_dict, osp.join(self.output_dir, fname))
-            except:
-                self.log('Warning: could not pickle state_dict.', color='red')
+            # Static entries already saved just list their files again.
+            saved = {k: self.static_state[k][1] for k in static
+                     if k in self.static_state and self.static_state[k][0] is state_dict[k]}
+            static = {k: state_dict[k] for k in static if k not in saved}
+            state_dict = {k: v for k, v in state_dict.items() if k not in saved}
+            latest = False
+            if self.retention is not None:
+                if itr is None:
+                    itr, latest = self.log_rows, True
+                self.retention.saved(itr)
+            fname = 'vars.json' if itr is None else 'vars%d.json'%itr
+            if self.writer is not None:
+                # Snapshot the state, since training carries on changing it
+                # while it waits to be written.
+                snapshot = dict()
+                for k, v in state_dict.items():
+                    try:
+                        snapshot[k] = copy.deepcopy(v)
+                    except:
+                        self.log('Warning: could not pickle %s in state_dict.'%k, color='red')
+                state_dict = snapshot
+            self._write(self._dump_state, state_dict, fname, latest, saved, static)
             if hasattr(self, 'tf_saver_elements'):
+                # (The session can't be saved from another thread.)
+                self.flush()
                 self._tf_simple_save(itr)
             if hasattr(self, 'pytorch_saver_elements'):
-                self._pytorch_simple_save(itr)
+                self._pytorch_simple_save(itr, latest)
+
+    def _dump_state(self, state_dict, fname, latest=False, saved=None, static=None):
+        state_dir = osp.join(self.output_dir, STATE_DIR)
+        os.makedirs(state_dir, exist_ok=True)
+        manifest = dict(saved or {})
+        for k, v in state_dict.items():
+            try:
+                blob = pickle.dumps(v, protocol=4)
+            except:
+                print(colorize('Warning: could not pickle %s in state_dict.'%k, 'red', bold=True))
+                continue
+            digest = hashlib.sha1(blob).hexdigest()
+            path = osp.join(state_dir, digest + '.pkl')
+            if not osp.exists(path):
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(blob)
+                os.replace(path + '.tmp', path)
+            manifest[k] = digest
+            if static and k in static:
+                self.static_state[k] = (static[k], digest)
+        for fname in [fname] + (['vars.json'] if latest else []):
+            path = osp.join(self.output_dir, fname)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(manifest, f)
+            os.replace(path + '.tmp', path)
+            self._state_manifests()[fname] = manifest
+        self._remove_unlisted_state()
+
+    def _state_manifests(self):
+        """The contents of the ``vars`` files in the output directory, by name."""
+        if not hasattr(self, 'state_manifests'):
+            # (Including those left by an earlier run into the same directory.)
+            self.state_manifests = dict()
+            for path in glob.glob(osp.join(self.output_dir, 'vars*.json')):
+                with open(path) as f:
+                    self.state_manifests[osp.basename(path)] = json.load(f)
+        return self.state_manifests
+
+    def _remove_unlisted_state(self):
+        """Remove the files of state entries which no ``vars`` file lists."""
+        listed = set(digest + '.pkl' for manifest in self._state_manifests().values()
+                     for digest in manifest.values())
+        state_dir = osp.join(self.output_dir, STATE_DIR)
+        for fname in os.listdir(state_dir):
+            if fname not in listed:
+                os.remove(osp.join(state_dir, fname))
 
     def setup_tf_saver(self, sess, inputs, outputs):
         """
@@ -227,6 +740,7 @@ class Logger:
                 # simple_save refuses to be useful if fpath already exists,
                 # so just delete fpath if it's there.
                 shutil.rmtree(fpath)
+            import tensorflow as tf
             tf.saved_model.simple_save(export_dir=fpath, **self.tf_saver_elements)
             joblib.dump(self.tf_saver_info, osp.join(fpath, 'model_info.pkl'))
     
@@ -247,31 +761,162 @@ class Logger:
         """
         self.pytorch_saver_elements = what_to_save
 
-    def _pytorch_simple_save(self, itr=None):
+    def _pytorch_simple_save(self, itr=None, latest=False):
         """
-        Saves the PyTorch model (or models).
+        Saves the PyTorch model (or models), and with ``latest``, makes 
+        ``model.pt`` the same save.
         """
         if proc_id()==0:
             assert hasattr(self, 'pytorch_saver_elements'), \
                 "First have to setup saving with self.setup_pytorch_saver"
+            import torch
             fpath = 'pyt_save'
             fpath = osp.join(self.output_dir, fpath)
             fname = 'model' + ('%d'%itr if itr is not None else '') + '.pt'
             fname = osp.join(fpath, fname)
             os.makedirs(fpath, exist_ok=True)
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                # We are using a non-recommended way of saving PyTorch models,
-                # by pickling whole objects (which are dependent on the exact
-                # directory structure at the time of saving) as opposed to
-                # just saving network weights. This works sufficiently well
-                # for the purposes of Spinning Up, but you may want to do 
-                # something different for your personal PyTorch project.
-                # We use a catch_warnings() context to avoid the warnings about
-                # not being able to save the source code.
-                torch.save(self.pytorch_saver_elements, fname)
+            elements = self.pytorch_saver_elements
+            if self.writer is not None:
+                # Snapshot the weights, which the next update changes.
+                elements = copy.deepcopy(elements)
+            latest_fname = osp.join(fpath, 'model.pt') if latest else None
+            self._write(self._torch_save, elements, fname, latest_fname)
+
+    def _torch_save(self, elements, fname, latest_fname=None):
+        import torch
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            # We are using a non-recommended way of saving PyTorch models,
+            # by pickling whole objects (which are dependent on the exact
+            # directory structure at the time of saving) as opposed to
+            # just saving network weights. This works sufficiently well
+            # for the purposes of Spinning Up, but you may want to do 
+            # something different for your personal PyTorch project.
+            # We use a catch_warnings() context to avoid the warnings about
+            # not being able to save the source code.
+            # Replace the model atomically, since others (like a PBT 
+            # driver) may read it at any time.
+            torch.save(elements, fname + '.tmp')
+        os.replace(fname + '.tmp', fname)
+        if latest_fname is not None:
+            if osp.exists(latest_fname + '.tmp'):
+                os.remove(latest_fname + '.tmp')
+            try:
+                os.link(fname, latest_fname + '.tmp')
+            except OSError:
+                shutil.copyfile(fname, latest_fname + '.tmp')
+            os.replace(latest_fname + '.tmp', latest_fname)
 
 
+    def _pickle_state(self, state, dumps=partial(pickle.dumps, protocol=4)):
+        """
+        Pickle (or, with ``dumps=_snapshot``, snapshot) each entry of 
+        state, leaving out (with a warning, the first time) any which can't
+        be pickled, like some environments.
+        """
+        pickled = dict()
+        for k, v in state.items():
+            if k in self.unpicklable_keys:
+                continue
+            try:
+                pickled[k] = dumps(v)
+            except Exception as e:
+                self.unpicklable_keys.add(k)
+                print(colorize('Warning: could not pickle %s for the checkpoint (%s), so '
+                               'resuming will start it over.'%(k, e), 'red', bold=True))
+        return pickled
+
+    def save_checkpoint(self, state):
+        """
+        Save everything needed to resume a run exactly where it is now.
+
+        Unlike ``save_state``, which saves what is needed to use the 
+        trained model, this is for picking up training after the run is
+        interrupted, with a logger made with ``resume=True``.
+
+        Call this on every MPI process. Each process's ``state`` (eg the 
+        state dicts of the model and optimizers, the replay buffer, the 
+        environment and the loop counters), along with its random number 
+        generator states, is saved by the first process into a single file
+        (``checkpoint.pkl`` in the output directory), which is replaced 
+        atomically. The checkpoint also records how many rows of the 
+        progress file were logged before it.
+
+        With ``background_io``, the state is snapshotted (deep copied) for
+        the background thread to pickle, except for numpy arrays of more 
+        than ``SNAPSHOT_MAX_BYTES``, which are handed over without copying.
+        Those must only change, while the checkpoint is being written, 
+        where it doesn't matter for resuming: like the slots of a replay 
+        buffer from its pointer on (as with memory-mapped replay buffers, 
+        once the buffer is full, a resumed run may then sample a few newer
+        transitions in place of the ones they replaced).
+
+        Args:
+            state (dict): The state of the run. Entries which can't be 
+                pickled (or later unpickled) are left out, with a warning,
+                and the algorithm has to start them over.
+        """
+        rng = dict(numpy=np.random.get_state(), python=random.getstate())
+        if 'torch' in sys.modules:
+            rng['torch'] = sys.modules['torch'].get_rng_state()
+        state = dict(state, rng=rng)
+        snapshot = self.writer is not None and num_procs() == 1
+        if snapshot:
+            # Pickling is the slow part, so leave it to the background 
+            # thread, and only take a (much quicker) deep copy here.
+            states = [self._pickle_state(state, dumps=_snapshot)]
+        else:
+            pickled = self._pickle_state(state)
+            states = MPI.COMM_WORLD.gather(pickled, root=0) if num_procs() > 1 else [pickled]
+        if proc_id()==0:
+            checkpoint = dict(states=states, log_headers=list(self.log_headers), 
+                              log_rows=self.log_rows, 
+                              watchdog=copy.deepcopy(getattr(self, 'watchdog', None)),
+                              retention=copy.deepcopy(self.retention))
+            self._write(self._write_checkpoint, checkpoint, snapshot)
+
+    def _write_checkpoint(self, checkpoint, snapshot=False):
+        if snapshot:
+            checkpoint['states'] = [self._pickle_state(state) for state in checkpoint['states']]
+        path = osp.join(self.output_dir, CHECKPOINT_FNAME)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def load_checkpoint(self):
+        """
+        Get this process's state from the checkpoint the logger resumed 
+        from, and restore the random number generator states saved with it.
+
+        Call this once, on every process, right before the main loop (so
+        that nothing else draws random numbers after the states are 
+        restored).
+
+        Returns:
+            The ``state`` given to ``save_checkpoint``, or None if the logger 
+            wasn't made with ``resume=True``, or there was no checkpoint.
+        """
+        if self.checkpoint is None:
+            return None
+        state = dict()
+        for k, v in self.checkpoint['states'].items():
+            try:
+                state[k] = pickle.loads(v)
+            except Exception as e:
+                # (Eg an environment pickled with another version of gym.)
+                self.log('Warning: could not unpickle %s from the checkpoint (%s), '
+                         'so it starts over.'%(k, e), color='red')
+        self.checkpoint = None
+        rng = state.pop('rng')
+        np.random.set_state(rng['numpy'])
+        random.setstate(rng['python'])
+        if 'torch' in rng:
+            import torch
+            torch.set_rng_state(rng['torch'])
+        return state
+
     def dump_tabular(self):
         """
         Write all of the diagnostics from the current iteration.
@@ -279,26 +924,66 @@ class Logger:
         Writes both to stdout, and to the output file.
         """
         if proc_id()==0:
-            vals = []
-            key_lens = [len(key) for key in self.log_headers]
-            max_key_len = max(15,max(key_lens))
-            keystr = '%'+'%d'%max_key_len
-            fmt = "| " + keystr + "s | %15s |"
-            n_slashes = 22 + max_key_len
-            print("-"*n_slashes)
-            for key in self.log_headers:
-                val = self.log_current_row.get(key, "")
-                valstr = "%8.3g"%val if hasattr(val, "__float__") else val
-                print(fmt%(key, valstr))
-                vals.append(val)
-            print("-"*n_slashes, flush=True)
-            if self.output_file is not None:
-                if self.first_row:
-                    self.output_file.write("\t".join(self.log_headers)+"\n")
-                self.output_file.write("\t".join(map(str,vals))+"\n")
-                self.output_file.flush()
+            vals = [self.log_current_row.get(key, "") for key in self.log_headers]
+            self._write(self._write_row, list(self.log_headers), vals, self.first_row)
+            if self.retention is not None and \
+                    any(value is None for _, value in self.retention.saves):
+                removed = self.retention.score(self.log_current_row)
+                saves = dict(key=self.retention.key, best=self.retention.best(),
+                             saves=[[itr, float(value)] for itr, value in self.retention.saves])
+                self._write(self._remove_saves, removed, saves)
         self.log_current_row.clear()
         self.first_row=False
+        self.log_rows += 1
+
+    def _remove_saves(self, itrs, saves):
+        """
+        Remove the files of the saves numbered ``itrs``, and list the saves
+        left in ``saves.json``.
+        """
+        for itr in itrs:
+            # (Each save goes away in one step, so it is never seen half 
+            # removed.)
+            path = osp.join(self.output_dir, 'pyt_save', 'model%d.pt'%itr)
+            if osp.exists(path):
+                os.remove(path)
+            path = osp.join(self.output_dir, 'tf1_save%d'%itr)
+            if osp.exists(path):
+                os.rename(path, path + '.removed')
+                shutil.rmtree(path + '.removed')
+            path = osp.join(self.output_dir, 'vars%d.json'%itr)
+            if osp.exists(path):
+                os.remove(path)
+            self._state_manifests().pop('vars%d.json'%itr, None)
+        if osp.isdir(osp.join(self.output_dir, STATE_DIR)):
+            self._remove_unlisted_state()
+        path = osp.join(self.output_dir, 'saves.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(saves, f)
+        os.replace(path + '.tmp', path)
+
+    def _write_row(self, headers, vals, first_row):
+        key_lens = [len(key) for key in headers]
+        max_key_len = max(15,max(key_lens))
+        keystr = '%'+'%d'%max_key_len
+        fmt = "| " + keystr + "s | %15s |"
+        n_slashes = 22 + max_key_len
+        print("-"*n_slashes)
+        for key, val in zip(headers, vals):
+            valstr = "%8.3g"%val if hasattr(val, "__float__") else val
+            print(fmt%(key, valstr))
+        print("-"*n_slashes, flush=True)
+        if self.output_file is not None:
+            if first_row:
+                self.output_file.write("\t".join(headers)+"\n")
+            self.output_file.write("\t".join(map(str,vals))+"\n")
+            self.output_file.flush()
+        if self.binary_file is not None:
+            if first_row:
+                self.binary_file.write(_progress_bin_header(headers))
+            row = [float(val) if hasattr(val, "__float__") else np.nan for val in vals]
+            self.binary_file.write(np.array(row, dtype='<f8').tobytes())
+            self.binary_file.flush()
 
 class EpochLogger(Logger):
     """
@@ -323,11 +1008,25 @@ class EpochLogger(Logger):
         epoch_logger.log_tabular(NameOfQuantity, **options)
 
     to record the desired values.
+
+    Statistics of stored quantities are computed across MPI processes for
+    all keys at once, when ``dump_tabular`` is called.
+
+    With a ``watchdog`` (a ``Watchdog``, or a dict of args for one), 
+    ``dump_tabular`` raises ``RunStopped`` once the run has diverged or 
+    stalled. Like the other logger kwargs, it can be given to experiment
+    grids, eg with ``eg.add('logger_kwargs:watchdog', dict(...))``.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, watchdog=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.epoch_dict = dict()
+        self.pending_stats = []
+        self.watchdog = Watchdog(**watchdog) if isinstance(watchdog, dict) else watchdog
+        if self.watchdog is not None and self.checkpoint is not None and \
+                self.checkpoint['watchdog'] is not None:
+            # Pick up the plateau counts from where they were.
+            self.watchdog = self.checkpoint['watchdog']
 
     def store(self, **kwargs):
         """
@@ -365,15 +1064,52 @@ class EpochLogger(Logger):
         else:
             v = self.epoch_dict[key]
             vals = np.concatenate(v) if isinstance(v[0], np.ndarray) and len(v[0].shape)>0 else v
-            stats = mpi_statistics_scalar(vals, with_min_and_max=with_min_and_max)
-            super().log_tabular(key if average_only else 'Average' + key, stats[0])
+            # Reserve the columns now (to keep their order), and fill them in
+            # once the statistics of all keys are reduced in dump_tabular.
+            self.pending_stats.append((key, vals, with_min_and_max, average_only))
+            super().log_tabular(key if average_only else 'Average' + key, None)
             if not(average_only):
-                super().log_tabular('Std'+key, stats[1])
+                super().log_tabular('Std'+key, None)
             if with_min_and_max:
-                super().log_tabular('Max'+key, stats[3])
-                super().log_tabular('Min'+key, stats[2])
+                super().log_tabular('Max'+key, None)
+                super().log_tabular('Min'+key, None)
         self.epoch_dict[key] = []
 
+    def dump_tabular(self):
+        """
+        Write all of the diagnostics from the current iteration.
+
+        First computes the statistics of all diagnostics logged with
+        ``log_tabular`` from stored values, across MPI processes, in one
+        collective. Then, if there is a watchdog, raises ``RunStopped`` on
+        every process if it says to stop the run.
+        """
+        stored_keys = []
+        if len(self.pending_stats) > 0:
+            all_stats = mpi_statistics_batch([vals for _, vals, _, _ in self.pending_stats])
+            for (key, _, with_min_and_max, average_only), stats in \
+                    zip(self.pending_stats, all_stats):
+                self.log_current_row[key if average_only else 'Average' + key] = stats[0]
+                if not(average_only):
+                    self.log_current_row['Std'+key] = stats[1]
+                if with_min_and_max:
+                    self.log_current_row['Max'+key] = stats[3]
+                    self.log_current_row['Min'+key] = stats[2]
+                stored_keys.append(key if average_only else 'Average' + key)
+            self.pending_stats = []
+
+        reason = None
+        if self.watchdog is not None:
+            if proc_id() == 0:
+                reason = self.watchdog(self.log_current_row, stored_keys, 
+                                       getattr(self, 'pytorch_saver_elements', None))
+            if num_procs() > 1:
+                reason = MPI.COMM_WORLD.bcast(reason, root=0)
+        super().dump_tabular()
+        if reason is not None:
+            self.log('Stopping the run: %s.'%reason, color='red')
+            raise RunStopped(reason)
+
     def get_stats(self, key):
         """
         Lets an algorithm ask the logger for mean/std/min/max of a diagnostic.
@@ -2,8 +2,12 @@ import multiprocessing
 import numpy as np
 import os
 import torch
+import weakref
 from mpi4py import MPI
-from spinup.utils.mpi_tools import broadcast, mpi_avg, num_procs, proc_id
+from spinup.utils.mpi_tools import allreduce, broadcast, num_procs, proc_id
+
+# Persistent flat gradient buffers for mpi_avg_grads, one per module.
+_grad_buffers = weakref.WeakKeyDictionary()
 
 def setup_pytorch_for_mpi():
     """
@@ -18,13 +22,32 @@ def setup_pytorch_for_mpi():
     #print('Proc %d: Reporting new number of Torch threads as %d.'%(proc_id(), torch.get_num_threads()), flush=True)
 
 def mpi_avg_grads(module):
-    """ Average contents of gradient buffers across MPI processes. """
+    """
+    Average contents of gradient buffers across MPI processes.
+
+    All gradients of the module are packed into one contiguous buffer, which
+    is averaged with a single in-place Allreduce and then unpacked. The
+    buffer is kept for the next call, so after the first call this does
+    not allocate.
+    """
     if num_procs()==1:
         return
-    for p in module.parameters():
-        p_grad_numpy = p.grad.numpy()   # numpy view of tensor data
-        avg_p_grad = mpi_avg(p.grad)
-        p_grad_numpy[:] = avg_p_grad[:]
+    grads = [p.grad for p in module.parameters()]
+    size = sum(g.numel() for g in grads)
+    flat, views = _grad_buffers.get(module, (None, None))
+    if flat is None or flat.numel() != size:
+        flat = torch.zeros(size, dtype=torch.float32)
+        views, offset = [], 0
+        for g in grads:
+            views.append(flat[offset:offset+g.numel()].view_as(g))
+            offset += g.numel()
+        _grad_buffers[module] = (flat, views)
+    torch.cat([g.reshape(-1) for g in grads], out=flat)
+    flat_numpy = flat.numpy()   # numpy view of tensor data
+    allreduce(MPI.IN_PLACE, flat_numpy, op=MPI.SUM)
+    flat_numpy /= num_procs()
+    for g, v in zip(grads, views):
+        g.copy_(v)
 
 def sync_params(module):
     """ Sync all parameters of module across all MPI processes. """
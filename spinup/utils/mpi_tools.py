@@ -89,4 +89,46 @@ def mpi_statistics_scalar(x, with_min_and_max=False):
         global_min = mpi_op(np.min(x) if len(x) > 0 else np.inf, op=MPI.MIN)
         global_max = mpi_op(np.max(x) if len(x) > 0 else -np.inf, op=MPI.MAX)
         return mean, std, global_min, global_max
-    return mean, std
\ No newline at end of file
+    return mean, std
+
+def mpi_statistics_batch(xs):
+    """
+    Get mean/std/min/max of several scalars across MPI processes at once.
+
+    Gives the same statistics as calling ``mpi_statistics_scalar`` (with
+    ``with_min_and_max=True``) on each of ``xs``, but takes only a single
+    collective (an ``Allgather`` of per-process count / sum / sum of
+    squared deviations / min / max), however many scalars there are.
+
+    Args:
+        xs: A list of arrays, each containing samples of one scalar to
+            produce statistics for.
+
+    Returns:
+        A list with a ``(mean, std, min, max)`` tuple for each of ``xs``.
+    """
+    local = np.zeros((len(xs), 5))
+    for i, x in enumerate(xs):
+        x = np.array(x, dtype=np.float64).reshape(-1)
+        if len(x) > 0:
+            local[i] = [len(x), np.sum(x), np.sum((x - np.mean(x))**2),
+                        np.min(x), np.max(x)]
+        else:
+            local[i] = [0, 0, 0, np.inf, -np.inf]
+
+    if num_procs() > 1:
+        gathered = np.zeros((num_procs(),) + local.shape)
+        MPI.COMM_WORLD.Allgather(local, gathered)
+    else:
+        gathered = local[None]
+    n, sums, sq_devs, mins, maxs = np.moveaxis(gathered, -1, 0)
+
+    global_n = np.sum(n, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.sum(sums, axis=0) / global_n
+        # Each process's squared deviations are about its own mean; shift
+        # them to be about the global mean before summing.
+        local_mean = np.where(n > 0, sums / np.maximum(n, 1), 0)
+        global_sq_dev = np.sum(sq_devs + n * (local_mean - mean)**2, axis=0)
+        std = np.sqrt(global_sq_dev / global_n)
+    return list(zip(mean, std, np.min(mins, axis=0), np.max(maxs, axis=0)))
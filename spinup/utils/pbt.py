@@ -0,0 +1,137 @@
+"""
+How a population based training (PBT) driver talks to the members of its
+population.
+
+Algorithms run with ``pbt=True`` save the ``state_dict`` of their model
+with ``save_pbt_weights`` whenever they save it. The driver
+(``PopulationBasedTraining`` in ``spinup/utils/run_utils.py``) sends a 
+member new weights and hyperparameters by copying another member's saved
+weights into the member's output directory, and writing ``pbt.json`` next
+to it. The algorithms call ``pbt_update`` at the end of every epoch, which
+takes the update on (and removes it) if there is one.
+
+Weights go around as ``state_dict``s, rather than as the pickled modules
+of ``pyt_save/model.pt``, so the driver never has to import torch, and 
+``torch.load`` can read them without unpickling arbitrary objects (which
+recent versions of torch refuse to do by default).
+"""
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+from mpi4py import MPI
+from spinup.utils.mpi_tools import num_procs, proc_id
+
+PBT_FNAME = 'pbt.json'
+
+# File in which members save the weights the driver copies (see save_pbt_weights).
+PBT_WEIGHTS_FNAME = 'pbt_weights.pt'
+
+
+def save_pbt_weights(output_dir, ac):
+    """
+    Save the ``state_dict`` of ``ac`` as the weights of the member of a 
+    population in ``output_dir``, for the driver to send to other members.
+
+    Only the first MPI process saves (like the logger). The file is 
+    replaced atomically, so the driver never copies a partial one.
+    """
+    if proc_id() != 0 or output_dir is None:
+        return
+    import torch
+    path = osp.join(output_dir, PBT_WEIGHTS_FNAME)
+    torch.save(ac.state_dict(), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def send_pbt_update(output_dir, weights_path, hparams):
+    """
+    Send weights (saved by ``save_pbt_weights``) and hyperparameters to 
+    the member of a population in ``output_dir``.
+
+    An update which the member hasn't taken on yet is replaced.
+
+    Returns:
+        True if an update was replaced, and False otherwise.
+    """
+    replaced = discard_pbt_update(output_dir)
+    pbt_dir = osp.join(output_dir, 'pbt')
+    os.makedirs(pbt_dir, exist_ok=True)
+    fd, weights_copy = tempfile.mkstemp(prefix='weights_', suffix='.pt', dir=pbt_dir)
+    os.close(fd)
+    shutil.copyfile(weights_path, weights_copy)
+
+    path = osp.join(output_dir, PBT_FNAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(dict(weights=weights_copy, hparams=hparams), f)
+    os.replace(path + '.tmp', path)
+    return replaced
+
+
+def discard_pbt_update(output_dir):
+    """
+    Remove an update which the member in ``output_dir`` hasn't taken on.
+
+    Returns:
+        True if there was one, and False otherwise.
+    """
+    path = osp.join(output_dir, PBT_FNAME)
+    try:
+        with open(path) as f:
+            sent = json.load(f)
+        os.remove(path)
+    except FileNotFoundError:
+        # (There was none, or the member has just taken it.)
+        return False
+    if osp.exists(sent['weights']):
+        os.remove(sent['weights'])
+    return True
+
+
+def pbt_update(output_dir, ac, hparams):
+    """
+    Take on the weights and hyperparameters sent by a PBT driver, if any.
+
+    Call this on every MPI process. The update is read by the first process
+    (the only one which needs ``output_dir``, like the logger) and shared
+    with the others.
+
+    Args:
+        output_dir (string): The member's output directory.
+
+        ac: The module to load the weights into.
+
+        hparams (dict): The current values of the hyperparameters which
+            the algorithm can change during training. Updated in place.
+
+    Returns:
+        True if there was an update, and False otherwise.
+    """
+    update = None
+    if proc_id() == 0 and output_dir is not None:
+        path = osp.join(output_dir, PBT_FNAME)
+        if osp.exists(path):
+            # Claim the update before reading it, so that one sent in the
+            # meantime isn't lost.
+            os.replace(path, path + '.taken')
+            with open(path + '.taken') as f:
+                sent = json.load(f)
+            os.remove(path + '.taken')
+            import torch
+            state_dict = torch.load(sent['weights'])
+            os.remove(sent['weights'])
+            update = (state_dict, sent['hparams'])
+    if num_procs() > 1:
+        update = MPI.COMM_WORLD.bcast(update, root=0)
+    if update is None:
+        return False
+
+    state_dict, new_hparams = update
+    unknown = set(new_hparams) - set(hparams)
+    if len(unknown) > 0:
+        raise ValueError('PBT tried to change %s, but only %s can be changed '
+                         'during training.'%(sorted(unknown), sorted(hparams)))
+    ac.load_state_dict(state_dict)
+    hparams.update(new_hparams)
+    return True
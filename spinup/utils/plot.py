@@ -65,13 +65,16 @@ def get_datasets(logdir, condition=None):
     Recursively look through logdir for output files produced by
     spinup.logx.Logger. 
 
-    Assumes that any file "progress.txt" is a valid hit. 
+    Assumes that any file "progress.txt" (or "progress.bin") is a valid 
+    hit. Reads "progress.bin" when there is one, since it needs no parsing.
     """
+    # (Imported here, so plotting doesn't need what logx imports, eg mpi4py.)
+    from spinup.utils.logx import load_progress, PROGRESS_BIN_FNAME
     global exp_idx
     global units
     datasets = []
     for root, _, files in os.walk(logdir):
-        if 'progress.txt' in files:
+        if 'progress.txt' in files or PROGRESS_BIN_FNAME in files:
             exp_name = None
             try:
                 config_path = open(os.path.join(root,'config.json'))
@@ -93,9 +96,12 @@ def get_datasets(logdir, condition=None):
             units[condition1] += 1
 
             try:
-                exp_data = pd.read_table(os.path.join(root,'progress.txt'))
+                if PROGRESS_BIN_FNAME in files:
+                    exp_data = pd.DataFrame(load_progress(root))
+                else:
+                    exp_data = pd.read_table(os.path.join(root,'progress.txt'))
             except:
-                print('Could not read from %s'%os.path.join(root,'progress.txt'))
+                print('Could not read from %s'%root)
                 continue
             performance = 'AverageTestEpRet' if 'AverageTestEpRet' in exp_data else 'AverageEpRet'
             exp_data.insert(len(exp_data.columns),'Unit',unit)
@@ -0,0 +1,320 @@
+"""
+
+Alternative experience replay buffers for the off-policy algorithms.
+
+These are drop-in replacements for the simple ``ReplayBuffer`` in each of
+the off-policy algorithm files: they share its ``store`` / ``sample_batch``
+/ ``save`` interface and its ``ptr`` / ``size`` attributes. All of them
+(like the simple ``ReplayBuffer``) sample batches with ``BatchGatherer``.
+
+"""
+import numpy as np
+import torch
+from spinup.utils.replay_storage import ReplayStorage
+
+
+def combined_shape(length, shape=None):
+    if shape is None:
+        return (length,)
+    return (length, shape) if np.isscalar(shape) else (length, *shape)
+
+
+class BatchGatherer:
+    """
+    Gathers sampled rows of replay buffer arrays into reused torch tensors.
+
+    Rather than fancy-indexing a fresh numpy array for every field of every
+    batch, rows are copied with ``np.take(..., out=...)`` straight into
+    float32 tensors which are allocated once per field and batch shape.
+    Note that this means the tensors returned by one call are overwritten
+    by the next one.
+    """
+
+    def __init__(self):
+        self.tensors = dict()
+        self.staging = dict()
+
+    def tensor(self, name, shape):
+        """Get the reused float32 tensor for field ``name``."""
+        out = self.tensors.get(name)
+        if out is None or out.shape != shape:
+            out = self.tensors[name] = torch.empty(shape, dtype=torch.float32)
+        return out
+
+    def take(self, name, arr, idxs):
+        """
+        Gather rows ``idxs`` of ``arr`` into the tensor for ``name``, of 
+        shape ``idxs.shape + arr.shape[1:]``.
+        """
+        shape = np.shape(idxs) + arr.shape[1:]
+        out = self.tensor(name, shape)
+        if arr.dtype == np.float32:
+            # (mode='clip' skips the bounds check, so numpy does not need a
+            # temporary buffer. Indices are always in range here anyway.)
+            np.take(arr, idxs, axis=0, out=out.numpy(), mode='clip')
+        else:
+            # Gather in the stored dtype first, then convert.
+            stage = self.staging.get(name)
+            if stage is None or stage.shape != shape or stage.dtype != arr.dtype:
+                stage = self.staging[name] = np.empty(shape, dtype=arr.dtype)
+            np.take(arr, idxs, axis=0, out=stage, mode='clip')
+            np.copyto(out.numpy(), stage)
+        return out
+
+    def take_all(self, idxs, **arrays):
+        """Gather rows ``idxs`` of each of ``arrays`` into a batch dict."""
+        return {k: self.take(k, arr, idxs) for k, arr in arrays.items()}
+
+
+class CompactReplayBuffer:
+    """
+    A FIFO experience replay buffer which stores each observation only once.
+
+    Within an episode, the next observation of one transition is the
+    observation of the following one, so observations go into a single ring
+    and a transition just remembers the slot of its observation: its next
+    observation is in the slot after that. An extra slot is only spent when
+    a transition does not continue the previous one (ie at episode
+    boundaries), which is detected by comparing ``obs`` against the previous
+    ``next_obs``.
+
+    Observations can additionally be stored in lower precision: ``float16``,
+    or ``uint8`` linearly quantized between ``obs_low`` and ``obs_high``
+    (eg the bounds of the observation space), and are converted back to
+    float32 when sampled.
+
+    Because the observation ring has as many slots as there are transitions,
+    every episode boundary in the buffer costs one transition of capacity:
+    when an observation slot is reused, the oldest transitions referring to
+    it are dropped. So transitions must be stored in order, one episode at
+    a time: interleaving several environments (eg ``EnvWorkers``) would 
+    make every transition an episode boundary.
+    """
+
+    def __init__(self, obs_dim, act_dim, size, obs_dtype=np.float32,
+                 obs_low=None, obs_high=None, storage_dir=None):
+        self.obs_dtype = np.dtype(obs_dtype)
+        assert self.obs_dtype in (np.float32, np.float16, np.uint8), \
+            "Observations can only be stored as float32, float16 or uint8."
+        if self.obs_dtype == np.uint8:
+            assert obs_low is not None and obs_high is not None \
+                and np.all(np.isfinite(obs_low)) and np.all(np.isfinite(obs_high)), \
+                "Storing observations as uint8 needs finite obs_low and obs_high."
+            self.obs_low = np.asarray(obs_low, dtype=np.float32)
+            self.obs_scale = (np.asarray(obs_high, dtype=np.float32) - self.obs_low) / 255.
+
+        self.storage = ReplayStorage(storage_dir)
+        self.obs_buf = self.storage.array('obs', combined_shape(size, obs_dim), self.obs_dtype)
+        self.obs_idx_buf = self.storage.array('obs_idx', size, np.int64)
+        self.act_buf = self.storage.array('act', combined_shape(size, act_dim))
+        self.rew_buf = self.storage.array('rew', size)
+        self.done_buf = self.storage.array('done', size)
+        state = self.storage.load_state()
+        self.ptr, self.size, self.max_size = state.get('ptr', 0), state.get('size', 0), size
+        # Next free observation slot, and the raw next_obs last stored (to
+        # tell whether the next transition continues the same episode).
+        self.obs_ptr = state.get('obs_ptr', 0)
+        self.last_next_obs = None
+        self.gatherer = BatchGatherer()
+
+    def _quantize(self, obs):
+        if self.obs_dtype == np.uint8:
+            q = np.round((np.asarray(obs, dtype=np.float32) - self.obs_low) / self.obs_scale)
+            return np.clip(q, 0, 255)
+        return obs
+
+    def _dequantize(self, obs):
+        """Convert gathered (float32) quantized observations back in place."""
+        if self.obs_dtype == np.uint8:
+            obs = obs.numpy()
+            np.multiply(obs, self.obs_scale, out=obs)
+            obs += self.obs_low
+
+    def _write_obs(self, obs):
+        """Write obs into the next observation slot and return the slot."""
+        slot = self.obs_ptr
+        # Drop the oldest transitions if they still refer to this slot.
+        while self.size > 0:
+            oldest = (self.ptr - self.size) % self.max_size
+            first = self.obs_idx_buf[oldest]
+            if slot != first and slot != (first + 1) % self.max_size:
+                break
+            self.size -= 1
+        self.obs_buf[slot] = self._quantize(obs)
+        self.obs_ptr = (self.obs_ptr + 1) % self.max_size
+        return slot
+
+    def store(self, obs, act, rew, next_obs, done):
+        if self.last_next_obs is not None and np.array_equal(obs, self.last_next_obs):
+            # Continues the previous transition: obs is already in the ring.
+            slot = (self.obs_ptr - 1) % self.max_size
+        else:
+            slot = self._write_obs(obs)
+        self._write_obs(next_obs)
+        self.last_next_obs = np.array(next_obs)
+
+        # The transition ring itself is FIFO, like the simple buffer.
+        if self.size == self.max_size:
+            self.size -= 1
+        self.obs_idx_buf[self.ptr] = slot
+        self.act_buf[self.ptr] = act
+        self.rew_buf[self.ptr] = rew
+        self.done_buf[self.ptr] = done
+        self.ptr = (self.ptr+1) % self.max_size
+        self.size = self.size+1
+
+    def sample_batch(self, batch_size=32):
+        oldest = self.ptr - self.size
+        idxs = (oldest + np.random.randint(0, self.size, size=batch_size)) % self.max_size
+        obs_idxs = self.obs_idx_buf[idxs]
+        batch = self.gatherer.take_all(idxs, act=self.act_buf, rew=self.rew_buf,
+                                       done=self.done_buf)
+        batch['obs'] = self.gatherer.take('obs', self.obs_buf, obs_idxs)
+        obs_idxs += 1
+        obs_idxs %= self.max_size
+        batch['obs2'] = self.gatherer.take('obs2', self.obs_buf, obs_idxs)
+        self._dequantize(batch['obs'])
+        self._dequantize(batch['obs2'])
+        return batch
+
+    def save(self):
+        """Flush a memory-mapped buffer to disk, so it can be restored."""
+        self.storage.save_state(ptr=self.ptr, size=self.size, obs_ptr=self.obs_ptr)
+
+    def state_dict(self):
+        """The contents and pointers of the buffer, for a checkpoint."""
+        return self.storage.state_dict(ptr=self.ptr, size=self.size, obs_ptr=self.obs_ptr,
+                                       last_next_obs=self.last_next_obs)
+
+    def load_state_dict(self, state_dict):
+        state = self.storage.load_state_dict(state_dict)
+        self.ptr, self.size, self.obs_ptr = state['ptr'], state['size'], state['obs_ptr']
+        self.last_next_obs = state['last_next_obs']
+
+
+class SumTree:
+    """
+    An array-based binary tree where each node holds the sum of its children.
+
+    Leaves hold (nonnegative) priorities. Both updating a batch of leaves and
+    sampling a batch of leaves proportionally to their priorities take
+    O(log n) vectorized numpy operations.
+    """
+
+    def __init__(self, size):
+        # Round the number of leaves up to a power of two, so that the tree
+        # is complete: the root is node 1, node i has children 2i and 2i+1,
+        # and leaf j is node num_leaves + j.
+        self.depth = int(np.ceil(np.log2(max(size, 2))))
+        self.num_leaves = 2**self.depth
+        self.tree = np.zeros(2 * self.num_leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idxs):
+        return self.tree[self.num_leaves + np.asarray(idxs)]
+
+    def update(self, idxs, priorities):
+        """Set the priorities of leaves ``idxs``, and then fix up the sums."""
+        nodes = self.num_leaves + np.asarray(idxs)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2*nodes] + self.tree[2*nodes + 1]
+
+    def find(self, values):
+        """
+        For each value in [0, total), find the leaf whose prefix sum range
+        contains it.
+        """
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            go_right = values >= self.tree[left]
+            values = np.where(go_right, values - self.tree[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.num_leaves
+
+
+class PrioritizedReplayBuffer:
+    """
+    A FIFO experience replay buffer with proportional prioritized sampling.
+
+    Transitions are sampled with probability proportional to
+    ``priority**alpha``, using a ``SumTree``. New transitions get the
+    largest priority seen so far, and priorities are updated from the
+    absolute TD errors of sampled transitions with ``update_priorities``.
+    Sampled batches also hold the sampled ``idxs`` and importance-sampling
+    ``weights`` (normalized so the largest is 1), which correct for the
+    non-uniform sampling to the degree set by ``beta``.
+    """
+
+    def __init__(self, obs_dim, act_dim, size, alpha=0.6, beta=0.4,
+                 eps=1e-6, storage_dir=None):
+        self.storage = ReplayStorage(storage_dir)
+        self.obs_buf = self.storage.array('obs', combined_shape(size, obs_dim))
+        self.obs2_buf = self.storage.array('obs2', combined_shape(size, obs_dim))
+        self.act_buf = self.storage.array('act', combined_shape(size, act_dim))
+        self.rew_buf = self.storage.array('rew', size)
+        self.done_buf = self.storage.array('done', size)
+        self.tree = SumTree(size)
+        self.tree.tree = self.storage.array('priorities', len(self.tree.tree), np.float64)
+        state = self.storage.load_state()
+        self.ptr, self.size, self.max_size = state.get('ptr', 0), state.get('size', 0), size
+        self.max_priority = state.get('max_priority', 1.0)
+        self.alpha, self.beta, self.eps = alpha, beta, eps
+        self.gatherer = BatchGatherer()
+
+    def store(self, obs, act, rew, next_obs, done):
+        self.obs_buf[self.ptr] = obs
+        self.obs2_buf[self.ptr] = next_obs
+        self.act_buf[self.ptr] = act
+        self.rew_buf[self.ptr] = rew
+        self.done_buf[self.ptr] = done
+        self.tree.update([self.ptr], self.max_priority ** self.alpha)
+        self.ptr = (self.ptr+1) % self.max_size
+        self.size = min(self.size+1, self.max_size)
+
+    def sample_batch(self, batch_size=32):
+        # Stratified sampling: one sample from each of batch_size equal
+        # slices of the total priority mass.
+        total = self.tree.total()
+        bounds = np.arange(batch_size) * (total / batch_size)
+        values = bounds + np.random.uniform(0, total / batch_size, size=batch_size)
+        # (Guard against float round-off walking into empty leaves.)
+        idxs = np.minimum(self.tree.find(values), self.size-1)
+
+        probs = self.tree.get(idxs) / total
+        weights = (self.size * probs) ** (-self.beta)
+        weights /= weights.max()
+
+        batch = self.gatherer.take_all(idxs, obs=self.obs_buf, obs2=self.obs2_buf,
+                                       act=self.act_buf, rew=self.rew_buf,
+                                       done=self.done_buf)
+        batch['weights'] = self.gatherer.tensor('weights', (batch_size,))
+        batch['weights'].numpy()[:] = weights
+        batch['idxs'] = torch.as_tensor(idxs)
+        return batch
+
+    def update_priorities(self, idxs, td_errors):
+        """Set new priorities for transitions ``idxs`` from their TD errors."""
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(np.asarray(idxs), priorities ** self.alpha)
+
+    def save(self):
+        """Flush a memory-mapped buffer to disk, so it can be restored."""
+        self.storage.save_state(ptr=self.ptr, size=self.size,
+                                max_priority=float(self.max_priority))
+
+    def state_dict(self):
+        """The contents, pointers and priorities of the buffer, for a checkpoint."""
+        return self.storage.state_dict(ptr=self.ptr, size=self.size,
+                                       max_priority=self.max_priority)
+
+    def load_state_dict(self, state_dict):
+        state = self.storage.load_state_dict(state_dict)
+        self.ptr, self.size = state['ptr'], state['size']
+        self.max_priority = state['max_priority']
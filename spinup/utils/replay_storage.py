@@ -0,0 +1,122 @@
+"""
+
+Storage backend for replay buffers.
+
+Arrays either live in RAM (the default), or in memory-mapped ``.npy`` files
+in a directory on disk. Memory-mapped buffers can grow beyond RAM, can be
+opened by other processes without copying (e.g. with
+``np.load(path, mmap_mode='r')``), and survive the process: together with
+the pointers saved by ``save_state``, they can be restored after a restart.
+
+"""
+import json
+import numpy as np
+import os
+import os.path as osp
+
+
+class ReplayStorage:
+    """
+    Allocates the arrays of a replay buffer and persists its pointers.
+
+    With ``storage_dir=None``, arrays are plain ``np.zeros`` and nothing is
+    ever written to disk.
+    """
+
+    def __init__(self, storage_dir=None):
+        self.storage_dir = storage_dir
+        self.arrays = dict()
+        # Whether every array so far was reopened from an earlier run
+        self.restored = storage_dir is not None
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+
+    def array(self, name, shape, dtype=np.float32):
+        """
+        Get a zero-initialized array, or the existing memory-mapped one.
+
+        An existing file is only reused if its shape and dtype match;
+        otherwise it is overwritten.
+        """
+        if self.storage_dir is None:
+            arr = self.arrays[name] = np.zeros(shape, dtype=dtype)
+            return arr
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        fname = osp.join(self.storage_dir, name + '.npy')
+        arr = None
+        if osp.exists(fname):
+            try:
+                arr = np.load(fname, mmap_mode='r+')
+            except (ValueError, OSError, EOFError):
+                # Unreadable (eg truncated) file: start it over.
+                arr = None
+            if arr is not None and (arr.shape != shape or arr.dtype != np.dtype(dtype)):
+                arr = None
+        if arr is None:
+            arr = np.lib.format.open_memmap(fname, mode='w+', dtype=dtype, shape=shape)
+            self.restored = False
+        self.arrays[name] = arr
+        return arr
+
+    def load_state(self):
+        """
+        Get the pointers saved by the last ``save_state``, as a dict.
+
+        Empty if there is nothing to restore (RAM storage, no earlier save,
+        or arrays that had to be reallocated).
+        """
+        fname = osp.join(self.storage_dir or '', 'state.json')
+        if not(self.restored) or not osp.exists(fname):
+            return dict()
+        with open(fname) as f:
+            return json.load(f)
+
+    def save_state(self, **state):
+        """
+        Flush the arrays to disk and record ``state`` (eg pointers).
+
+        Does nothing for RAM storage. The state file is replaced atomically,
+        so a crash mid-save leaves the previous state file intact.
+        """
+        if self.storage_dir is None:
+            return
+        for arr in self.arrays.values():
+            arr.flush()
+        fname = osp.join(self.storage_dir, 'state.json')
+        with open(fname + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(fname + '.tmp', fname)
+
+    def state_dict(self, **state):
+        """
+        The contents of the arrays, and ``state`` (eg pointers), for a 
+        checkpoint (see ``Logger.save_checkpoint``).
+
+        Memory-mapped arrays are already on disk, so they are only flushed,
+        and the checkpoint records where they are instead of copying them.
+        (Transitions stored after the checkpoint stay in the files, so once
+        the buffer is full, a resumed run may sample a few of them where 
+        the interrupted run sampled the older transitions they replaced.)
+        """
+        if self.storage_dir is not None:
+            for arr in self.arrays.values():
+                arr.flush()
+            return dict(storage_dir=self.storage_dir, state=state)
+        return dict(arrays={name: np.asarray(arr) for name, arr in self.arrays.items()},
+                    state=state)
+
+    def load_state_dict(self, state_dict):
+        """
+        Copy the contents of the arrays back from ``state_dict`` (or, for 
+        memory-mapped arrays, check they are the ones it was saved from), 
+        and return the ``state`` saved with them.
+        """
+        if 'arrays' not in state_dict:
+            assert self.restored and self.storage_dir is not None and \
+                osp.abspath(self.storage_dir) == osp.abspath(state_dict['storage_dir']), \
+                "The checkpoint's replay buffer is in %s, which couldn't be reopened."%(
+                    state_dict['storage_dir'])
+            return state_dict['state']
+        for name, arr in self.arrays.items():
+            arr[...] = state_dict['arrays'][name]
+        return state_dict['state']
@@ -5,7 +5,12 @@ import base64
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument('encoded_thunk')
+    parser.add_argument('encoded_thunk', nargs='?')
+    parser.add_argument('--thunk_file')
     args = parser.parse_args()
-    thunk = pickle.loads(zlib.decompress(base64.b64decode(args.encoded_thunk)))
-    thunk()
\ No newline at end of file
+    if args.thunk_file is not None:
+        with open(args.thunk_file, 'rb') as f:
+            thunk = pickle.loads(zlib.decompress(f.read()))
+    else:
+        thunk = pickle.loads(zlib.decompress(base64.b64decode(args.encoded_thunk)))
+    thunk()
@@ -1,20 +1,30 @@
 from spinup.user_config import DEFAULT_DATA_DIR, FORCE_DATESTAMP, \
-                               DEFAULT_SHORTHAND, WAIT_BEFORE_LAUNCH
-from spinup.utils.logx import colorize
-from spinup.utils.mpi_tools import mpi_fork, msg
-from spinup.utils.serialization_utils import convert_json
-import base64
+                               DEFAULT_SHORTHAND, WAIT_BEFORE_LAUNCH, \
+                               WARM_START_PRELOAD
+from spinup.utils.logx import colorize, load_progress, RunStopped, PROGRESS_BIN_FNAME
+from spinup.utils.mpi_tools import mpi_fork, msg, proc_id
+from spinup.utils.pbt import PBT_WEIGHTS_FNAME, discard_pbt_update, send_pbt_update
+from spinup.utils.serialization_utils import convert_json, is_json_serializable
+from spinup.utils.warm_start import get_warm_server
+import contextlib
+import hashlib
+import inspect
 from copy import deepcopy
+from functools import partial
+import io
 import cloudpickle
 import json
 import numpy as np
 import os
 import os.path as osp
 import psutil
+import re
+import signal
 import string
 import subprocess
 from subprocess import CalledProcessError
 import sys
+import tempfile
 from textwrap import dedent
 import time
 from tqdm import trange
@@ -22,6 +32,9 @@ import zlib
 
 DIV_LINE_WIDTH = 80
 
+# File in which experiments record their status (see run_status).
+RUN_STATUS_FNAME = 'run_status.json'
+
 def setup_logger_kwargs(exp_name, seed=None, data_dir=None, datestamp=False):
     """
     Sets up the output_dir for a logger and returns a dict for logger kwargs.
@@ -86,45 +99,67 @@ def setup_logger_kwargs(exp_name, seed=None, data_dir=None, datestamp=False):
     return logger_kwargs
 
 
-def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, 
-                    datestamp=False, **kwargs):
+def config_hash(exp_name, thunk, kwargs):
     """
-    Run a function (thunk) with hyperparameters (kwargs), plus configuration.
-
-    This wraps a few pieces of functionality which are useful when you want
-    to run many experiments in sequence, including logger configuration and
-    splitting into multiple processes for MPI. 
-
-    There's also a SpinningUp-specific convenience added into executing the
-    thunk: if ``env_name`` is one of the kwargs passed to call_experiment, it's
-    assumed that the thunk accepts an argument called ``env_fn``, and that
-    the ``env_fn`` should make a gym environment with the given ``env_name``. 
-
-    The way the experiment is actually executed is slightly complicated: the
-    function is serialized to a string, and then ``run_entrypoint.py`` is
-    executed in a subprocess call with the serialized string as an argument.
-    ``run_entrypoint.py`` unserializes the function call and executes it.
-    We choose to do it this way---instead of just calling the function 
-    directly here---to avoid leaking state between successive experiments.
+    Hash which identifies an experiment by its name, thunk and kwargs.
 
-    Args:
-
-        exp_name (string): Name for experiment.
+    Runs with the same hash do the same thing, so a finished one can stand in
+    for another. ``logger_kwargs`` and ``resume`` are left out, since they
+    don't change what is run. Objects which can't be written as JSON are 
+    hashed by their names or string forms, minus any memory addresses.
+    """
+    def canonical(obj):
+        if isinstance(obj, dict):
+            return {str(k): canonical(v) for k, v in obj.items()}
+        if isinstance(obj, (tuple, list)):
+            return [canonical(x) for x in obj]
+        obj = convert_json(obj)
+        return obj if is_json_serializable(obj) else str(obj)
+    thunk_name = getattr(thunk, '__module__', '') + '.' + \
+                 getattr(thunk, '__qualname__', str(thunk))
+    config = {k: v for k, v in kwargs.items() if k not in ('logger_kwargs', 'resume')}
+    text = json.dumps(canonical(dict(exp_name=exp_name, thunk=thunk_name, kwargs=config)),
+                      sort_keys=True)
+    text = re.sub(r' at 0x[0-9a-fA-F]+', '', text)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def run_status(output_dir):
+    """
+    Read the status which an experiment recorded in its output directory.
 
-        thunk (callable): A python function.
+    Returns None if there is none, or else a dict with the experiment's
+    ``config_hash`` and its ``status``, which is ``'running'`` until the
+    experiment finishes successfully, and ``'done'`` after. Experiments 
+    stopped early (by a scheduler's monitor, or the logger's ``Watchdog``)
+    have status ``'stopped'``, and the ``reason``.
+    """
+    path = osp.join(output_dir, RUN_STATUS_FNAME)
+    if not osp.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        return None
 
-        seed (int): Seed for random number generators.
 
-        num_cpu (int): Number of MPI processes to split into. Also accepts
-            'auto', which will set up as many procs as there are cpus on
-            the machine.
+def _write_run_status(output_dir, status):
+    os.makedirs(output_dir, exist_ok=True)
+    path = osp.join(output_dir, RUN_STATUS_FNAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(status, f)
+    os.replace(path + '.tmp', path)
 
-        data_dir (string): Used in configuring the logger, to decide where
-            to store experiment results. Note: if left as None, data_dir will
-            default to ``DEFAULT_DATA_DIR`` from ``spinup/user_config.py``. 
 
-        **kwargs: All kwargs to pass to thunk.
+def _prepare_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, 
+                        datestamp=False, **kwargs):
+    """
+    Set up an experiment for ``call_experiment``, without launching it.
 
+    Returns the thunk which runs the experiment (to be run with 
+    ``_ExperimentProcess``), the number of MPI processes it will use, and
+    its logger kwargs.
     """
 
     # Determine number of CPU cores to run on
@@ -132,6 +167,7 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None,
 
     # Send random seed to thunk
     kwargs['seed'] = seed
+    run_hash = config_hash(exp_name, thunk, kwargs)
 
     # Be friendly and print out your kwargs, so we all know what's up
     print(colorize('Running experiment:\n', color='cyan', bold=True))
@@ -144,6 +180,10 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None,
     # Set up logger output directory
     if 'logger_kwargs' not in kwargs:
         kwargs['logger_kwargs'] = setup_logger_kwargs(exp_name, seed, data_dir, datestamp)
+    elif 'output_dir' not in kwargs['logger_kwargs']:
+        # Only other logger kwargs (eg a watchdog) were given.
+        kwargs['logger_kwargs'] = dict(setup_logger_kwargs(exp_name, seed, data_dir, datestamp),
+                                       **kwargs['logger_kwargs'])
     else:
         print('Note: Call experiment is not handling logger_kwargs.\n')
 
@@ -158,17 +198,172 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None,
         # Fork into multiple processes
         mpi_fork(num_cpu)
 
-        # Run thunk
-        thunk(**kwargs)
+        # Run thunk, recording whether it finished
+        output_dir = kwargs['logger_kwargs'].get('output_dir')
+        record = output_dir is not None and proc_id() == 0
+        if record:
+            _write_run_status(output_dir, dict(config_hash=run_hash, status='running'))
+        try:
+            thunk(**kwargs)
+            status = dict(config_hash=run_hash, status='done')
+        except RunStopped as e:
+            # The logger's watchdog stopped the run, which is as finished 
+            # as it is going to get.
+            status = dict(config_hash=run_hash, status='stopped', reason=str(e))
+        if record:
+            _write_run_status(output_dir, status)
+
+    return thunk_plus, num_cpu, kwargs['logger_kwargs']
+
+
+class _ExperimentProcess:
+    """
+    A process running a thunk made by ``_prepare_experiment``.
+
+    With ``warm_start``, the process is forked from a server which has 
+    already imported the heavy libraries (see ``spinup/utils/warm_start.py``
+    and ``WARM_START_PRELOAD`` in ``spinup/user_config.py``), and the thunk 
+    is handed over through a pipe. Otherwise, a fresh Python runs ``run_entrypoint.py`` and reads 
+    the thunk from a temporary file. Experiments which split into several 
+    MPI processes always do the latter, because ``mpirun`` relaunches the
+    script which is running.
+
+    Either way, every experiment gets a process of its own, so no state 
+    leaks between successive experiments. The process starts a session of
+    its own, so that ``terminate`` stops everything it started (like 
+    ``mpirun`` and its ranks), not just the process itself.
+    """
+
+    def __init__(self, thunk, num_cpu=1, warm_start=False, num_threads=None, 
+                 log_file=None):
+        pickled_thunk = cloudpickle.dumps(thunk)
+        self.thunk_file = None
+        self.warm = warm_start and num_cpu == 1
+        if self.warm:
+            log_path = None if log_file is None else log_file.name
+            self.server = get_warm_server(WARM_START_PRELOAD)
+            self.job_id = self.server.launch(pickled_thunk, num_threads, log_path)
+            self.cmd = ['<warm-started process %d>'%self.server.pid(self.job_id)]
+        else:
+            fd, self.thunk_file = tempfile.mkstemp(prefix='spinup_thunk_', 
+                                                   suffix='.pkl')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(pickled_thunk))
+            entrypoint = osp.join(osp.abspath(osp.dirname(__file__)),'run_entrypoint.py')
+            self.cmd = [sys.executable if sys.executable else 'python', entrypoint, 
+                        '--thunk_file', self.thunk_file]
+            env = os.environ
+            if num_threads is not None:
+                threads = str(num_threads)
+                env = dict(env, OMP_NUM_THREADS=threads, MKL_NUM_THREADS=threads)
+            stderr = None if log_file is None else subprocess.STDOUT
+            self.proc = subprocess.Popen(self.cmd, env=env, stdout=log_file, 
+                                         stderr=stderr, start_new_session=True)
+        self.terminated = False
+
+    def _cleanup(self):
+        if self.thunk_file is not None and osp.exists(self.thunk_file):
+            os.remove(self.thunk_file)
+
+    def poll(self):
+        """Return the exit code, or None if the process is still running."""
+        code = self.server.poll(self.job_id) if self.warm else self.proc.poll()
+        if code is not None:
+            self._cleanup()
+        return code
+
+    def wait(self):
+        """Wait for the process to finish, and return its exit code."""
+        if self.warm:
+            self.server.wait(self.job_id)
+        else:
+            self.proc.wait()
+            if self.terminated:
+                # Kill anything in the process group which outlived it.
+                _kill_group(self.proc.pid, signal.SIGKILL)
+        return self.poll()
+
+    def terminate(self):
+        """Stop the process, and every process it started."""
+        self.terminated = True
+        if self.warm:
+            self.server.terminate(self.job_id)
+        else:
+            _kill_group(self.proc.pid, signal.SIGTERM)
 
-    # Prepare to launch a script to run the experiment
-    pickled_thunk = cloudpickle.dumps(thunk_plus)
-    encoded_thunk = base64.b64encode(zlib.compress(pickled_thunk)).decode('utf-8')
 
-    entrypoint = osp.join(osp.abspath(osp.dirname(__file__)),'run_entrypoint.py')
-    cmd = [sys.executable if sys.executable else 'python', entrypoint, encoded_thunk]
+def _kill_group(pgid, sig):
     try:
-        subprocess.check_call(cmd, env=os.environ)
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, 
+                    datestamp=False, warm_start=False, **kwargs):
+    """
+    Run a function (thunk) with hyperparameters (kwargs), plus configuration.
+
+    This wraps a few pieces of functionality which are useful when you want
+    to run many experiments in sequence, including logger configuration and
+    splitting into multiple processes for MPI. 
+
+    There's also a SpinningUp-specific convenience added into executing the
+    thunk: if ``env_name`` is one of the kwargs passed to call_experiment, it's
+    assumed that the thunk accepts an argument called ``env_fn``, and that
+    the ``env_fn`` should make a gym environment with the given ``env_name``. 
+
+    The way the experiment is actually executed is slightly complicated: the
+    function is serialized to a temporary file, and then ``run_entrypoint.py``
+    is executed in a subprocess call with the name of the file as an argument.
+    ``run_entrypoint.py`` unserializes the function call and executes it.
+    We choose to do it this way---instead of just calling the function 
+    directly here---to avoid leaking state between successive experiments.
+
+    Starting a fresh Python means importing gym, PyTorch, etc. all over 
+    again, which can take longer than a short experiment. With 
+    ``warm_start``, the experiment instead runs in a process forked from a
+    server which imported them once, at the start of the session.
+
+    Args:
+
+        exp_name (string): Name for experiment.
+
+        thunk (callable): A python function.
+
+        seed (int): Seed for random number generators.
+
+        num_cpu (int): Number of MPI processes to split into. Also accepts
+            'auto', which will set up as many procs as there are cpus on
+            the machine.
+
+        data_dir (string): Used in configuring the logger, to decide where
+            to store experiment results. Note: if left as None, data_dir will
+            default to ``DEFAULT_DATA_DIR`` from ``spinup/user_config.py``. 
+
+        warm_start (bool): Run the experiment in a process forked from a
+            server with ``WARM_START_PRELOAD`` (from 
+            ``spinup/user_config.py``) already imported. Only used when
+            ``num_cpu`` is 1.
+
+        **kwargs: All kwargs to pass to thunk.
+
+    """
+
+    thunk_plus, num_cpu, logger_kwargs = _prepare_experiment(exp_name, thunk, seed, 
+                                            num_cpu, data_dir, datestamp, **kwargs)
+    try:
+        proc = _ExperimentProcess(thunk_plus, num_cpu, warm_start)
+        try:
+            code = proc.wait()
+        except KeyboardInterrupt:
+            # (The experiment is in a session of its own, so it doesn't 
+            # get the interrupt from the terminal.)
+            proc.terminate()
+            proc.wait()
+            raise
+        if code != 0:
+            raise CalledProcessError(code, proc.cmd)
     except CalledProcessError:
         err_msg = '\n'*3 + '='*DIV_LINE_WIDTH + '\n' + dedent("""
 
@@ -184,8 +379,6 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None,
         raise
 
     # Tell the user about where results are, and how to check them
-    logger_kwargs = kwargs['logger_kwargs']
-
     plot_cmd = 'python -m spinup.run plot '+logger_kwargs['output_dir']
     plot_cmd = colorize(plot_cmd, 'green')
 
@@ -211,6 +404,373 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None,
     print(output_msg)
 
 
+class ExperimentScheduler:
+    """
+    Runs experiments as parallel subprocesses, within a budget of CPU cores.
+
+    Each experiment declares how many cores it needs, and experiments are
+    started (in order, skipping ahead to ones which still fit) whenever 
+    enough of the budget is free. An experiment which needs more than the
+    whole budget runs on its own. The output of each experiment goes to
+    ``stdout.txt`` in its output directory, and a status table is printed
+    whenever an experiment starts or finishes. With ``warm_start``, 
+    experiments are launched as in ``call_experiment`` with 
+    ``warm_start=True``.
+
+    A ``monitor`` (like ``SuccessiveHalving``) can stop experiments early.
+    It is called with the output directory of every running experiment 
+    each time the scheduler polls them, and returns the reason to stop the
+    experiment, or None to let it go on. Stopped experiments record the 
+    reason in their ``run_status.json`` (see ``run_status``).
+    """
+
+    def __init__(self, max_cpu, poll_interval=0.5, warm_start=False, monitor=None):
+        self.max_cpu = max_cpu
+        self.poll_interval = poll_interval
+        self.warm_start = warm_start
+        self.monitor = monitor
+        self.jobs = []
+
+    def add(self, exp_name, prepare, cost, num_threads=1):
+        """
+        Queue an experiment.
+
+        Args:
+            exp_name (string): Name for experiment.
+
+            prepare (callable): Called when the experiment is started, and 
+                returns what ``_prepare_experiment`` does.
+
+            cost (int): Number of cores the experiment needs.
+
+            num_threads (int): Number of threads each of the experiment's
+                processes may use.
+        """
+        self.jobs.append(dict(name=exp_name, prepare=prepare, cost=cost, 
+                              num_threads=num_threads, status='pending', 
+                              proc=None, code=None, start=None, end=None))
+
+    def _start(self, job):
+        # Keep the experiment's setup printout with the rest of its output.
+        with contextlib.redirect_stdout(io.StringIO()) as setup_output:
+            thunk_plus, num_cpu, logger_kwargs = job['prepare']()
+        output_dir = job['output_dir'] = logger_kwargs['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        job['log'] = open(osp.join(output_dir, 'stdout.txt'), 'w')
+        job['log'].write(setup_output.getvalue())
+        job['log'].flush()
+
+        # Limit how many threads the experiment's processes use. 
+        job['proc'] = _ExperimentProcess(thunk_plus, num_cpu, self.warm_start, 
+                                         job['num_threads'], job['log'])
+        job['status'], job['start'] = 'running', time.time()
+
+    def _finish(self, job, code, stop_reason=None):
+        job['log'].close()
+        job['status'] = 'done' if code == 0 else 'failed'
+        job['code'], job['end'] = code, time.time()
+        if code == 0 and (run_status(job['output_dir']) or dict()).get('status') == 'stopped':
+            job['status'] = 'stopped'   # By the experiment's own watchdog.
+        if stop_reason is not None:
+            job['status'] = 'stopped'
+            status = run_status(job['output_dir']) or dict()
+            status.update(status='stopped', reason=stop_reason)
+            _write_run_status(job['output_dir'], status)
+
+    def print_status(self):
+        """Print a table with the status of every experiment."""
+        count = lambda status: sum(job['status'] == status for job in self.jobs)
+        used = sum(job['cost'] for job in self.jobs if job['status'] == 'running')
+        print('='*DIV_LINE_WIDTH)
+        print(colorize('Experiments: %d running, %d pending, %d done, %d failed, '
+                       '%d stopped (%d/%d cores in use)'%(count('running'), 
+                       count('pending'), count('done'), count('failed'), 
+                       count('stopped'), used, self.max_cpu), color='green', bold=True))
+        colors = dict(running='cyan', done='green', failed='red', stopped='yellow')
+        for job in self.jobs:
+            if job['start'] is None:
+                elapsed = ''
+            else:
+                elapsed = '%.0fs'%((job['end'] or time.time()) - job['start'])
+            code = '' if job['code'] is None else str(job['code'])
+            status = job['status'].ljust(8)
+            if job['status'] in colors:
+                status = colorize(status, colors[job['status']])
+            print(' %s %s %5s %8s'%(job['name'][:56].ljust(56), status, code, elapsed))
+        print('='*DIV_LINE_WIDTH, flush=True)
+
+    def run(self):
+        """
+        Run all queued experiments, and wait for them to finish.
+
+        Returns:
+            A dict mapping each experiment name to its exit code (which is
+            negative, by the signal number, for stopped experiments).
+        """
+        pending, running = list(self.jobs), []
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                changed = False
+
+                # Start every pending experiment which fits in the budget.
+                for job in list(pending):
+                    used = sum(j['cost'] for j in running)
+                    if used + job['cost'] <= self.max_cpu or len(running) == 0:
+                        pending.remove(job)
+                        self._start(job)
+                        running.append(job)
+                        changed = True
+
+                if changed:
+                    self.print_status()
+                time.sleep(self.poll_interval)
+
+                for job in list(running):
+                    code = job['proc'].poll()
+                    if code is not None:
+                        running.remove(job)
+                        self._finish(job, code)
+                        changed = True
+                    elif self.monitor is not None:
+                        reason = self.monitor(job['output_dir'])
+                        if reason is not None:
+                            # Stop the experiment's whole process group (eg
+                            # mpirun and its ranks), so its cores are free
+                            # once it has been waited for.
+                            running.remove(job)
+                            job['proc'].terminate()
+                            self._finish(job, job['proc'].wait(), reason)
+                            changed = True
+                if changed and len(pending) == 0 and len(running) == 0:
+                    self.print_status()
+        finally:
+            # Don't leave experiments running if we are interrupted.
+            for job in running:
+                job['proc'].terminate()
+                self._finish(job, job['proc'].wait())
+        return {job['name']: job['code'] for job in self.jobs}
+
+
+def _can_resume(thunk):
+    try:
+        return 'resume' in inspect.signature(thunk).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _experiment_cost(var, num_cpu, num_threads):
+    """
+    Number of cores an experiment needs, and the number of threads each of
+    its processes may use.
+    """
+    # (mpi_fork limits every MPI process to one thread.)
+    procs = psutil.cpu_count(logical=False) if num_cpu=='auto' else num_cpu
+    threads = num_threads if procs == 1 else 1
+    return procs * threads + var.get('num_env_workers', 0), threads
+
+
+class ProgressReader:
+    """
+    Reads one column (``metric``) of the progress logs of running 
+    experiments, from ``progress.bin`` if the logger writes one, or else
+    from ``progress.txt``. Logs are only read again once they have grown.
+    """
+
+    def __init__(self, metric):
+        self.metric = metric
+        self._logs = dict()     # output_dir -> (log size, metric values)
+
+    def read(self, output_dir):
+        """Read every value of the metric from an experiment's progress log."""
+        binary = osp.exists(osp.join(output_dir, PROGRESS_BIN_FNAME))
+        path = osp.join(output_dir, PROGRESS_BIN_FNAME if binary else 'progress.txt')
+        size = osp.getsize(path) if osp.exists(path) else 0
+        if output_dir in self._logs and self._logs[output_dir][0] == size:
+            return self._logs[output_dir][1]
+        values = []
+        if binary and size > 0:
+            progress = load_progress(output_dir)
+            if self.metric in progress.dtype.names:
+                values = progress[self.metric].tolist()
+        elif size > 0:
+            with open(path) as f:
+                lines = f.read().split('\n')[:-1]   # (Skip any partly written line.)
+            header = lines[0].split('\t') if len(lines) > 0 else []
+            if self.metric in header:
+                col = header.index(self.metric)
+                values = [_parse_value(line.split('\t'), col) for line in lines[1:]]
+        self._logs[output_dir] = (size, values)
+        return values
+
+
+def _parse_value(cells, col):
+    """
+    The value in column ``col`` of a row of ``progress.txt``, or NaN if it's
+    blank (the logger leaves keys which weren't logged in an epoch blank) 
+    or not a number, as in ``progress.bin``.
+    """
+    try:
+        return float(cells[col])
+    except (IndexError, ValueError):
+        return np.nan
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving (ASHA), as an ``ExperimentScheduler``
+    monitor.
+
+    Rungs are at ``min_epochs * eta**k`` epochs, for k = 0, 1, 2, .... When
+    an experiment's progress log reaches a rung, its ``metric`` at that
+    epoch is compared with those of all experiments which reached the rung
+    before it, and the experiment is stopped unless it is in the top 
+    ``1/eta`` of them (rounding up, so the first to reach a rung always
+    goes on). NaN or infinite values count as the worst possible.
+    Experiments which are never stopped run to the end.
+    """
+
+    def __init__(self, metric='AverageEpRet', min_epochs=1, eta=3, mode='max'):
+        assert mode in ('max', 'min'), "Mode must be 'max' or 'min'."
+        self.metric = metric
+        self.min_epochs = min_epochs
+        self.eta = eta
+        self.sign = 1 if mode == 'max' else -1
+        self.reader = ProgressReader(metric)
+        self.rung_values = dict()   # rung -> metric values (times sign) at the rung
+        self.next_rung = dict()     # output_dir -> next rung to check
+
+    def read(self, output_dir):
+        """Read every value of the metric from an experiment's progress log."""
+        return self.reader.read(output_dir)
+
+    def __call__(self, output_dir):
+        values = self.read(output_dir)
+        k = self.next_rung.get(output_dir, 0)
+        while len(values) >= self.min_epochs * self.eta**k:
+            epoch = self.min_epochs * self.eta**k
+            value = self.sign * values[epoch-1]
+            value = value if np.isfinite(value) else -np.inf
+            recorded = self.rung_values.setdefault(k, [])
+            recorded.append(value)
+            self.next_rung[output_dir] = k + 1
+            num_better = sum(v > value for v in recorded)
+            if num_better >= int(np.ceil(len(recorded) / self.eta)):
+                return 'Stopped by successive halving at epoch %d, with %s %.4g.'%(
+                            epoch, self.metric, values[epoch-1])
+            k += 1
+        return None
+
+
+class PopulationBasedTraining:
+    """
+    Population based training (PBT), as an ``ExperimentScheduler`` monitor.
+
+    Each member of the population is checked every ``interval`` epochs. If
+    its latest ``metric`` puts it in the bottom ``quantile`` of the 
+    population, it is sent the weights (saved by ``save_pbt_weights``) and 
+    hyperparameters of a random member of the top ``quantile`` (exploit), 
+    with each hyperparameter in ``perturb`` multiplied by a random one of 
+    ``factors`` (explore). Members take these on at the end of an epoch,
+    if their algorithm was run with ``pbt=True`` (see 
+    ``spinup/utils/pbt.py``). Every change is appended to the member's 
+    ``pbt_history.txt``.
+
+    Args:
+        hparams (dict): Maps the output directory of each member to a dict
+            of its initial values of the hyperparameters in ``perturb``.
+    """
+
+    def __init__(self, hparams, perturb, metric='AverageEpRet', interval=5, 
+                 quantile=0.25, factors=(0.8, 1.2), mode='max', seed=0):
+        assert mode in ('max', 'min'), "Mode must be 'max' or 'min'."
+        self.hparams = {d: dict(h) for d, h in hparams.items()}
+        self.perturb = perturb
+        self.interval = interval
+        self.quantile = quantile
+        self.factors = factors
+        self.sign = 1 if mode == 'max' else -1
+        self.reader = ProgressReader(metric)
+        self.next_check = {d: interval for d in hparams}
+        self.previous_hparams = dict()
+        self.rng = np.random.RandomState(seed)
+
+    def __call__(self, output_dir):
+        if output_dir not in self.hparams:
+            # Not a member of the population: leave it alone.
+            return None
+        values = self.reader.read(output_dir)
+        if len(values) < self.next_check[output_dir]:
+            return None
+        self.next_check[output_dir] = len(values) + self.interval
+
+        # Rank the members which have logged anything by their latest metric.
+        scores = dict()
+        for d in self.hparams:
+            member_values = self.reader.read(d)
+            if len(member_values) > 0:
+                score = self.sign * member_values[-1]
+                scores[d] = score if np.isfinite(score) else -np.inf
+        ranked = sorted(scores, key=lambda d: scores[d])
+        n = max(1, int(len(ranked) * self.quantile))
+        if len(ranked) < 2 or output_dir not in ranked[:n]:
+            return None
+        donors = [d for d in ranked[-n:] if d != output_dir and 
+                  osp.exists(osp.join(d, PBT_WEIGHTS_FNAME))]
+        if len(donors) == 0:
+            return None
+
+        # Exploit the donor, and explore around its hyperparameters.
+        donor = donors[self.rng.randint(len(donors))]
+        new_hparams = dict(self.hparams[donor])
+        for k in self.perturb:
+            new_hparams[k] = float(new_hparams[k] * self.rng.choice(self.factors))
+        if not send_pbt_update(output_dir, osp.join(donor, PBT_WEIGHTS_FNAME), new_hparams):
+            # (Otherwise, the member never took on the update this replaces.)
+            self.previous_hparams[output_dir] = self.hparams[output_dir]
+        self.hparams[output_dir] = new_hparams
+        with open(osp.join(output_dir, 'pbt_history.txt'), 'a') as f:
+            f.write(json.dumps(dict(epoch=len(values), donor=donor, 
+                                    hparams=new_hparams)) + '\n')
+        return None
+
+    def discard_pending(self):
+        """
+        Remove updates which members finished before taking on, and go back
+        to the hyperparameters they had before.
+        """
+        for output_dir in self.hparams:
+            if discard_pbt_update(output_dir):
+                self.hparams[output_dir] = self.previous_hparams[output_dir]
+                with open(osp.join(output_dir, 'pbt_history.txt'), 'a') as f:
+                    f.write(json.dumps(dict(discarded=True, hparams=self.hparams[output_dir])) + '\n')
+
+
+class ParamRange:
+    """
+    A range of values for a parameter in ``ExperimentGrid.run_search``.
+
+    Values are sampled uniformly from [low, high), or uniformly in log space
+    if ``log`` is True. With ``integer``, they are rounded down to integers.
+    """
+
+    def __init__(self, low, high, log=False, integer=False):
+        assert low < high, "Range must have low < high."
+        assert not log or low > 0, "Log-scaled range must be positive."
+        self.low, self.high, self.log, self.integer = low, high, log, integer
+
+    def sample(self, u):
+        """Map a number u in [0, 1) to a value in the range."""
+        if self.log:
+            x = np.exp(np.log(self.low) + u * (np.log(self.high) - np.log(self.low)))
+        else:
+            x = self.low + u * (self.high - self.low)
+        return min(int(np.floor(x)), self.high - 1) if self.integer else float(x)
+
+    def __repr__(self):
+        return 'ParamRange(%r, %r%s%s)'%(self.low, self.high, 
+                ', log=True' if self.log else '', ', integer=True' if self.integer else '')
+
+
 def all_bools(vals):
     return all([isinstance(v,bool) for v in vals])
 
@@ -273,7 +833,8 @@ class ExperimentGrid:
             color_k = colorize(k.ljust(40), color='cyan', bold=True)
             print('', color_k, '['+sh+']' if sh is not None else '', '\n')
             for i, val in enumerate(v):
-                print('\t' + str(convert_json(val)))
+                print('\t' + (str(val) if isinstance(val, ParamRange) 
+                               else str(convert_json(val))))
             print()
 
         # Count up the number of variants. The number counting seeds
@@ -315,7 +876,8 @@ class ExperimentGrid:
         Args:
             key (string): Name of parameter.
 
-            vals (value or list of values): Allowed values of parameter.
+            vals (value or list of values): Allowed values of parameter. For
+                ``run_search``, this can also be a ``ParamRange``.
 
             shorthand (string): Optional, shortened name of parameter. For 
                 example, maybe the parameter ``steps_per_epoch`` is shortened
@@ -442,42 +1004,79 @@ class ExperimentGrid:
                 }
         """
         flat_variants = self._variants(self.keys, self.vals)
+        new_variants = [self._unflatten_var(var) for var in flat_variants]
+        return new_variants
 
-        def unflatten_var(var):
-            """ 
-            Build the full nested dict version of var, based on key names.
-            """
-            new_var = dict()
-            unflatten_set = set()
-
-            for k,v in var.items():
-                if ':' in k:
-                    splits = k.split(':')
-                    k0 = splits[0]
-                    assert k0 not in new_var or isinstance(new_var[k0], dict), \
-                        "You can't assign multiple values to the same key."
-
-                    if not(k0 in new_var):
-                        new_var[k0] = dict()
-
-                    sub_k = ':'.join(splits[1:])
-                    new_var[k0][sub_k] = v
-                    unflatten_set.add(k0)
-                else:
-                    assert not(k in new_var), \
-                        "You can't assign multiple values to the same key."
-                    new_var[k] = v
+    def _unflatten_var(self, var):
+        """ 
+        Build the full nested dict version of var, based on key names.
+        """
+        new_var = dict()
+        unflatten_set = set()
 
-            # Make sure to fill out the nested dicts.
-            for k in unflatten_set:
-                new_var[k] = unflatten_var(new_var[k])
+        for k,v in var.items():
+            if ':' in k:
+                splits = k.split(':')
+                k0 = splits[0]
+                assert k0 not in new_var or isinstance(new_var[k0], dict), \
+                    "You can't assign multiple values to the same key."
 
-            return new_var
+                if not(k0 in new_var):
+                    new_var[k0] = dict()
 
-        new_variants = [unflatten_var(var) for var in flat_variants]
-        return new_variants
+                sub_k = ':'.join(splits[1:])
+                new_var[k0][sub_k] = v
+                unflatten_set.add(k0)
+            else:
+                assert not(k in new_var), \
+                    "You can't assign multiple values to the same key."
+                new_var[k] = v
+
+        # Make sure to fill out the nested dicts.
+        for k in unflatten_set:
+            new_var[k] = self._unflatten_var(new_var[k])
+
+        return new_var
+
+    def sample_variants(self, num_samples, quasi_random=True, seed=0):
+        """
+        Makes a list of ``num_samples`` configs, sampled from the grid.
+
+        Parameters given as a ``ParamRange`` take values sampled from their
+        ranges, and parameters given as lists take one of their values, 
+        chosen at random. With ``quasi_random``, samples come from a 
+        scrambled Halton sequence (which covers the space more evenly than
+        independent random samples), if SciPy has one. The samples are 
+        determined by ``seed``.
+
+        The configs are nested dicts, like those from ``variants``.
+        """
+        dims = [i for i, v in enumerate(self.vals) 
+                if len(v) > 1 or isinstance(v[0], ParamRange)]
+        u = None
+        if quasi_random and len(dims) > 0:
+            try:
+                from scipy.stats import qmc
+                u = qmc.Halton(d=len(dims), scramble=True, seed=seed).random(num_samples)
+            except ImportError:
+                pass
+        if u is None:
+            u = np.random.RandomState(seed).rand(num_samples, len(dims))
+
+        flat_variants = []
+        for sample in u:
+            var = {k: v[0] for k, v in zip(self.keys, self.vals)}
+            for i, x in zip(dims, sample):
+                vals = self.vals[i]
+                if isinstance(vals[0], ParamRange):
+                    var[self.keys[i]] = vals[0].sample(x)
+                else:
+                    var[self.keys[i]] = vals[min(int(x * len(vals)), len(vals)-1)]
+            flat_variants.append(var)
+        return [self._unflatten_var(var) for var in flat_variants]
 
-    def run(self, thunk, num_cpu=1, data_dir=None, datestamp=False):
+    def run(self, thunk, num_cpu=1, data_dir=None, datestamp=False, 
+            max_cpu=None, num_threads=1, warm_start=False, reuse=False, queue=None):
         """
         Run each variant in the grid with function 'thunk'.
 
@@ -488,6 +1087,40 @@ class ExperimentGrid:
         Uses ``call_experiment`` to actually launch each experiment, and gives
         each variant a name using ``self.variant_name()``. 
 
+        If ``max_cpu`` is given, variants run in parallel (with an
+        ``ExperimentScheduler``) as long as they fit in a budget of
+        ``max_cpu`` cores. A variant needs ``num_cpu`` cores for its MPI
+        processes (times ``num_threads``, the number of threads a single
+        process may use; MPI processes always use one), plus one for each
+        environment worker process (``num_env_workers``) it starts. In this
+        case, the exit code of every variant is returned, by name (with the
+        seed appended).
+
+        With ``warm_start``, variants which use a single process are forked 
+        from a server with the heavy libraries already imported, instead of
+        starting a fresh Python each (see ``call_experiment``).
+
+        With ``reuse``, variants which were run before (into the same output
+        directory, with the same config; see ``config_hash``) aren't started
+        from scratch. Runs which finished, or were stopped early (see 
+        ``ExperimentScheduler`` and ``Watchdog`` in ``spinup/utils/logx.py``),
+        are skipped. Runs which didn't 
+        finish are resumed, by passing ``resume=True`` to the thunk, if it 
+        takes a ``resume`` argument, and are restarted otherwise. This needs
+        ``datestamp`` to be off, so that output directories stay the same.
+        The config hash only covers the variant's parameters, not the code
+        that runs them, so don't reuse runs across changes to the code: 
+        that's why ``reuse`` is off by default. The runs skipped are listed
+        before anything is launched.
+
+        With ``queue`` (the directory of a ``JobQueue``, on a filesystem 
+        which all machines share), the variants are put in the queue 
+        instead, to be run by workers on any number of machines (see 
+        ``spinup/utils/job_queue.py``), and the ids of their jobs are 
+        returned. ``max_cpu`` and ``warm_start`` are then up to the 
+        workers, and ``data_dir`` (which defaults to ``DEFAULT_DATA_DIR``
+        on this machine) should be on the shared filesystem too.
+
         Maintenance note: the args for ExperimentGrid.run should track closely
         to the args for call_experiment. However, ``seed`` is omitted because
         we presume the user may add it as a parameter in the grid.
@@ -498,10 +1131,129 @@ class ExperimentGrid:
 
         # Make the list of all variants.
         variants = self.variants()
+        assert not any(isinstance(v, ParamRange) for vals in self.vals for v in vals), \
+            "Parameter ranges can only be used with run_search."
+
+        named_variants = [(self.variant_name(var), var) for var in variants]
+        self._announce(sorted(set(name for name, _ in named_variants)))
+        return self._run_variants(named_variants, thunk, num_cpu, data_dir, datestamp, 
+                                  max_cpu, num_threads, warm_start, reuse, queue=queue)
+
+    def run_search(self, thunk, num_samples, metric='AverageEpRet', min_epochs=1, 
+                   eta=3, mode='max', quasi_random=True, search_seed=0, num_cpu=1, 
+                   data_dir=None, max_cpu=None, num_threads=1, warm_start=False, 
+                   reuse=False):
+        """
+        Search the grid adaptively, with asynchronous successive halving.
+
+        Instead of running every variant to the end, ``num_samples`` configs
+        are sampled from the grid (see ``sample_variants``; parameters can be
+        given as a ``ParamRange`` here), and run in parallel as in ``run``
+        with ``max_cpu`` (which defaults to the number of cores). While they 
+        run, a ``SuccessiveHalving`` monitor reads ``metric`` from their
+        progress logs, and stops the ones which fall behind at each rung
+        (``min_epochs``, ``min_epochs * eta``, ``min_epochs * eta**2``, ...
+        epochs), so that about ``1/eta`` of the runs go on past each rung. 
+        Use ``mode='min'`` for metrics where lower is better.
+
+        The sample configs are named after the grid, plus ``_t`` and their
+        index. Since the samples only depend on ``search_seed``, rerunning 
+        a search with ``reuse`` picks up where it left off, and runs which 
+        were stopped stay stopped. The other args are as for ``run``.
+
+        Returns:
+            A list with a dict for each sample config (with its 
+            ``exp_name``, ``output_dir``, ``config``, ``status``, the 
+            number of ``epochs`` it ran, and the last value of 
+            ``metric``), from best to worst: configs which ran for more 
+            epochs rank higher, and ties are broken by the metric.
+        """
+        self.print()
+        variants = self.sample_variants(num_samples, quasi_random, search_seed)
+        named_variants = [('%s_t%d'%(self._name, i), var) for i, var in enumerate(variants)]
+        self._announce([name for name, _ in named_variants])
+
+        max_cpu = max_cpu or psutil.cpu_count(logical=False)
+        monitor = SuccessiveHalving(metric, min_epochs, eta, mode)
+        self._run_variants(named_variants, thunk, num_cpu, data_dir, False, max_cpu, 
+                           num_threads, warm_start, reuse, monitor)
 
+        return self._rank_results(named_variants, monitor.reader, mode)
+
+    def run_pbt(self, thunk, population_size, perturb, metric='AverageEpRet', 
+                interval=5, quantile=0.25, factors=(0.8, 1.2), mode='max', 
+                quasi_random=True, search_seed=0, num_cpu=1, data_dir=None, 
+                max_cpu=None, num_threads=1, warm_start=False):
+        """
+        Run population based training, on a population sampled from the grid.
+
+        ``population_size`` configs are sampled from the grid as in 
+        ``run_search``, and run at once (by default, ``max_cpu`` is as many
+        cores as that takes). While they run, a ``PopulationBasedTraining``
+        monitor periodically sends the weights of the best members to the
+        worst, and perturbs the hyperparameters named in ``perturb`` (which
+        must be parameters of the grid, so that their initial values are 
+        known). The thunk is called with ``pbt=True``; the PyTorch versions
+        of PPO and SAC take part in PBT this way.
+
+        The members are named after the grid, plus ``_p`` and their index.
+        The other args are as for ``run_search`` and 
+        ``PopulationBasedTraining``.
+
+        Returns:
+            A list with a dict for each member, as for ``run_search``, plus
+            its final ``hparams``, from best to worst.
+        """
+        assert all(k in self.keys and ':' not in k for k in perturb), \
+            "Hyperparameters to perturb must be top-level parameters of the grid."
+        self.print()
+        variants = self.sample_variants(population_size, quasi_random, search_seed)
+        named_variants = [('%s_p%d'%(self._name, i), var) for i, var in enumerate(variants)]
+        self._announce([name for name, _ in named_variants])
+
+        hparams = dict()
+        output_dirs = self._set_output_dirs(named_variants, data_dir, False)
+        for output_dir, (exp_name, var) in zip(output_dirs, named_variants):
+            hparams[output_dir] = {k: var[k] for k in perturb}
+            var['pbt'] = True
+        monitor = PopulationBasedTraining(hparams, perturb, metric, interval, quantile,
+                                          factors, mode, search_seed)
+        max_cpu = max_cpu or sum(_experiment_cost(var, num_cpu, num_threads)[0] 
+                                 for _, var in named_variants)
+        self._run_variants(named_variants, thunk, num_cpu, data_dir, False, max_cpu, 
+                           num_threads, warm_start, False, monitor)
+        monitor.discard_pending()
+
+        results = self._rank_results(named_variants, monitor.reader, mode)
+        for r in results:
+            r['hparams'] = monitor.hparams[r['output_dir']]
+        return results
+
+    def _rank_results(self, named_variants, reader, mode):
+        # Rank the configs by how far they got, and then by their last value
+        # of the metric.
+        metric, results = reader.metric, []
+        for exp_name, var in named_variants:
+            output_dir = var['logger_kwargs']['output_dir']
+            values = reader.read(output_dir)
+            status = run_status(output_dir) or dict()
+            config = {k: v for k, v in var.items() if k not in ('resume', 'pbt')}
+            results.append(dict(exp_name=exp_name, output_dir=output_dir, config=config,
+                                status=status.get('status'), epochs=len(values),
+                                **{metric: values[-1] if len(values) > 0 else np.nan}))
+        sign = 1 if mode == 'max' else -1
+        results.sort(key=lambda r: (-r['epochs'], 
+                                    -sign*r[metric] if np.isfinite(r[metric]) else np.inf))
+
+        print(colorize('Results, by %s:\n'%metric, color='green', bold=True))
+        for r in results:
+            print(' %s %10.4g %6d epochs  %s'%(r['exp_name'][:40].ljust(40), r[metric], 
+                                               r['epochs'], r['status']))
+        print('='*DIV_LINE_WIDTH)
+        return results
+
+    def _announce(self, var_names):
         # Print variant names for the user.
-        var_names = set([self.variant_name(var) for var in variants])
-        var_names = sorted(list(var_names))
         line = '='*DIV_LINE_WIDTH
         preparing = colorize('Preparing to run the following experiments...', 
                              color='green', bold=True)
@@ -527,11 +1279,37 @@ class ExperimentGrid:
             for _ in prog_bar:
                 time.sleep(wait/steps)
 
-        # Run the variants.
-        for var in variants:
-            exp_name = self.variant_name(var)
+    def _set_output_dirs(self, named_variants, data_dir, datestamp):
+        """
+        Give each variant which doesn't have an output directory of its own
+        (in ``logger_kwargs``) the one ``call_experiment`` would, and return
+        the output directories of the variants.
+
+        This way, each variant's output directory is worked out only once 
+        (even with a datestamp), and monitors and results can go by it.
+        """
+        output_dirs = []
+        for exp_name, var in named_variants:
+            logger_kwargs = var.get('logger_kwargs', dict())
+            if 'output_dir' not in logger_kwargs:
+                var['logger_kwargs'] = dict(setup_logger_kwargs(exp_name, var.get('seed', 0), 
+                                                                data_dir, datestamp), 
+                                            **logger_kwargs)
+            output_dirs.append(var['logger_kwargs']['output_dir'])
+        return output_dirs
+
+    def _run_variants(self, named_variants, thunk, num_cpu, data_dir, datestamp, 
+                      max_cpu, num_threads, warm_start, reuse, monitor=None, queue=None):
+        if queue is not None:
+            # (The workers may be on other machines.)
+            data_dir = osp.abspath(data_dir or DEFAULT_DATA_DIR)
+        self._set_output_dirs(named_variants, data_dir, datestamp)
+
+        # Figure out what the thunk is for each variant, and which variants
+        # have already been run.
+        experiments, reused, resumed, restarted = [], [], [], []
+        for exp_name, var in named_variants:
 
-            # Figure out what the thunk is.
             if isinstance(thunk, str):
                 # Assume one of the variant parameters has the same
                 # name as the string you passed for thunk, and that 
@@ -542,8 +1320,93 @@ class ExperimentGrid:
                 # Assume thunk is given as a function.
                 thunk_ = thunk
 
-            call_experiment(exp_name, thunk_, num_cpu=num_cpu, 
-                            data_dir=data_dir, datestamp=datestamp, **var)
+            if reuse and not (datestamp or FORCE_DATESTAMP):
+                seed = var.get('seed', 0)
+                output_dir = var['logger_kwargs']['output_dir']
+                status = run_status(output_dir)
+                if status is not None and \
+                        status.get('config_hash') == config_hash(exp_name, thunk_, dict(var, seed=seed)):
+                    if status.get('status') in ('done', 'stopped'):
+                        reused.append(output_dir)
+                        continue
+                    if _can_resume(thunk_):
+                        var['resume'] = True
+                        resumed.append(output_dir)
+                    else:
+                        restarted.append(output_dir)
+
+            experiments.append((exp_name, thunk_, var))
+
+        if len(reused + resumed + restarted) > 0:
+            print(colorize('Found earlier runs of %d variants:\n'%len(reused + resumed + restarted),
+                           color='green', bold=True))
+            for title, dirs in [('Resuming unfinished runs:', resumed),
+                                ('Restarting unfinished runs (thunk has no resume argument):', 
+                                 restarted)]:
+                if len(dirs) > 0:
+                    print(title + '\n\n' + '\n'.join(dirs) + '\n')
+            if len(reused) > 0:
+                # Loudly, since these won't pick up any change to the code.
+                print(colorize('Skipping %d finished (or stopped) runs, whose results are '
+                               'reused as they are:\n'%len(reused), color='yellow', bold=True))
+                print('\n'.join(reused) + '\n')
+                print(colorize('If the code has changed since they ran, run again with '
+                               'reuse=False (or remove them).\n', color='yellow', bold=True))
+            print('='*DIV_LINE_WIDTH)
+        if monitor is not None:
+            for output_dir in reused:
+                monitor(output_dir)     # Let earlier runs count at each rung.
+
+        if queue is not None:
+            return self._queue_variants(experiments, queue, num_cpu, data_dir, 
+                                        datestamp, num_threads)
+
+        # Run the variants.
+        scheduler = None if max_cpu is None else \
+                    ExperimentScheduler(max_cpu, warm_start=warm_start, monitor=monitor)
+        for exp_name, thunk_, var in experiments:
+            if scheduler is None:
+                call_experiment(exp_name, thunk_, num_cpu=num_cpu, 
+                                data_dir=data_dir, datestamp=datestamp, 
+                                warm_start=warm_start, **var)
+            else:
+                cost, threads = _experiment_cost(var, num_cpu, num_threads)
+                prepare = partial(_prepare_experiment, exp_name, thunk_, num_cpu=num_cpu,
+                                  data_dir=data_dir, datestamp=datestamp, **var)
+                scheduler.add('%s_s%s'%(exp_name, var.get('seed', 0)), prepare, 
+                              cost, threads)
+
+        if scheduler is not None:
+            return scheduler.run()
+
+    def _queue_variants(self, experiments, queue_dir, num_cpu, data_dir, datestamp, 
+                        num_threads):
+        from spinup.utils.job_queue import JobQueue
+        queue = JobQueue(queue_dir)
+        data_dir = osp.abspath(data_dir or DEFAULT_DATA_DIR)
+        job_ids, skipped = [], []
+        for exp_name, thunk_, var in experiments:
+            cost, threads = _experiment_cost(var, num_cpu, num_threads)
+            prepare = partial(_prepare_experiment, exp_name, thunk_, num_cpu=num_cpu,
+                              data_dir=data_dir, datestamp=datestamp, **var)
+            name = '%s_s%s'%(exp_name, var.get('seed', 0))
+            job_id = queue.put(name, prepare, cost, threads, 
+                               _can_resume(thunk_) and 'resume' not in var)
+            if job_id is None:
+                skipped.append(name)
+            else:
+                job_ids.append(job_id)
+
+        print(colorize('Queued %d experiments in %s.\n'%(len(job_ids), queue.queue_dir), 
+                       color='green', bold=True))
+        if len(skipped) > 0:
+            print('Already pending or running:\n\n' + '\n'.join(skipped) + '\n')
+        worker_cmd = colorize('python -m spinup.utils.job_queue %s --max_cpu N'
+                              %queue.queue_dir, 'green')
+        print('Run them with workers, on any machines which share the queue:\n\n' 
+              + worker_cmd + '\n')
+        print('='*DIV_LINE_WIDTH)
+        return job_ids
 
 
 def test_eg():
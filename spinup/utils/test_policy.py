@@ -1,12 +1,11 @@
 import time
 import joblib
+import json
 import os
 import os.path as osp
-import tensorflow as tf
-import torch
 import gym
 from spinup import EpochLogger
-from spinup.utils.logx import restore_tf_graph
+from spinup.utils.logx import load_state, restore_tf_graph
 
 
 def load_policy_and_env(fpath, env_name, use_keyboard, itr='last', 
@@ -19,7 +18,7 @@ def load_policy_and_env(fpath, env_name, use_keyboard, itr='last',
 
     Checks to see if there's a tf1_save folder. If yes, assumes the model
     is tensorflow and loads it that way. Otherwise, loads as if there's a 
-    PyTorch save.
+    PyTorch save. Only the backend of the save is imported.
     """
 
     # determine if tf save or pytorch save
@@ -29,11 +28,18 @@ def load_policy_and_env(fpath, env_name, use_keyboard, itr='last',
         backend = 'pytorch'
 
     # handle which epoch to load from
-    if itr=='last':
+    if itr=='best':
+        # saves.json is written by loggers with a Retention
+        with open(osp.join(fpath, 'saves.json')) as f:
+            best = json.load(f)['best']
+        assert best is not None, "No save has been scored yet."
+        itr = '%d'%best
+
+    elif itr=='last':
         # check filenames for epoch (AKA iteration) numbers, find maximum value
 
         if backend == 'tf1':
-            saves = [int(x[8:]) for x in os.listdir(fpath) if 'tf1_save' in x and len(x)>8]
+            saves = [int(x[8:]) for x in os.listdir(fpath) if 'tf1_save' in x and x[8:].isdigit()]
 
         elif backend == 'pytorch':
             pytsave_path = osp.join(fpath, 'pyt_save')
@@ -46,7 +52,7 @@ def load_policy_and_env(fpath, env_name, use_keyboard, itr='last',
 
     else:
         assert isinstance(itr, int), \
-            "Bad value provided for itr (needs to be int or 'last')."
+            "Bad value provided for itr (needs to be int, 'last' or 'best')."
         itr = '%d'%itr
 
     # load the get_action function
@@ -59,7 +65,7 @@ def load_policy_and_env(fpath, env_name, use_keyboard, itr='last',
     # try to load environment from save
     # (sometimes this will fail because the environment could not be pickled)
     try:
-        state = joblib.load(osp.join(fpath, 'vars'+itr+'.pkl'))
+        state = load_state(fpath, itr)
         env = state['env']
     except:
         env = None
@@ -72,6 +78,7 @@ def load_policy_and_env(fpath, env_name, use_keyboard, itr='last',
 
 def load_tf_policy(fpath, itr, deterministic=False):
     """ Load a tensorflow policy saved with Spinning Up Logger."""
+    import tensorflow as tf
 
     fname = osp.join(fpath, 'tf1_save'+itr)
     print('\n\nLoading from %s.\n\n'%fname)
@@ -97,7 +104,8 @@ def load_tf_policy(fpath, itr, deterministic=False):
 
 def load_pytorch_policy(fpath, itr, deterministic=False):
     """ Load a pytorch policy saved with Spinning Up Logger."""
-    
+    import torch
+
     fname = osp.join(fpath, 'pyt_save', 'model'+itr+'.pt')
     print('\n\nLoading from %s.\n\n'%fname)
 
@@ -171,11 +179,14 @@ if __name__ == '__main__':
     parser.add_argument('--episodes', '-n', type=int, default=100)
     parser.add_argument('--norender', '-nr', action='store_true')
     parser.add_argument('--itr', '-i', type=int, default=-1)
+    parser.add_argument('--best', '-b', action='store_true',
+                        help='Load the best save kept by the logger\'s retention.')
     parser.add_argument('--deterministic', '-d', action='store_true')
     args = parser.parse_args()
+    itr = 'best' if args.best else args.itr if args.itr >=0 else 'last'
     env, get_action = load_policy_and_env(args.fpath,
                                           args.env,
                                           args.keyboard,
-                                          args.itr if args.itr >=0 else 'last',
+                                          itr,
                                           args.deterministic)
     run_policy(env, get_action, args.len, args.episodes, not(args.norender))
\ No newline at end of file
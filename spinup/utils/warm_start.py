@@ -0,0 +1,187 @@
+"""
+A server which imports the heavy libraries once, and then forks a process
+for every experiment it is asked to run.
+
+Starting an experiment in a fresh Python means importing gym, PyTorch, etc.
+all over again, which can take longer than a short experiment does. Instead,
+``call_experiment(..., warm_start=True)`` sends the pickled thunk to this
+server through a pipe, and the thunk runs in a process forked from the
+server. Every experiment still gets a process of its own, so no state leaks
+between experiments.
+
+The server is started the first time it is needed, and exits when the
+process which started it does.
+"""
+from multiprocessing.connection import Connection
+import importlib
+import os
+import signal
+import subprocess
+import sys
+import traceback
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _run_thunk(pickled_thunk, num_threads, log_path):
+    """Run a thunk in a freshly forked process. Never returns."""
+    code = 1
+    try:
+        if log_path is not None:
+            log_fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            os.dup2(log_fd, 1)
+            os.dup2(log_fd, 2)
+            os.close(log_fd)
+        if num_threads is not None:
+            # The libraries were imported before we knew how many threads
+            # this experiment may use.
+            os.environ['OMP_NUM_THREADS'] = str(num_threads)
+            os.environ['MKL_NUM_THREADS'] = str(num_threads)
+            if 'torch' in sys.modules:
+                sys.modules['torch'].set_num_threads(num_threads)
+        import cloudpickle
+        thunk = cloudpickle.loads(pickled_thunk)
+        thunk()
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(requests, replies, preload):
+    """
+    Run the server.
+
+    Requests are ``(job_id, pickled_thunk, num_threads, log_path)`` tuples.
+    The server replies with ``('started', job_id, pid)`` once it has forked
+    a process for the job, and with ``('exit', job_id, exit_code)`` when
+    the process finishes.
+    """
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    children = dict()   # pid -> job_id
+    open_requests = True
+    while open_requests or len(children) > 0:
+        if open_requests and requests.poll(0.05):
+            try:
+                job_id, pickled_thunk, num_threads, log_path = requests.recv()
+            except EOFError:
+                open_requests = False
+                continue
+            pid = os.fork()
+            if pid == 0:
+                requests.close()
+                replies.close()
+                # (A session of its own, so it can be stopped along with
+                # any processes it starts.)
+                os.setsid()
+                _run_thunk(pickled_thunk, num_threads, log_path)
+            children[pid] = job_id
+            replies.send(('started', job_id, pid))
+        elif not open_requests:
+            # Nothing more to start; wait for the last experiments to finish.
+            pid, status = os.waitpid(-1, 0)
+            children.pop(pid, None)
+            continue
+
+        for pid in list(children):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done != 0:
+                job_id = children.pop(pid)
+                try:
+                    replies.send(('exit', job_id, _exit_code(status)))
+                except (BrokenPipeError, OSError):
+                    pass
+
+
+class WarmServer:
+    """
+    Client for a server (see ``serve``) running in a subprocess.
+    """
+
+    def __init__(self, preload):
+        req_r, req_w = os.pipe()
+        rep_r, rep_w = os.pipe()
+        cmd = [sys.executable if sys.executable else 'python', '-m',
+               'spinup.utils.warm_start', str(req_r), str(rep_w)] + list(preload)
+        self.proc = subprocess.Popen(cmd, pass_fds=(req_r, rep_w))
+        os.close(req_r)
+        os.close(rep_w)
+        self.requests = Connection(req_w, readable=False)
+        self.replies = Connection(rep_r, writable=False)
+        self.next_id = 0
+        self.pids = dict()
+        self.codes = dict()
+
+    def _receive(self, timeout=0):
+        while self.replies.poll(timeout):
+            kind, job_id, value = self.replies.recv()
+            if kind == 'started':
+                self.pids[job_id] = value
+            else:
+                self.codes[job_id] = value
+            timeout = 0
+
+    def launch(self, pickled_thunk, num_threads=None, log_path=None):
+        """Start running a thunk, and return an id for the job."""
+        job_id = self.next_id
+        self.next_id += 1
+        self.requests.send((job_id, pickled_thunk, num_threads, log_path))
+        while job_id not in self.pids:
+            self._receive(timeout=None)
+        return job_id
+
+    def pid(self, job_id):
+        return self.pids[job_id]
+
+    def poll(self, job_id):
+        """Return the exit code of a job, or None if it is still running."""
+        self._receive()
+        return self.codes.get(job_id)
+
+    def wait(self, job_id):
+        """Wait for a job to finish, and return its exit code."""
+        while job_id not in self.codes:
+            self._receive(timeout=None)
+        return self.codes[job_id]
+
+    def terminate(self, job_id):
+        """Stop a job, and every process it started."""
+        if job_id not in self.codes:
+            try:
+                os.killpg(self.pids[job_id], signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                # (It may not have started its session yet.)
+                try:
+                    os.kill(self.pids[job_id], signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+
+_server = None
+
+def get_warm_server(preload):
+    """Return the session's warm server, starting it if need be."""
+    global _server
+    if _server is None or _server.proc.poll() is not None:
+        _server = WarmServer(preload)
+    return _server
+
+
+if __name__ == '__main__':
+    requests = Connection(int(sys.argv[1]), writable=False)
+    replies = Connection(int(sys.argv[2]), readable=False)
+    serve(requests, replies, sys.argv[3:])
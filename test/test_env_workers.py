@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import unittest
+
+import gym
+import numpy as np
+import torch
+import torch.nn as nn
+
+from spinup.utils.env_workers import EnvWorkers
+
+
+class CountEnv(gym.Env):
+    ''' Count the steps of 3-step episodes, in observations tagged with the seed '''
+    def __init__(self):
+        self.observation_space = gym.spaces.Box(-np.inf, np.inf, (2,), dtype=np.float32)
+        self.action_space = gym.spaces.Box(-1, 1, (1,), dtype=np.float32)
+        self.tag = 0
+
+    def seed(self, seed=None):
+        self.tag = seed
+        return [seed]
+
+    def reset(self):
+        self.t = 0
+        return self.obs()
+
+    def step(self, action):
+        self.t += 1
+        return self.obs(), 1., self.t == 3, {}
+
+    def obs(self):
+        return np.array([self.tag, self.t], dtype=np.float32)
+
+
+class RecordingBuffer:
+    ''' Keeps copies of the transitions stored in it '''
+    def __init__(self):
+        self.transitions = []
+
+    def store(self, obs, act, rew, next_obs, done):
+        self.transitions.append((obs.copy(), act.copy(), float(rew), next_obs.copy(), float(done)))
+
+
+def act(pi, o):
+    return pi(torch.as_tensor(o, dtype=torch.float32)).numpy()
+
+
+class TestEnvWorkers(unittest.TestCase):
+    def setUp(self):
+        self.pi = nn.Linear(2, 1)
+        with torch.no_grad():
+            self.pi.weight.zero_()
+            self.pi.bias.fill_(0.5)
+        self.ring_size = 4
+        self.workers = EnvWorkers(CountEnv, self.pi, act, obs_dim=(2,), act_dim=1,
+                                  num_workers=2, ring_size=self.ring_size, max_ep_len=10)
+
+    def tearDown(self):
+        self.workers.close()
+
+    def by_worker(self, transitions):
+        return {tag: [tr for tr in transitions if tr[0][0] == tag] for tag in [1, 2]}
+
+    def fetch(self, buf, n):
+        ''' Fetch until every worker has delivered ``n`` transitions (a worker
+        may start well after the other), and return the finished episodes '''
+        episodes = []
+        while min(len(t) for t in self.by_worker(buf.transitions).values()) < n:
+            ep = self.workers.fetch(buf)
+            if ep is not None:
+                episodes.append(ep)
+        return episodes
+
+    def test_transitions(self):
+        ''' Every worker's transitions arrive whole and in order, and so do its episodes '''
+        buf = RecordingBuffer()
+        episodes = self.fetch(buf, 30)
+        self.assertEqual(set(tr[0][0] for tr in buf.transitions), {1, 2})
+        for tag, transitions in self.by_worker(buf.transitions).items():
+            for k, (o, a, r, o2, d) in enumerate(transitions):
+                np.testing.assert_array_equal(o, [tag, k % 3])
+                # The last step of an episode is followed by a reset.
+                np.testing.assert_array_equal(o2, [tag, k % 3 + 1])
+                self.assertEqual(a.shape, (1,))
+                self.assertEqual((r, d), (1., float(k % 3 == 2)))
+        num_episodes = sum(len(transitions) // 3
+                           for transitions in self.by_worker(buf.transitions).values())
+        self.assertEqual(episodes, [(3., 3)] * num_episodes)
+
+    def test_sync_policy(self):
+        ''' After a sync, workers act with the new policy once their rings are drained '''
+        buf = RecordingBuffer()
+        self.fetch(buf, 10)
+        with torch.no_grad():
+            self.pi.bias.fill_(-0.5)
+        self.workers.sync_policy(self.pi)
+        # Each worker may have filled its ring, and be waiting to write one
+        # more step, with the old policy.
+        stale = self.ring_size + 1
+        buf = RecordingBuffer()
+        self.fetch(buf, stale + 5)
+        for transitions in self.by_worker(buf.transitions).values():
+            actions = np.array([tr[1][0] for tr in transitions[stale:]])
+            np.testing.assert_allclose(actions, -0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import copy
+import unittest
+
+import torch
+import torch.nn as nn
+
+from spinup.utils.flat_params import flatten_parameters
+
+
+def make_net():
+    return nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 2))
+
+
+class TestFlattenParameters(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+
+    def assert_views(self, net, flat):
+        ''' Each parameter reads from, and writes to, the flat tensor '''
+        offset = 0
+        for p in net.parameters():
+            n = p.numel()
+            self.assertTrue(torch.equal(p.data.reshape(-1), flat[offset:offset+n]))
+            offset += n
+        self.assertEqual(offset, flat.numel())
+        with torch.no_grad():
+            flat.add_(1.)
+            self.assertTrue(torch.equal(torch.cat([p.reshape(-1) for p in net.parameters()]),
+                                        flat))
+            flat.sub_(1.)
+
+    def test_views(self):
+        ''' Flattening keeps the values, and leaves the parameters as views '''
+        net = make_net()
+        before = [p.detach().clone() for p in net.parameters()]
+        params = list(net.parameters())
+        flat = flatten_parameters(net)
+        self.assertTrue(all(p is q for p, q in zip(params, net.parameters())))
+        self.assertTrue(all(torch.equal(p, q) for p, q in zip(before, net.parameters())))
+        self.assert_views(net, flat)
+
+    def test_load_state_dict(self):
+        ''' Loading a state dict writes into the flat tensor '''
+        net, other = make_net(), make_net()
+        flat = flatten_parameters(net)
+        net.load_state_dict(other.state_dict())
+        self.assertTrue(torch.equal(flat, torch.cat([p.detach().reshape(-1)
+                                                     for p in other.parameters()])))
+        self.assert_views(net, flat)
+
+    def test_optimizer_step(self):
+        ''' Optimizer steps write into the flat tensor '''
+        net = make_net()
+        flat = flatten_parameters(net)
+        before = flat.clone()
+        optimizer = torch.optim.Adam(net.parameters(), lr=0.1)
+        net(torch.randn(5, 4)).pow(2).mean().backward()
+        optimizer.step()
+        self.assertFalse(torch.equal(flat, before))
+        self.assert_views(net, flat)
+
+    def test_lerp(self):
+        ''' lerp_ on the flat tensors is the per-parameter polyak update '''
+        polyak = 0.995
+        net = make_net()
+        targ, looped = copy.deepcopy(net), copy.deepcopy(net)
+        with torch.no_grad():
+            for p in net.parameters():
+                p.add_(torch.randn_like(p))
+        flat, targ_flat = flatten_parameters(net), flatten_parameters(targ)
+        with torch.no_grad():
+            for _ in range(3):
+                targ_flat.lerp_(flat, 1 - polyak)
+                for p, p_targ in zip(net.parameters(), looped.parameters()):
+                    p_targ.data.mul_(polyak)
+                    p_targ.data.add_((1 - polyak) * p.data)
+        for p_targ, p_looped in zip(targ.parameters(), looped.parameters()):
+            self.assertTrue(torch.allclose(p_targ, p_looped, atol=1e-6))
+        self.assertFalse(torch.allclose(targ_flat, flat))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+import contextlib
+import io
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+import time
+import unittest
+
+import gym
+import numpy as np
+import torch
+
+from spinup.utils.logx import (BackgroundWriter, EpochLogger, Retention, RunStopped,
+                               Watchdog, SNAPSHOT_MAX_BYTES, load_progress, load_state)
+
+
+class TestWatchdog(unittest.TestCase):
+    def run_epochs(self, watchdog, losses, returns, model=None):
+        ''' Log an epoch for each loss and return, and count the epochs dumped '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, watchdog=watchdog)
+                if model is not None:
+                    logger.setup_pytorch_saver(model)
+                for epoch, (loss, ret) in enumerate(zip(losses, returns)):
+                    logger.store(LossQ=loss, EpRet=ret)
+                    logger.log_tabular('Epoch', epoch)
+                    logger.log_tabular('EpRet')
+                    logger.log_tabular('LossQ', average_only=True)
+                    logger.dump_tabular()
+            return len(losses), None
+        except RunStopped as e:
+            return epoch, str(e)
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_non_finite(self):
+        ''' Runs stop at the first non-finite diagnostic or parameter '''
+        self.assertEqual(self.run_epochs(dict(), [1, 2, 3], [0, 0, 0]), (3, None))
+        self.assertEqual(self.run_epochs(dict(), [1, np.nan, 3], [0, 0, 0]),
+                         (1, 'LossQ is nan'))
+        self.assertEqual(self.run_epochs(dict(), [1, 2, 3], [0, 0, np.inf]),
+                         (2, 'AverageEpRet is inf'))
+        model = torch.nn.Linear(2, 2)
+        with torch.no_grad():
+            model.bias[0] = np.nan
+        self.assertEqual(self.run_epochs(dict(), [1, 2], [0, 0], model),
+                         (0, 'parameter bias is not finite'))
+        self.assertEqual(self.run_epochs(None, [1, np.nan], [0, 0], model), (2, None))
+
+    def test_plateau(self):
+        ''' Runs stop once a value hasn't improved for patience epochs '''
+        watchdog = Watchdog(plateaus=[dict(key='AverageEpRet', patience=2, min_delta=0.5)])
+        self.assertEqual(self.run_epochs(watchdog, [0]*6, [1, 2, 2.4, 3, 3.2, 3.3]),
+                         (5, 'AverageEpRet has not improved on 3 for 2 epochs'))
+        watchdog = Watchdog(plateaus=[dict(key='LossQ', patience=2, mode='min')])
+        self.assertEqual(self.run_epochs(watchdog, [3, 2, 1, 0], [0]*4), (4, None))
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def log_epochs(self, logger, epochs, checkpoint_at=()):
+        for epoch in epochs:
+            logger.store(EpRet=epoch)
+            logger.log_tabular('Epoch', epoch)
+            logger.log_tabular('EpRet', average_only=True)
+            logger.dump_tabular()
+            if epoch in checkpoint_at:
+                logger.save_checkpoint(dict(epoch=epoch, model=torch.nn.Linear(2, 2),
+                                            unpicklable=lambda: None))
+
+    def test_resume(self):
+        ''' A resumed logger drops rows logged after the checkpoint, and 
+        restores the state and random number generators saved with it '''
+        with contextlib.redirect_stdout(io.StringIO()):
+            logger = EpochLogger(self.output_dir, binary_log=True)
+            self.log_epochs(logger, [1, 2, 3], checkpoint_at=[2])
+            logger.output_file.close()
+            logger.binary_file.close()
+            rng = np.random.get_state()
+            np.random.seed(1)
+
+            logger = EpochLogger(self.output_dir, resume=True, binary_log=True)
+            state = logger.load_checkpoint()
+            self.assertEqual(state['epoch'], 2)
+            self.assertIsInstance(state['model'], torch.nn.Linear)
+            self.assertNotIn('unpicklable', state)
+            self.assertTrue(np.array_equal(np.random.get_state()[1], rng[1]))
+            self.log_epochs(logger, [3, 4])
+            logger.output_file.close()
+            logger.binary_file.close()
+
+        with open(osp.join(self.output_dir, 'progress.txt')) as f:
+            rows = [line.split() for line in f.read().splitlines()]
+        self.assertEqual(rows[0], ['Epoch', 'EpRet'])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2', '3', '4'])
+        self.assertEqual(load_progress(self.output_dir)['Epoch'].tolist(), [1, 2, 3, 4])
+
+    def test_no_checkpoint(self):
+        ''' Without a checkpoint, a resumed logger starts over '''
+        with contextlib.redirect_stdout(io.StringIO()):
+            logger = EpochLogger(self.output_dir, resume=True)
+            self.assertIsNone(logger.load_checkpoint())
+            self.log_epochs(logger, [1])
+            logger.output_file.close()
+        with open(osp.join(self.output_dir, 'progress.txt')) as f:
+            self.assertEqual(len(f.read().splitlines()), 2)
+
+
+class TestBinaryLog(unittest.TestCase):
+    def test_same_values(self):
+        ''' The binary log holds the values of the text log, as float64s '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, binary_log=True)
+                for epoch in range(3):
+                    logger.store(EpRet=np.random.randn(5).astype(np.float32))
+                    logger.log_tabular('Epoch', epoch)
+                    logger.log_tabular('EpRet', with_min_and_max=True)
+                    logger.log_tabular('Name', 'run')
+                    logger.dump_tabular()
+                logger.output_file.close()
+                logger.binary_file.close()
+            with open(osp.join(output_dir, 'progress.txt')) as f:
+                rows = [line.split('\t') for line in f.read().splitlines()]
+            progress = load_progress(output_dir)
+            self.assertEqual(list(progress.dtype.names), rows[0])
+            for i, column in enumerate(rows[0][:-1]):
+                self.assertEqual(progress[column].tolist(), [float(row[i]) for row in rows[1:]])
+            self.assertTrue(np.isnan(progress['Name']).all())
+
+            # A row which is still being written is left out.
+            with open(osp.join(output_dir, 'progress.bin'), 'ab') as f:
+                f.write(b'\0' * 8)
+            self.assertEqual(len(load_progress(output_dir)), 3)
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_partial_header(self):
+        ''' A binary log whose header is still being written has no rows yet '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, binary_log=True)
+                logger.log_tabular('Epoch', 0)
+                logger.dump_tabular()
+                logger.output_file.close()
+                logger.binary_file.close()
+            path = osp.join(output_dir, 'progress.bin')
+            with open(path, 'rb') as f:
+                contents = f.read()
+            self.assertEqual(len(load_progress(output_dir)), 1)
+            # Cut inside the magic bytes, the header length, and the header.
+            for size in [0, 5, 12, 20]:
+                with open(path, 'wb') as f:
+                    f.write(contents[:size])
+                self.assertEqual(len(load_progress(output_dir)), 0)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class SteppedEnv(gym.Env):
+    ''' An environment whose random state and step count change as it steps '''
+    def __init__(self):
+        self.rng = np.random.RandomState(0)
+        self.steps = 0
+
+    def step(self, action):
+        self.steps += 1
+        return self.rng.randn(), 0., False, {}
+
+
+class TestSaveState(unittest.TestCase):
+    def test_unchanged_entries(self):
+        ''' Entries are written once, and files no state lists are removed '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            state_dir = osp.join(output_dir, 'state')
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir)
+                logger.save_state(dict(env='env', epoch=0), None)
+                self.assertEqual(len(os.listdir(state_dir)), 2)
+                with open(osp.join(output_dir, 'vars.json')) as f:
+                    env_file = osp.join(state_dir, json.load(f)['env'] + '.pkl')
+                mtime = os.stat(env_file).st_mtime_ns
+                for epoch in range(1, 4):
+                    logger.save_state(dict(env='env', epoch=epoch), None)
+                logger.save_state(dict(env='env', epoch=10), 10)
+            self.assertEqual(len(os.listdir(state_dir)), 3)
+            self.assertEqual(os.stat(env_file).st_mtime_ns, mtime)
+            self.assertEqual(load_state(output_dir), dict(env='env', epoch=3))
+            self.assertEqual(load_state(output_dir, 10), dict(env='env', epoch=10))
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_static_env(self):
+        ''' A stepped environment marked static is pickled only once '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            state_dir = osp.join(output_dir, 'state')
+            env = SteppedEnv()
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir)
+                for epoch in range(4):
+                    env.step(0)
+                    logger.save_state(dict(env=env, epoch=epoch), None, static=['env'])
+                    with open(osp.join(output_dir, 'vars.json')) as f:
+                        env_file = json.load(f)['env']
+                    if epoch == 0:
+                        first_env_file = env_file
+                    self.assertEqual(env_file, first_env_file)
+                    self.assertEqual(len(os.listdir(state_dir)), 2)
+                # Another environment is saved afresh.
+                logger.save_state(dict(env=SteppedEnv(), epoch=4), None, static=['env'])
+                with open(osp.join(output_dir, 'vars.json')) as f:
+                    self.assertNotEqual(json.load(f)['env'], first_env_file)
+            self.assertEqual(load_state(output_dir)['env'].steps, 0)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestRetention(unittest.TestCase):
+    def test_last_and_best(self):
+        ''' Only the last and best scoring saves are kept '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, retention=dict(keep_last=1, keep_best=2,
+                                                                key='EpRet'))
+                logger.setup_pytorch_saver(torch.nn.Linear(2, 2))
+                for epoch, ret in enumerate([1, 5, 2, 4, 0, 3]):
+                    logger.save_state(dict(env='env', epoch=epoch), None)
+                    logger.store(EpRet=ret)
+                    logger.log_tabular('Epoch', epoch)
+                    logger.log_tabular('EpRet', average_only=True)
+                    logger.dump_tabular()
+            self.assertEqual(sorted(os.listdir(osp.join(output_dir, 'pyt_save'))),
+                             ['model.pt', 'model1.pt', 'model3.pt', 'model5.pt'])
+            self.assertEqual(sorted(f for f in os.listdir(output_dir) if f.startswith('vars')),
+                             ['vars.json', 'vars1.json', 'vars3.json', 'vars5.json'])
+            self.assertEqual(len(os.listdir(osp.join(output_dir, 'state'))), 4)
+            self.assertEqual(load_state(output_dir, 3), dict(env='env', epoch=3))
+            self.assertEqual(load_state(output_dir), dict(env='env', epoch=5))
+            with open(osp.join(output_dir, 'pyt_save', 'model.pt'), 'rb') as f, \
+                    open(osp.join(output_dir, 'pyt_save', 'model5.pt'), 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+            with open(osp.join(output_dir, 'saves.json')) as f:
+                saves = json.load(f)
+            self.assertEqual(saves['best'], 1)
+            self.assertEqual(saves['saves'], [[1, 5.], [3, 4.], [5, 3.]])
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_missing_scores(self):
+        ''' Saves scored NaN, or by rows without the key, rank last '''
+        retention = Retention(keep_last=0, keep_best=2, key='AverageTestEpRet')
+        for itr, row in enumerate([dict(AverageTestEpRet=1.), dict(AverageTestEpRet=np.nan),
+                                   dict(), dict(AverageTestEpRet=0.)]):
+            retention.saved(itr)
+            retention.score(row)
+        self.assertEqual([itr for itr, _ in retention.saves], [0, 3])
+        self.assertEqual(retention.best(), 0)
+        retention = Retention(keep_last=1, keep_best=1, key='LossQ', mode='min')
+        retention.saved(0)
+        retention.score(dict(LossQ=np.nan))
+        self.assertIsNone(retention.best())
+
+
+class TestBackgroundIO(unittest.TestCase):
+    def run_logger(self, background_io):
+        ''' Log and save a few epochs, and return what ends up on disk '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            model = torch.nn.Linear(2, 2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, background_io=background_io)
+                # (The state_dict's tensors are the model's, changed in place.)
+                logger.setup_pytorch_saver(model.state_dict())
+                for epoch in range(3):
+                    logger.save_state(dict(epoch=epoch), None)
+                    weights = model.weight.detach().clone()
+                    with torch.no_grad():
+                        model.weight += 1
+                    logger.store(EpRet=epoch)
+                    logger.log_tabular('Epoch', epoch)
+                    logger.log_tabular('EpRet', with_min_and_max=True)
+                    logger.dump_tabular()
+                logger.flush()
+            with open(osp.join(output_dir, 'progress.txt')) as f:
+                progress = f.read()
+            saved = torch.load(osp.join(output_dir, 'pyt_save', 'model.pt'))
+            self.assertTrue(torch.equal(saved['weight'], weights))
+            return progress
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_same_output(self):
+        ''' Background writes write the same files, with snapshots of the model '''
+        self.assertEqual(self.run_logger(True), self.run_logger(False))
+
+    def test_checkpoint_snapshot(self):
+        ''' Checkpoints snapshot the state, except for big arrays '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            small, big = np.zeros(10), np.zeros(SNAPSHOT_MAX_BYTES // 8 + 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                logger = EpochLogger(output_dir, background_io=True)
+                logger.writer.submit(lambda: time.sleep(0.2))
+                logger.save_checkpoint(dict(buffer=dict(small=small, big=big)))
+                small[:], big[:] = 1, 1
+                logger.flush()
+                logger = EpochLogger(output_dir, resume=True)
+                state = logger.load_checkpoint()
+            self.assertEqual(state['buffer']['small'].tolist(), [0] * 10)
+            self.assertTrue((state['buffer']['big'] == 1).all())
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_error(self):
+        ''' A failed write is raised again on the training thread '''
+        writer = BackgroundWriter()
+        done = []
+        writer.submit(lambda: 1/0)
+        writer.submit(lambda: done.append(True))
+        with self.assertRaises(RuntimeError):
+            writer.flush()
+        writer.close()
+        self.assertEqual(done, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+import unittest
+
+import numpy as np
+
+from spinup.algos.pytorch.ppo.ppo import PPOBuffer
+
+
+class TestPPOBuffer(unittest.TestCase):
+    def test_num_envs(self):
+        ''' Two environment copies get the advantages of two single-env buffers '''
+        steps, obs_dim, act_dim = 6, 3, 2
+        rng = np.random.RandomState(0)
+        obs = rng.randn(steps, 2, obs_dim)
+        act = rng.randn(steps, 2, act_dim)
+        rew, val, logp = rng.randn(3, steps, 2)
+        # Copy 0 ends an episode after 2 steps and is cut off by the epoch;
+        # copy 1 times out after 4 steps and then ends an episode.
+        finishes = {1: [(0, 0.)], 3: [(1, 0.5)], 5: [(0, 0.3), (1, 0.)]}
+
+        buf = PPOBuffer(obs_dim, act_dim, 2 * steps, gamma=0.9, lam=0.8, num_envs=2)
+        singles = [PPOBuffer(obs_dim, act_dim, steps, gamma=0.9, lam=0.8) for _ in range(2)]
+        for t in range(steps):
+            buf.store(obs[t], act[t], rew[t], val[t], logp[t])
+            for i, single in enumerate(singles):
+                single.store(obs[t, i], act[t, i], rew[t, i], val[t, i], logp[t, i])
+            for i, last_val in finishes.get(t, []):
+                buf.finish_path(last_val, i)
+                singles[i].finish_path(last_val)
+
+        for name in ['obs_buf', 'act_buf', 'adv_buf', 'ret_buf', 'logp_buf']:
+            np.testing.assert_allclose(getattr(buf, name),
+                                       np.concatenate([getattr(s, name) for s in singles]),
+                                       rtol=1e-6, err_msg=name)
+        data = buf.get()
+        self.assertEqual(data['obs'].shape, (2 * steps, obs_dim))
+        self.assertAlmostEqual(float(data['adv'].mean()), 0., places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
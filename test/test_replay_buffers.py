@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from spinup.algos.pytorch.sac.sac import ReplayBuffer
+from spinup.utils.replay_buffers import CompactReplayBuffer, PrioritizedReplayBuffer, SumTree
+
+
+class TestCompactReplayBuffer(unittest.TestCase):
+    def fill(self, buf, num_episodes=40, seed=0):
+        ''' Store random episodes, tagging each transition with its index '''
+        rng = np.random.RandomState(seed)
+        transitions, tid = dict(), 0
+        for _ in range(num_episodes):
+            o, ep_len = rng.uniform(-5, 5, 3), rng.randint(1, 8)
+            for t in range(ep_len):
+                o2 = rng.uniform(-5, 5, 3)
+                buf.store(o, [tid], tid, o2, t == ep_len-1)
+                transitions[tid] = (o, o2)
+                o, tid = o2, tid + 1
+        return transitions
+
+    def check(self, buf, transitions, atol):
+        batch = buf.sample_batch(500)
+        for k, tid in enumerate(batch['act'][:,0].numpy().astype(int)):
+            o, o2 = transitions[tid]
+            np.testing.assert_allclose(batch['obs'][k].numpy(), o, atol=atol)
+            np.testing.assert_allclose(batch['obs2'][k].numpy(), o2, atol=atol)
+            self.assertEqual(batch['rew'][k].item(), tid)
+
+    def test_reconstructs_next_obs(self):
+        ''' Next observations come back right across episode boundaries '''
+        buf = CompactReplayBuffer((3,), 1, 50)
+        transitions = self.fill(buf)
+        self.assertLessEqual(buf.size, 50)
+        self.check(buf, transitions, atol=1e-6)
+
+    def test_quantized(self):
+        ''' uint8 observations are within half a quantization step '''
+        buf = CompactReplayBuffer((3,), 1, 50, obs_dtype='uint8',
+                                  obs_low=-np.ones(3)*10, obs_high=np.ones(3)*10)
+        transitions = self.fill(buf)
+        self.check(buf, transitions, atol=10/255 + 1e-6)
+
+
+class TestPrioritizedReplayBuffer(unittest.TestCase):
+    def test_sum_tree(self):
+        ''' Leaves are found in proportion to their priorities '''
+        tree = SumTree(5)
+        tree.update(np.arange(5), [1., 0., 2., 3., 4.])
+        self.assertEqual(tree.total(), 10.)
+        idxs = tree.find([0., 0.99, 1., 2.99, 3., 5.99, 6., 9.99])
+        np.testing.assert_array_equal(idxs, [0, 0, 2, 2, 3, 3, 4, 4])
+
+    def test_sampling(self):
+        ''' Sampling follows priorities, with matching IS weights '''
+        np.random.seed(0)
+        buf = PrioritizedReplayBuffer(2, 1, 10, alpha=1., beta=1.)
+        for i in range(10):
+            buf.store(np.zeros(2), [i], 0, np.zeros(2), False)
+        buf.update_priorities(np.arange(10), [1.]*9 + [9.])
+        batch = buf.sample_batch(1000)
+        idxs = batch['idxs'].numpy()
+        self.assertAlmostEqual(np.mean(idxs == 9), 0.5, delta=0.05)
+        np.testing.assert_array_equal(batch['act'][:,0].numpy(), idxs)
+        # With beta=1, weights are inversely proportional to priorities
+        np.testing.assert_allclose(batch['weights'].numpy(),
+                                   np.where(idxs == 9, 1/9, 1.), rtol=1e-4)
+
+
+class TestPersistedReplayBuffer(unittest.TestCase):
+    def test_round_trip(self):
+        ''' A buffer reopened from a saved storage directory holds what was stored '''
+        storage_dir = tempfile.mkdtemp()
+        try:
+            buf = ReplayBuffer(obs_dim=3, act_dim=2, size=10, storage_dir=storage_dir)
+            rng = np.random.RandomState(0)
+            for t in range(13):
+                buf.store(rng.randn(3), rng.randn(2), t, rng.randn(3), t % 4 == 3)
+            buf.save()
+            # Not saved, so not restored:
+            buf.store(np.zeros(3), np.zeros(2), -1, np.zeros(3), False)
+            saved = {name: np.array(arr) for name, arr in buf.storage.arrays.items()}
+            del buf
+
+            buf = ReplayBuffer(obs_dim=3, act_dim=2, size=10, storage_dir=storage_dir)
+            self.assertEqual((buf.ptr, buf.size), (3, 10))
+            for name, arr in buf.storage.arrays.items():
+                np.testing.assert_array_equal(arr[:3], saved[name][:3], err_msg=name)
+                np.testing.assert_array_equal(arr[4:], saved[name][4:], err_msg=name)
+            np.testing.assert_array_equal(buf.rew_buf, [10, 11, 12, -1, 4, 5, 6, 7, 8, 9])
+            np.testing.assert_array_equal(buf.done_buf, [0, 1, 0, 0, 0, 0, 0, 1, 0, 0])
+
+            # A buffer of another size starts over.
+            buf = ReplayBuffer(obs_dim=3, act_dim=2, size=20, storage_dir=storage_dir)
+            self.assertEqual((buf.ptr, buf.size), (0, 0))
+        finally:
+            shutil.rmtree(storage_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
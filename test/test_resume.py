@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import contextlib
+import io
+import os.path as osp
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import gym
+import numpy as np
+import pandas as pd
+import torch
+
+from spinup.algos.pytorch.ppo.ppo import ppo
+from spinup.algos.pytorch.sac.sac import ReplayBuffer, sac
+from spinup.utils.logx import RunStopped
+
+
+class SeededBox(gym.spaces.Box):
+    ''' A Box which samples with a RandomState of its own, so it always unpickles '''
+    def seed(self, seed=None):
+        self.rng = np.random.RandomState(seed)
+        return [seed]
+
+    def sample(self):
+        return self.rng.uniform(self.low, self.high).astype(self.dtype)
+
+
+class LineEnv(gym.Env):
+    ''' Walk along a line, towards a goal too far away to reach (observing 4 
+    values, as PPO's AlgorithmLogger expects) '''
+    name = 'ResumeLineEnv-v0'
+    max_episode_steps = 20
+    goal_position = 1.
+    base_path = None
+
+    def __init__(self, mode='train'):
+        self.observation_space = gym.spaces.Box(-np.inf, np.inf, (4,), dtype=np.float32)
+        self.action_space = SeededBox(-1, 1, (1,), dtype=np.float32)
+        self.seed(0)
+
+    def seed(self, seed=None):
+        self.rng = np.random.RandomState(seed)
+        self.action_space.seed(seed)
+        return [seed]
+
+    def reset(self):
+        self.pos, self.t = self.rng.uniform(-0.1, 0.1), 0
+        return self.obs()
+
+    def step(self, action):
+        self.pos += 0.02 * float(np.clip(action[0], -1, 1)) + self.rng.normal(0, 0.01)
+        self.t += 1
+        success = bool(self.pos > self.goal_position)
+        done = success or self.t == self.max_episode_steps
+        return self.obs(), self.pos, done, dict(success=success)
+
+    def obs(self):
+        return np.array([self.pos, self.t / self.max_episode_steps, 0, 0], dtype=np.float32)
+
+
+# (PPO makes its evaluation environment by name.)
+gym.envs.registration.register(id=LineEnv.name, entry_point=LineEnv)
+
+
+class StopAt:
+    ''' A watchdog which stops the run once it has logged epoch ``epoch`` '''
+    def __init__(self, epoch):
+        self.epoch = epoch
+
+    def __call__(self, row, stored_keys, model=None):
+        if row['Epoch'] == self.epoch:
+            return 'Interrupted by the test.'
+
+
+class TestResume(unittest.TestCase):
+    def setUp(self):
+        self.num_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+
+    def tearDown(self):
+        torch.set_num_threads(self.num_threads)
+
+    def run_algo(self, algo, output_dir, stop_at=None, resume=False, **kwargs):
+        logger_kwargs = dict(output_dir=output_dir)
+        if stop_at is not None:
+            logger_kwargs['watchdog'] = StopAt(stop_at)
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                algo(LineEnv, ac_kwargs=dict(hidden_sizes=(8,)), resume=resume,
+                     logger_kwargs=logger_kwargs, **kwargs)
+            except RunStopped:
+                pass
+        progress = pd.read_table(osp.join(output_dir, 'progress.txt'))
+        return progress.drop(columns='Time')
+
+    def assert_resumes(self, algo, epochs, **kwargs):
+        ''' A run interrupted halfway through, and resumed, logs what an uninterrupted one does '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            full = self.run_algo(algo, osp.join(output_dir, 'full'), epochs=epochs, **kwargs)
+            interrupted = osp.join(output_dir, 'interrupted')
+            stopped = self.run_algo(algo, interrupted, stop_at=full['Epoch'][epochs // 2],
+                                    epochs=epochs, **kwargs)
+            self.assertEqual(len(stopped), epochs // 2 + 1)
+            resumed = self.run_algo(algo, interrupted, resume=True, epochs=epochs, **kwargs)
+            self.assertEqual(len(full), epochs)
+            pd.testing.assert_frame_equal(resumed, full)
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_sac(self):
+        ''' SAC carries on exactly where it was interrupted '''
+        self.assert_resumes(sac, epochs=4, steps_per_epoch=100, start_steps=50,
+                            update_after=50, update_every=25, batch_size=32,
+                            num_test_episodes=1, max_ep_len=20, checkpoint_freq=1)
+
+    def test_ppo(self):
+        ''' PPO carries on exactly where it was interrupted '''
+        self.assert_resumes(ppo, epochs=4, steps_per_epoch=100, train_pi_iters=5,
+                            train_v_iters=5, max_ep_len=20, save_freq=1)
+
+
+class TestPersistReplay(unittest.TestCase):
+    def run_sac(self, output_dir):
+        ''' Run SAC for an epoch, and return its log, how many actions it sampled
+        at random, and the buffer size at its first update '''
+        random_actions, update_sizes = [], []
+        sample, sample_batch = SeededBox.sample, ReplayBuffer.sample_batch
+        def count_sample(box):
+            random_actions.append(1)
+            return sample(box)
+        def count_sample_batch(buf, batch_size=32):
+            update_sizes.append(buf.size)
+            return sample_batch(buf, batch_size)
+        out = io.StringIO()
+        with mock.patch.object(SeededBox, 'sample', count_sample), \
+                mock.patch.object(ReplayBuffer, 'sample_batch', count_sample_batch), \
+                contextlib.redirect_stdout(out):
+            sac(LineEnv, ac_kwargs=dict(hidden_sizes=(8,)), epochs=1, steps_per_epoch=50,
+                replay_size=1000, start_steps=30, update_after=40, update_every=10,
+                batch_size=16, num_test_episodes=1, max_ep_len=20, persist_replay=True,
+                logger_kwargs=dict(output_dir=output_dir))
+        return out.getvalue(), len(random_actions), update_sizes[0]
+
+    def test_warm_up(self):
+        ''' A restored replay buffer counts towards start_steps and update_after '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            log, random_actions, update_size = self.run_sac(output_dir)
+            self.assertNotIn('Restored', log)
+            self.assertEqual(random_actions, 31)
+            self.assertEqual(update_size, 41)
+
+            log, random_actions, update_size = self.run_sac(output_dir)
+            self.assertIn('Restored 50 transitions into the replay buffer.', log)
+            # Only the first step, before the policy acts, samples at random,
+            # and updates start right away.
+            self.assertEqual(random_actions, 1)
+            self.assertEqual(update_size, 51)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+
+import contextlib
+import io
+import os
+import os.path as osp
+import shutil
+import tempfile
+import time
+import unittest
+from functools import partial
+
+import numpy as np
+import psutil
+import torch
+
+from spinup.utils.job_queue import JobQueue
+from spinup.utils.pbt import PBT_FNAME, PBT_WEIGHTS_FNAME, pbt_update, save_pbt_weights, \
+                             send_pbt_update
+from spinup.utils.run_utils import ExperimentGrid, ExperimentScheduler, ParamRange, \
+                                   PopulationBasedTraining, ProgressReader, SuccessiveHalving, \
+                                   config_hash, run_status, _write_run_status, \
+                                   _ExperimentProcess
+
+
+def thunk(seed, hidden_sizes, env_fn=None, logger_kwargs=None):
+    pass
+
+
+def spawning_thunk(pid_file):
+    ''' A thunk which starts a process of its own (as mpirun does), writes 
+    its pid to pid_file, and waits '''
+    def spawn():
+        import subprocess, time
+        child = subprocess.Popen(['sleep', '60'])
+        with open(pid_file + '.tmp', 'w') as f:
+            f.write(str(child.pid))
+        os.rename(pid_file + '.tmp', pid_file)
+        time.sleep(60)
+    return spawn
+
+
+def wait_for_pid(pid_file):
+    for _ in range(200):
+        if osp.exists(pid_file):
+            with open(pid_file) as f:
+                return int(f.read())
+        time.sleep(0.05)
+    raise TimeoutError(pid_file)
+
+
+def is_running(pid):
+    ''' Whether pid is running (after giving it a moment to stop) '''
+    for _ in range(40):
+        try:
+            if psutil.Process(pid).status() == psutil.STATUS_ZOMBIE:
+                return False
+        except psutil.NoSuchProcess:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestConfigHash(unittest.TestCase):
+    def test_same_config(self):
+        ''' Equal configs hash the same, whatever their order or memory addresses '''
+        a = config_hash('exp', thunk, dict(seed=0, hidden_sizes=(64, 64),
+                                           env_fn=lambda: None))
+        b = config_hash('exp', thunk, dict(env_fn=lambda: None, hidden_sizes=[64, 64],
+                                           seed=0, logger_kwargs=dict(output_dir='x'),
+                                           resume=True))
+        self.assertEqual(a, b)
+
+    def test_different_config(self):
+        ''' Changing the name, thunk or any kwarg (even inside a tuple) changes the hash '''
+        base = config_hash('exp', thunk, dict(seed=0, hidden_sizes=(64, 64)))
+        self.assertNotEqual(base, config_hash('exp2', thunk, dict(seed=0, hidden_sizes=(64, 64))))
+        self.assertNotEqual(base, config_hash('exp', print, dict(seed=0, hidden_sizes=(64, 64))))
+        self.assertNotEqual(base, config_hash('exp', thunk, dict(seed=1, hidden_sizes=(64, 64))))
+        self.assertNotEqual(base, config_hash('exp', thunk, dict(seed=0, hidden_sizes=(32, 32))))
+
+
+class TestRunStatus(unittest.TestCase):
+    def test_round_trip(self):
+        output_dir = tempfile.mkdtemp()
+        try:
+            self.assertIsNone(run_status(output_dir))
+            _write_run_status(output_dir, dict(config_hash='abc', status='done'))
+            self.assertEqual(run_status(output_dir), dict(config_hash='abc', status='done'))
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestSearch(unittest.TestCase):
+    def test_sample_variants(self):
+        ''' Samples fall in their ranges, and only depend on the seed '''
+        eg = ExperimentGrid()
+        eg.add('pi_lr', ParamRange(1e-4, 1e-2, log=True))
+        eg.add('ac_kwargs:hidden_sizes', [(32,), (64, 64)])
+        eg.add('epochs', 10)
+        variants = eg.sample_variants(20, seed=1)
+        self.assertEqual(variants, eg.sample_variants(20, seed=1))
+        for var in variants:
+            self.assertTrue(1e-4 <= var['pi_lr'] < 1e-2)
+            self.assertIn(var['ac_kwargs']['hidden_sizes'], [(32,), (64, 64)])
+            self.assertEqual(var['epochs'], 10)
+
+    def test_output_dirs(self):
+        ''' Variants keep the output directory they are first given, even with datestamps '''
+        eg = ExperimentGrid('grid')
+        eg.add('seed', [0, 1])
+        named_variants = [('grid', var) for var in eg.variants()]
+        named_variants[1][1]['logger_kwargs'] = dict(output_dir='/tmp/own')
+        output_dirs = eg._set_output_dirs(named_variants, '/tmp/data', datestamp=True)
+        time.sleep(1.1)
+        self.assertEqual(eg._set_output_dirs(named_variants, '/tmp/data', datestamp=True),
+                         output_dirs)
+        self.assertTrue(output_dirs[0].startswith('/tmp/data/'))
+        self.assertTrue(output_dirs[0].endswith('-grid_s0'))
+        self.assertEqual(output_dirs[1], '/tmp/own')
+        self.assertEqual([var['logger_kwargs']['output_dir'] for _, var in named_variants],
+                         output_dirs)
+
+    def test_successive_halving(self):
+        ''' Runs behind the top 1/eta at a rung are stopped '''
+        data_dir = tempfile.mkdtemp()
+        try:
+            monitor = SuccessiveHalving('AverageEpRet', min_epochs=2, eta=2)
+            def log(name, returns):
+                output_dir = osp.join(data_dir, name)
+                os.makedirs(output_dir, exist_ok=True)
+                with open(osp.join(output_dir, 'progress.txt'), 'w') as f:
+                    f.write('Epoch\tAverageEpRet\n')
+                    f.writelines('%d\t%s\n'%(i, r) for i, r in enumerate(returns))
+                return monitor(output_dir)
+            self.assertIsNone(log('a', [1, 2]))     # First at rung, goes on
+            self.assertIsNone(log('b', [1]))        # Not at a rung yet
+            self.assertIsNotNone(log('b', [1, 1]))  # Behind a
+            self.assertIsNone(log('c', [5, 5]))     # Ahead of a and b
+            self.assertIsNotNone(log('d', [1, float('nan')]))
+        finally:
+            shutil.rmtree(data_dir)
+
+    def test_blank_cells(self):
+        ''' Blank (unlogged) or non-numeric cells of progress.txt read as NaN '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with open(osp.join(output_dir, 'progress.txt'), 'w') as f:
+                f.write('Epoch\tAverageEpRet\n0\t\n1\tx\n2\t3.5\n')
+            values = ProgressReader('AverageEpRet').read(output_dir)
+            self.assertTrue(np.isnan(values[0]) and np.isnan(values[1]))
+            self.assertEqual(values[2], 3.5)
+            monitor = SuccessiveHalving('AverageEpRet', min_epochs=1, eta=2)
+            self.assertIsNone(monitor(output_dir))
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_partial_binary_header(self):
+        ''' A progress.bin with a partly written header reads as no rows '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with open(osp.join(output_dir, 'progress.bin'), 'wb') as f:
+                f.write(b'SPINUPB1\x10\0')
+            self.assertEqual(ProgressReader('AverageEpRet').read(output_dir), [])
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_stopped_runs_release_processes(self):
+        ''' A run the monitor stops leaves no processes behind '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            pid_file = osp.join(output_dir, 'pid')
+            monitor = lambda output_dir: 'behind' if osp.exists(pid_file) else None
+            scheduler = ExperimentScheduler(max_cpu=1, poll_interval=0.05, monitor=monitor)
+            scheduler.add('run', lambda: (spawning_thunk(pid_file), 1, 
+                                          dict(output_dir=output_dir)), cost=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                scheduler.run()
+            self.assertEqual(scheduler.jobs[0]['status'], 'stopped')
+            self.assertFalse(is_running(wait_for_pid(pid_file)))
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestExperimentProcess(unittest.TestCase):
+    def test_terminate(self):
+        ''' Terminating an experiment stops the processes it started too '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            for warm_start in [False, True]:
+                pid_file = osp.join(output_dir, 'pid%d'%warm_start)
+                proc = _ExperimentProcess(spawning_thunk(pid_file), warm_start=warm_start)
+                child = wait_for_pid(pid_file)
+                self.assertTrue(is_running(child))
+                proc.terminate()
+                self.assertNotEqual(proc.wait(), 0)
+                self.assertFalse(is_running(child))
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestPBTUpdate(unittest.TestCase):
+    def test_send_and_take(self):
+        ''' A member takes on the latest update it was sent, once '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            donor, member = torch.nn.Linear(3, 2), torch.nn.Linear(3, 2)
+            donor_dir = osp.join(output_dir, 'donor')
+            os.makedirs(donor_dir)
+            save_pbt_weights(donor_dir, donor)
+            weights = osp.join(donor_dir, PBT_WEIGHTS_FNAME)
+            hparams = dict(lr=1e-3, alpha=0.2)
+            self.assertFalse(send_pbt_update(output_dir, weights, dict(lr=1.0, alpha=0.1)))
+            self.assertTrue(send_pbt_update(output_dir, weights, dict(lr=2e-3, alpha=0.1)))
+            self.assertTrue(pbt_update(output_dir, member, hparams))
+            self.assertEqual(hparams, dict(lr=2e-3, alpha=0.1))
+            self.assertTrue(torch.equal(member.weight, donor.weight))
+            self.assertFalse(pbt_update(output_dir, member, hparams))
+            self.assertEqual(os.listdir(osp.join(output_dir, 'pbt')), [])
+
+            send_pbt_update(output_dir, weights, dict(gamma=0.9))
+            with self.assertRaises(ValueError):
+                pbt_update(output_dir, member, hparams)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestPopulationBasedTraining(unittest.TestCase):
+    def test_exploit(self):
+        ''' The worst member is sent the best one's weights, and other dirs are ignored '''
+        data_dir = tempfile.mkdtemp()
+        try:
+            a, b = osp.join(data_dir, 'a'), osp.join(data_dir, 'b')
+            for output_dir, ret in [(a, 1), (b, 5)]:
+                os.makedirs(output_dir)
+                with open(osp.join(output_dir, 'progress.txt'), 'w') as f:
+                    f.write('Epoch\tAverageEpRet\n0\t%d\n'%ret)
+                save_pbt_weights(output_dir, torch.nn.Linear(3, 2))
+            monitor = PopulationBasedTraining({a: dict(lr=1.), b: dict(lr=2.)}, ['lr'],
+                                              interval=1, quantile=0.5)
+            self.assertIsNone(monitor(osp.join(data_dir, 'unknown')))
+            self.assertIsNone(monitor(b))
+            self.assertFalse(osp.exists(osp.join(b, PBT_FNAME)))
+            self.assertIsNone(monitor(a))
+            self.assertTrue(osp.exists(osp.join(a, PBT_FNAME)))
+            self.assertIn(monitor.hparams[a]['lr'], [1.6, 2.4])
+        finally:
+            shutil.rmtree(data_dir)
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_claim_and_complete(self):
+        ''' Jobs are claimed oldest first, once each, if they fit '''
+        queue_dir = tempfile.mkdtemp()
+        try:
+            queue = JobQueue(queue_dir)
+            a = queue.put('a_s0', partial(thunk, 0), cost=4)
+            b = queue.put('b_s0', partial(thunk, 0), cost=1)
+            self.assertIsNone(queue.put('a_s0', partial(thunk, 0), cost=4))
+
+            job_id, job = queue.claim(lambda cost: cost <= 2)
+            self.assertEqual((job_id, job['name'], job['attempts']), (b, 'b_s0', 1))
+            job_id, job = queue.claim()
+            self.assertEqual(job_id, a)
+            self.assertIsNone(queue.claim())
+
+            self.assertTrue(queue.renew(a))
+            self.assertTrue(queue.complete(a, True))
+            self.assertTrue(queue.complete(b, False))
+            self.assertFalse(queue.renew(a))
+            self.assertEqual(queue.counts(), dict(pending=0, running=0, done=1, failed=1))
+        finally:
+            shutil.rmtree(queue_dir)
+
+    def test_lease_expiry(self):
+        ''' Jobs of dead workers go back in the queue, to be resumed, until they fail '''
+        queue_dir = tempfile.mkdtemp()
+        try:
+            queue = JobQueue(queue_dir, lease=60, max_attempts=2)
+            job_id = queue.put('a_s0', partial(thunk, 0), can_resume=True)
+            path = osp.join(queue_dir, 'running', job_id)
+            for attempt, state in [(1, 'pending'), (2, 'failed')]:
+                _, job = queue.claim()
+                self.assertEqual(job['attempts'], attempt)
+                self.assertEqual(job['prepare'].keywords.get('resume'), True if attempt > 1 else None)
+                self.assertEqual(queue.release_expired('w'), [])
+                os.utime(path, (os.stat(path).st_mtime - 120,)*2)
+                self.assertEqual(queue.release_expired('w'), [(job_id, state)])
+            self.assertEqual(queue.counts()['failed'], 1)
+        finally:
+            shutil.rmtree(queue_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+import contextlib
+import io
+import os.path as osp
+import shutil
+import tempfile
+import unittest
+
+import gym
+import numpy as np
+import pandas as pd
+import torch
+
+from spinup.algos.pytorch.sac.core import PopulationMLPActorCritic
+from spinup.algos.pytorch.sac.sac_population import PopulationReplayBuffer, sac_population
+from spinup.utils.logx import RunStopped
+
+
+class TestPopulationMLPActorCritic(unittest.TestCase):
+    def test_member(self):
+        ''' Each member, copied out, computes what it does in the population '''
+        obs_space = gym.spaces.Box(-np.inf, np.inf, (5,), dtype=np.float32)
+        act_space = gym.spaces.Box(-2, 2, (3,), dtype=np.float32)
+        num_members = 4
+        pop = PopulationMLPActorCritic(obs_space, act_space, hidden_sizes=(16, 16),
+                                       num_members=num_members)
+        obs = torch.randn(num_members, 7, 5)
+        act = torch.rand(num_members, 7, 3)
+        with torch.no_grad():
+            pi, logp_pi = pop.pi(obs, deterministic=True)
+            q = pop.q(obs, act)
+            for k in range(num_members):
+                member = pop.member(k)
+                member_pi, member_logp_pi = member.pi(obs[k], deterministic=True)
+                self.assertTrue(torch.allclose(member_pi, pi[k], atol=1e-6))
+                self.assertTrue(torch.allclose(member_logp_pi, logp_pi[k], atol=1e-5))
+                self.assertTrue(torch.allclose(member.q1(obs[k], act[k]), q[k, 0], atol=1e-6))
+                self.assertTrue(torch.allclose(member.q2(obs[k], act[k]), q[k, 1], atol=1e-6))
+
+
+class TestPopulationReplayBuffer(unittest.TestCase):
+    def fill(self, buf, num_members, steps):
+        ''' Store transitions which encode their member and step '''
+        for t in range(steps):
+            obs = np.arange(num_members)[:, None] * 1000. + t + np.zeros((num_members, 3))
+            buf.store(obs, obs[:, :2], obs[:, 0], obs + 1, np.zeros(num_members))
+
+    def test_sample_batch(self):
+        ''' Each member samples only its own transitions '''
+        num_members = 3
+        buf = PopulationReplayBuffer(obs_dim=(3,), act_dim=2, size=20, num_members=num_members)
+        self.fill(buf, num_members, 25)
+        batch = buf.sample_batch(50)
+        self.assertEqual(batch['obs'].shape, (num_members, 50, 3))
+        self.assertEqual(batch['act'].shape, (num_members, 50, 2))
+        self.assertEqual(batch['rew'].shape, (num_members, 50))
+        member, step = np.divmod(batch['rew'].numpy(), 1000)
+        self.assertTrue((member == np.arange(num_members)[:, None]).all())
+        self.assertTrue(((step >= 5) & (step < 25)).all())
+        self.assertTrue(torch.equal(batch['obs2'], batch['obs'] + 1))
+
+    def test_restore(self):
+        ''' A buffer in a storage directory picks up where the saved one left off '''
+        storage_dir = tempfile.mkdtemp()
+        try:
+            buf = PopulationReplayBuffer(obs_dim=(3,), act_dim=2, size=20, num_members=3,
+                                         storage_dir=storage_dir)
+            self.fill(buf, 3, 7)
+            buf.save()
+            del buf
+            buf = PopulationReplayBuffer(obs_dim=(3,), act_dim=2, size=20, num_members=3,
+                                         storage_dir=storage_dir)
+            self.assertEqual((buf.ptr, buf.size), (7, 7))
+            self.assertEqual(buf.rew_buf[2, 6], 2006.)
+        finally:
+            shutil.rmtree(storage_dir)
+
+
+class PointEnv(gym.Env):
+    ''' Move a point towards the origin '''
+    def __init__(self):
+        self.observation_space = gym.spaces.Box(-np.inf, np.inf, (2,), dtype=np.float32)
+        self.action_space = gym.spaces.Box(-1, 1, (2,), dtype=np.float32)
+
+    def seed(self, seed=None):
+        self.rng = np.random.RandomState(seed)
+
+    def reset(self):
+        self.pos = self.rng.uniform(-1, 1, 2).astype(np.float32)
+        return self.pos
+
+    def step(self, action):
+        self.pos = self.pos + 0.1 * action.astype(np.float32)
+        return self.pos, -float(np.linalg.norm(self.pos)), False, {}
+
+
+class StopCall:
+    ''' A watchdog which stops the runs it's called for on the calls numbered ``stop_at`` '''
+    # The epochs of the calls, counted across the copies the members get.
+    calls = []
+
+    def __init__(self, stop_at):
+        self.stop_at = stop_at
+
+    def __call__(self, row, stored_keys, model=None):
+        StopCall.calls.append(row['Epoch'])
+        if len(StopCall.calls) in self.stop_at:
+            return 'Stopped by the test.'
+
+
+class TestStoppedMembers(unittest.TestCase):
+    def run_population(self, output_dir, stop_at):
+        StopCall.calls.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sac_population(PointEnv, ac_kwargs=dict(hidden_sizes=(8,)), num_members=3,
+                           steps_per_epoch=50, epochs=3, replay_size=1000, batch_size=16,
+                           start_steps=20, update_after=20, update_every=10,
+                           num_test_episodes=1, max_ep_len=20,
+                           logger_kwargs=dict(output_dir=output_dir, watchdog=StopCall(stop_at)))
+
+    def test_member_stopped(self):
+        ''' A member the watchdog stops is dropped, and the others carry on '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            # The second call is for member 1 in the first epoch.
+            self.run_population(osp.join(output_dir, 'pop'), stop_at=[2])
+            epochs = [len(pd.read_table(osp.join(output_dir, d, 'progress.txt')))
+                      for d in ['pop', 'pop_m1', 'pop_m2']]
+            self.assertEqual(epochs, [3, 1, 3])
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_all_stopped(self):
+        ''' The run stops once every member has been stopped '''
+        output_dir = tempfile.mkdtemp()
+        try:
+            with self.assertRaises(RunStopped):
+                self.run_population(osp.join(output_dir, 'pop'), stop_at=[1, 4, 5])
+            self.assertEqual(StopCall.calls, [1, 1, 1, 2, 2])
+        finally:
+            shutil.rmtree(output_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
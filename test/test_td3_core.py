@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import unittest
+
+import torch
+import torch.nn as nn
+
+from spinup.algos.pytorch.td3.core import EnsembleLinear, EnsembleMLPQFunction, MLPQFunction
+
+
+class TestEnsembleMLPQFunction(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.obs_dim, self.act_dim, self.num_q = 5, 3, 3
+        self.ensemble = EnsembleMLPQFunction(self.obs_dim, self.act_dim, (16, 16), nn.ReLU,
+                                             num_q=self.num_q)
+        self.obs = torch.randn(7, self.obs_dim)
+        self.act = torch.randn(7, self.act_dim)
+
+    def separate_q_functions(self):
+        ''' K MLPQFunctions holding the weights of the ensemble's members '''
+        q_functions = [MLPQFunction(self.obs_dim, self.act_dim, (16, 16), nn.ReLU)
+                       for _ in range(self.num_q)]
+        ensemble_layers = [m for m in self.ensemble.q if isinstance(m, EnsembleLinear)]
+        with torch.no_grad():
+            for k, q_function in enumerate(q_functions):
+                layers = [m for m in q_function.q if isinstance(m, nn.Linear)]
+                for layer, ensemble_layer in zip(layers, ensemble_layers):
+                    layer.weight.copy_(ensemble_layer.weight[k].t())
+                    layer.bias.copy_(ensemble_layer.bias[k, 0])
+        return q_functions
+
+    def test_separate(self):
+        ''' The ensemble computes what K separate Q-functions with its weights do '''
+        with torch.no_grad():
+            q = self.ensemble(self.obs, self.act)
+            self.assertEqual(q.shape, (self.num_q, 7))
+            for k, q_function in enumerate(self.separate_q_functions()):
+                self.assertTrue(torch.allclose(q[k], q_function(self.obs, self.act), atol=1e-6))
+
+    def test_forward_member(self):
+        ''' One member alone computes its row of the whole ensemble's output '''
+        with torch.no_grad():
+            q = self.ensemble(self.obs, self.act)
+            for k in range(self.num_q):
+                self.assertTrue(torch.allclose(self.ensemble.forward_member(self.obs, self.act, k),
+                                               q[k], atol=1e-6))
+
+
+if __name__ == '__main__':
+    unittest.main()